@@ -0,0 +1,117 @@
+"""
+Date parsing benchmark
+
+Parses the date strings each source produces, once the old way (one
+general-purpose parser call per row) and once through wvu.dates.DateParser,
+and checks that both give identical results before timing:
+
+    crime-log feed     incident times from the generated feed fixture (dateutil)
+    crime-log stored   datetimes in the committed crime_log/ partitions, as
+                       crime-log/utils.py re-parses them (dateutil)
+    covid              dates from the generated testing table (dateparser)
+
+Each DateParser timing starts with an empty cache, so the figures include
+format inference. Sources whose old parser is not installed are skipped.
+
+Usage:
+    python benchmarks/dates.py [--scale N] [--repeat N]
+"""
+
+import argparse
+import gc
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fixtures
+from wvu.dates import DateParser
+from wvu.partitions import UNDATED, PartitionedCSV
+from wvu.paths import dataset_dir
+
+
+def _general(module: str) -> Optional[Callable[[str], object]]:
+    """The old per-row parser, or None if it is not installed"""
+    try:
+        if module == 'dateutil':
+            from dateutil.parser import parse
+            return parse
+        import dateparser
+        return dateparser.parse
+    except ImportError:
+        return None
+
+
+def feed_times(scale: int) -> list[str]:
+    feed = fixtures.crime_log_feed(1000 * scale).decode('utf-8')
+    return re.findall(r'<incident_start_date_time>([^<]*)<', feed)
+
+
+def stored_times(scale: int) -> list[str]:
+    incidents = PartitionedCSV(dataset_dir('crime-log') / 'crime_log', [], lambda row: UNDATED)
+    return [row[3] for row in incidents.rows() if row[3]] * scale
+
+
+def covid_dates(scale: int) -> list[str]:
+    return re.findall(r'<time[^>]*>([^<]*)</time>', fixtures.covid_table(60 * scale))
+
+
+# (name, old parser module, values for a scale)
+SOURCES = [
+    ('crime-log feed', 'dateutil', feed_times),
+    ('crime-log stored', 'dateutil', stored_times),
+    ('covid', 'dateparser', covid_dates),
+]
+
+
+def parse_all(name: str, general: Callable, strings: list[str]) -> DateParser:
+    """Parse every string with a fresh DateParser"""
+    dates = DateParser(name, fallback=general)
+    for s in strings:
+        dates.parse(s)
+    return dates
+
+
+def best(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark date parsing against the per-row parsers")
+    parser.add_argument('--scale', type=int, default=1, help="Multiply every source's size")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing runs per path; the fastest is kept")
+    args = parser.parse_args()
+
+    print(f"{'source':<17} {'rows':>6}  {'per-row':>9} {'fast':>8} {'speedup':>7}  {'hits':>6}  format")
+    for name, module, values in SOURCES:
+        general = _general(module)
+        if general is None:
+            print(f"{name:<17} skipped: {module} is not installed")
+            continue
+
+        strings = values(args.scale)
+        dates = DateParser(name, fallback=general)
+        if [general(s) for s in strings] != [dates.parse(s) for s in strings]:
+            sys.exit(f"{name}: DateParser results differ from {module}")
+
+        old = best(lambda: [general(s) for s in strings], args.repeat)
+        new = best(lambda: parse_all(name, general, strings), args.repeat)
+        print(
+            f"{name:<17} {len(strings):>6}  {old:>8.4f}s {new:>7.4f}s {old / new:>6.1f}x"
+            f"  {dates.hit_ratio():>6.1%}  {dates.format.format if dates.format else '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Generated fixtures for the parser benchmarks
+
+Each generator returns a page shaped like the one its scraper parses, with
+`n` records drawn from a seeded random generator so runs are reproducible.
+The markup mirrors what the parsers rely on (table ids, header and footer
+rows, link layouts, feed element names) plus surrounding page chrome so
+documents are realistically sized.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+AGENCIES = [
+    "WV Department of Transportation", "WV Statewide Independent Living Council",
+    "Board of Education", "Public Service Commission", "Division of Natural Resources",
+    "Higher Education Policy Commission", "Department of Health and Human Resources",
+]
+SUBAGENCIES = ["Division of Highways", "Full council", "Finance Committee", "Advisory Board", ""]
+PLACES = ["BEECHURST AVE", "UNIVERSITY AVE", "PATTESON DR", "COLLINS FERRY RD", "WILLEY ST"]
+INCIDENTS = ["TRAFFIC STOP, 1054", "LARCENY", "DESTRUCTION OF PROPERTY", "ALARM", "ASSIST OTHER AGENCY"]
+OUTCOMES = ["Clear by Warning", "Cleared by Arrest", "Inactive", "Unfounded", "Citation Issued"]
+WORDS = "meeting council board review budget annual report fund special session public hearing".split()
+
+CHROME_HEAD = (
+    "<!DOCTYPE html><html><head><title>{title}</title>"
+    + "".join(f'<link rel="stylesheet" href="/css/site{i}.css">' for i in range(6))
+    + "<script>var analytics = {{}};</script></head><body>"
+    + '<div id="header"><ul class="nav">'
+    + "".join(f'<li><a href="/section{i}">Section {i}</a></li>' for i in range(20))
+    + "</ul></div>"
+)
+CHROME_FOOT = '<div id="footer"><p>West Virginia</p></div></body></html>'
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def crime_log_feed(n: int, seed: int = 1) -> bytes:
+    """Crime log XML feed with n incidents"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    records = []
+    for i in range(n):
+        when = start + timedelta(minutes=rng.randrange(0, 90 * 24 * 60))
+        title = (
+            f"<incident_code>{rng.choice(INCIDENTS)}</incident_code>" if rng.random() > 0.1
+            else f"<incident_code/><case_comments> {_words(rng, 4).upper()} </case_comments>"
+        )
+        records.append(
+            "<data>"
+            f"<case_number>#24-{i:05d}</case_number>"
+            f"{title}"
+            f"<incident_start_date_time>{when:%m/%d/%Y %I:%M %p}</incident_start_date_time>"
+            f"<building_name>{rng.choice(PLACES)} HALL</building_name>"
+            f"<address>{rng.randrange(1, 2000)} {rng.choice(PLACES)}, MORGANTOWN, WV 26506</address>"
+            f"<disposition>{rng.choice(OUTCOMES)}</disposition>"
+            "</data>"
+        )
+    return ("<root><meta><total>%d</total></meta>%s</root>" % (n, "".join(records))).encode('utf-8')
+
+
+def meeting_index(n: int, seed: int = 2) -> str:
+    """Meeting notices index page with n detail links"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        day = datetime(2024, 1, 1) + timedelta(days=rng.randrange(0, 365))
+        rows.append(
+            f'<tr><td><a href="MeetingNotice.aspx?NoticeID={200000 + i}">'
+            f'{day.month}/{day.day}/{day.year} -- {rng.randrange(1, 12)}:00 AM</a></td>'
+            f'<td>{rng.choice(AGENCIES)}</td><td>{_words(rng, 6)}</td></tr>'
+        )
+    return (
+        CHROME_HEAD.format(title="Meeting Notices")
+        + '<form><table id="searchForm"><tr><td><input name="q"></td></tr></table></form>'
+        + '<table id="tableResults"><tr><th>Date</th><th>Agency</th><th>Purpose</th></tr>'
+        + "".join(rows) + "</table>" + CHROME_FOOT
+    )
+
+
+def meeting_detail(i: int, seed: int = 3) -> str:
+    """One meeting notice detail page"""
+    rng = random.Random(seed * 1_000_003 + i)
+    subagency = rng.choice(SUBAGENCIES)
+    heading = f"{rng.choice(AGENCIES)}<br><em>{subagency}</em>" if subagency else rng.choice(AGENCIES)
+    return (
+        CHROME_HEAD.format(title="Meeting Notice")
+        + f"<table><tr><th><h2>{heading}</h2></th></tr>"
+        + f"<tr><td>Date: 1/{rng.randrange(1, 28)}/2024</td></tr>"
+        + f"<tr><td><pre>{rng.randrange(1, 999)} Capitol St\r\n  Charleston, WV  25301 </pre></td></tr>"
+        + f"<tr><td>Purpose: {_words(rng, 12)}</td></tr>"
+        + f"<tr><td>Notes: {_words(rng, 8)}</td></tr></table>"
+        + CHROME_FOOT
+    )
+
+
+def agency_listing(n: int, seed: int = 4) -> str:
+    """Agency reports listing for one year with n reports"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        agency = rng.choice(AGENCIES)
+        rows.append(
+            f"<tr><td>{agency}</td><td>{_words(rng, 5).title()} Report</td><td>Fiscal Year 2024</td>"
+            f'<td><a href="/legisdocs/reports/agency/A{i % 99:02d}_FY_2024_{26000 + i}.pdf">View</a></td></tr>'
+        )
+        if rng.random() < 0.05:
+            rows.append(f"<tr><td>{agency}</td><td>Annual Report</td><td>Fiscal Year 2024</td><td>No Report</td></tr>")
+    return (
+        CHROME_HEAD.format(title="Agency Reports")
+        + '<table class="tabborder"><tr><th>Agency</th><th>Report</th><th>Year</th><th>Link</th></tr>'
+        + "".join(rows)
+        + '<tr><td colspan="4">End of list</td></tr></table>'
+        + CHROME_FOOT
+    )
+
+
+def lobbying_page(n: int, seed: int = 5) -> str:
+    """Registration cycle page with n filing links, one per line like the real page"""
+    rng = random.Random(seed)
+    lines = [CHROME_HEAD.format(title="2023-2024 Registration Cycle"), '<div class="ms-rtestate-field">']
+    for i in range(n):
+        period = f"2023-{rng.randrange(1, 13):02d}"
+        first, last = rng.choice(["Clifton", "Jane", "Robert"]), rng.choice(["Addison", "Smith", "Jones"])
+        lines.append(
+            f'<p><a href="/SiteCollectionDocuments/Lobbyists/ACTIVITY%20REPORTS/{period}/'
+            f'{first}%20{last}{i}%20{period}%20Lobbyist%20Activity.pdf">{first} {last}</a></p>'
+        )
+        if i % 25 == 0:
+            lines.append(f'<p><a href="/Pages/help{i}.aspx">Filing help</a></p>')
+    lines.append("</div>" + CHROME_FOOT)
+    return "\n".join(lines)
+
+
+def covid_table(n: int, seed: int = 6) -> str:
+    """Daily testing results table with n days"""
+    rng = random.Random(seed)
+    start = datetime(2021, 1, 1)
+    rows = []
+    for i in range(n):
+        day = start + timedelta(days=i)
+        results = rng.randrange(0, 500)
+        positive = rng.randrange(0, max(1, results // 10))
+        pct = f"{positive / results:.2%}" if results else "-"
+        rows.append(
+            f'<tr>\n  <th><time datetime="{day:%Y-%m-%d}">{day:%B %-d, %Y}</time></th>\n'
+            f"  <td>{results}</td>\n  <td>{positive}</td>\n  <td>{pct}</td>\n</tr>"
+        )
+    return (
+        CHROME_HEAD.format(title="Daily Test Results")
+        + "<table>\n<tr><th colspan=\"4\">Morgantown</th></tr>\n"
+        + "<tr><th>Date</th><th>Results</th><th>Positive</th><th>Percent</th></tr>\n"
+        + "\n".join(rows) + "\n</table>" + CHROME_FOOT
+    )
@@ -0,0 +1,284 @@
+"""
+Offline parser benchmarks
+
+Runs every scraper's parse step over generated fixtures (see fixtures.py)
+at realistic size and scaled up 10x and 100x, and reports records/sec and
+peak traced memory for each. No network access is needed: only the pure
+parse functions are called.
+
+Results can be saved as a baseline and later runs compared against it.
+Throughput is compared after scaling by a CPU calibration loop, so a
+baseline recorded on one machine is roughly usable on another; peak memory
+is compared directly. Any case that is slower or larger than the baseline by
+more than the tolerance fails the run. The 1x cases finish in milliseconds,
+so their throughput is reported but only cases from --gate-scale (10x) up
+are checked for it.
+
+Every case is run in several interleaved rounds and keeps its fastest, so a
+slow spell on a shared machine only costs one round, and a case that looks
+slower than the baseline is measured again before the run fails.
+
+The calibration loop is pure Python and does not track lxml's C parsing
+speed across machines, so CI does not compare against the committed
+baseline: it benchmarks the base commit on the same runner first and
+compares against that with --same-runner, which skips the calibration.
+
+Usage:
+    python benchmarks/run.py
+    python benchmarks/run.py --save-baseline
+    python benchmarks/run.py --baseline benchmarks/baseline.json --scales 1 10
+    python benchmarks/run.py --scales 10 --output base.json   (on the base commit)
+    python benchmarks/run.py --scales 10 --baseline base.json --same-runner
+"""
+
+import argparse
+import gc
+import hashlib
+import io
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fixtures
+from wvu.paths import import_script
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+SCALES = [1, 10, 100]
+# Smallest scale whose throughput is checked against the baseline
+GATE_SCALE = 10
+# Seconds each case below 100x is repeated for, at least
+MIN_TIME = 1.0
+
+
+@dataclass
+class Case:
+    """A parser, its fixture and the number of records at 1x"""
+    name: str
+    script: str
+    records: int
+    make: Callable[[int], Any]
+    parse: Callable[[Any, Any], int]  # (module, fixture) -> records parsed
+
+
+def _parse_notice_pages(module, pages: list[str]) -> int:
+    parse = module.MeetingNoticesScraper.parse_notice_page
+    return sum(1 for i, html in enumerate(pages) if parse(html, str(i), '1/1/2024', '9:00 AM'))
+
+
+CASES = [
+    Case(
+        'crime-log', 'crime-log/crime_log.py', 1000, fixtures.crime_log_feed,
+        lambda module, data: sum(1 for _ in module.iter_incidents(io.BytesIO(data))),
+    ),
+    Case(
+        'meetings-index', 'meeting-notices/scraper.py', 500, fixtures.meeting_index,
+        lambda module, html: len(module.MeetingNoticesScraper.parse_index(html)),
+    ),
+    Case(
+        'meetings-detail', 'meeting-notices/scraper.py', 50,
+        lambda n: [fixtures.meeting_detail(i) for i in range(n)], _parse_notice_pages,
+    ),
+    Case(
+        'reports', 'wv-legislature/agency_reports.py', 150, fixtures.agency_listing,
+        lambda module, html: len(module.AgencyReportsScraper.parse_year_listing(html, 2024)),
+    ),
+    Case(
+        'lobbying', 'lobbying/lobbying_filings.py', 900, fixtures.lobbying_page,
+        lambda module, html: len(module.LobbyingFilingsScraper.parse_filings(html)),
+    ),
+    Case(
+        'covid', 'wvu-covid-tests/wvu_tests.py', 60, fixtures.covid_table,
+        lambda module, html: len(module.parse_results(html)),
+    ),
+]
+
+
+def calibrate(seconds: float = 0.5) -> float:
+    """Iterations per second of a fixed pure-Python workload"""
+    data = [str(i) * 3 for i in range(2000)]
+    iterations = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        sorted(data, key=lambda s: hashlib.md5(s.encode()).digest())
+        iterations += 1
+    return iterations / (time.perf_counter() - start)
+
+
+def measure(case: Case, module, scale: int, repeat: int, min_time: float = MIN_TIME) -> dict:
+    """
+    Best timing and peak traced memory for one case at one scale
+
+    Below 100x the case runs at least repeat times and until min_time
+    seconds have been spent on it, so millisecond cases get enough samples
+    for the fastest one to be stable.
+    """
+    fixture = case.make(case.records * scale)
+
+    timings = []
+    while not timings or (scale < 100 and (len(timings) < repeat or sum(timings) < min_time)):
+        gc.collect()
+        start = time.perf_counter()
+        records = case.parse(module, fixture)
+        timings.append(time.perf_counter() - start)
+    seconds = min(timings)
+
+    gc.collect()
+    tracemalloc.start()
+    case.parse(module, fixture)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'records': records,
+        'seconds': round(seconds, 6),
+        'records_per_sec': round(records / seconds, 1) if seconds else None,
+        'peak_bytes': peak,
+    }
+
+
+def compare(
+    results: dict,
+    baseline: dict,
+    tolerance: float,
+    gate_scale: int = GATE_SCALE,
+    calibrated: bool = True
+) -> list[tuple[str, str, str]]:
+    """
+    Regressions against a baseline
+
+    Throughput is only checked from gate_scale up, and is scaled by the
+    calibration ratio unless calibrated is False (same machine).
+
+    Returns:
+        (case, scale, message) for each regression
+    """
+    speed = results['calibration'] / baseline['calibration'] if calibrated else 1.0
+    regressions = []
+    for name, scales in results['cases'].items():
+        for scale, result in scales.items():
+            expected = baseline['cases'].get(name, {}).get(scale)
+            if not expected or 'skipped' in result or 'skipped' in expected:
+                continue
+            wanted = expected['records_per_sec'] * speed
+            if int(scale) >= gate_scale and result['records_per_sec'] < wanted * (1 - tolerance):
+                regressions.append((
+                    name, scale,
+                    f"{name} {scale}x: {result['records_per_sec']:.0f} records/s, "
+                    f"expected at least {wanted * (1 - tolerance):.0f}"
+                ))
+            if result['peak_bytes'] > expected['peak_bytes'] * (1 + tolerance):
+                regressions.append((
+                    name, scale,
+                    f"{name} {scale}x: peak {result['peak_bytes'] / 2**20:.1f} MiB, "
+                    f"baseline {expected['peak_bytes'] / 2**20:.1f} MiB"
+                ))
+    return regressions
+
+
+def run_rounds(runs: list[tuple[Case, Any, int]], results: dict, rounds: int, repeat: int, min_time: float) -> None:
+    """
+    Measure (case, module, scale) runs in interleaved rounds
+
+    Every round runs every case, so a slow spell on a shared machine costs
+    one round of a case rather than all of its samples. Each case keeps its
+    fastest result in results, including one already there.
+    """
+    for _ in range(rounds):
+        results['calibration'] = max(results['calibration'], round(calibrate(0.5 / rounds), 2))
+        for case, module, scale in runs:
+            result = measure(case, module, scale, repeat, min_time / rounds)
+            scales = results['cases'].setdefault(case.name, {})
+            best = scales.get(str(scale))
+            if best is None or result['seconds'] < best['seconds']:
+                scales[str(scale)] = result
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers' parsers offline")
+    parser.add_argument('--cases', nargs='+', choices=[case.name for case in CASES], help="Cases to run")
+    parser.add_argument('--scales', nargs='+', type=int, default=SCALES, help="Fixture size multipliers")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing runs per case below 100x; the fastest is kept")
+    parser.add_argument(
+        '--rounds', type=int, default=3, help="Passes over every case; each case keeps its fastest pass"
+    )
+    parser.add_argument(
+        '--min-time', type=float, default=MIN_TIME,
+        help="Seconds spent repeating each case below 100x, across all rounds"
+    )
+    parser.add_argument('--baseline', type=Path, help="Fail on regressions against this baseline")
+    parser.add_argument(
+        '--same-runner', action='store_true',
+        help="The baseline was recorded on this machine; compare throughput without calibration"
+    )
+    parser.add_argument('--tolerance', type=float, default=0.3, help="Allowed fractional regression")
+    parser.add_argument(
+        '--gate-scale', type=int, default=GATE_SCALE,
+        help="Smallest scale whose throughput is checked; smaller ones are too quick to time reliably"
+    )
+    parser.add_argument('--save-baseline', action='store_true', help=f"Write results to {BASELINE_FILE.name}")
+    parser.add_argument('--output', type=Path, help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    # The parsers log per page; keep the report readable
+    logging.disable(logging.WARNING)
+
+    cases = [case for case in CASES if not args.cases or case.name in args.cases]
+    results = {'calibration': 0.0, 'cases': {}}
+    modules = {}
+    for case in cases:
+        try:
+            modules[case.name] = import_script(case.script)
+        except ImportError as e:
+            print(f"{case.name:<16} skipped: {e}")
+            results['cases'][case.name] = {str(scale): {'skipped': str(e)} for scale in args.scales}
+
+    runs = [(case, modules[case.name], scale) for case in cases if case.name in modules for scale in args.scales]
+    run_rounds(runs, results, args.rounds, args.repeat, args.min_time)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    if baseline:
+        flagged = {(name, scale) for name, scale, _ in compare(
+            results, baseline, args.tolerance, args.gate_scale, not args.same_runner
+        )}
+        if flagged:
+            # Measure suspected regressions again before failing on one noisy round
+            run_rounds(
+                [run for run in runs if (run[0].name, str(run[2])) in flagged],
+                results, args.rounds, args.repeat, args.min_time
+            )
+
+    print(f"{'case':<16} {'scale':>5} {'records':>8} {'seconds':>9} {'records/s':>11} {'peak MiB':>9}")
+    for case in cases:
+        for scale in args.scales if case.name in modules else []:
+            result = results['cases'][case.name][str(scale)]
+            print(
+                f"{case.name:<16} {scale:>4}x {result['records']:>8} {result['seconds']:>9.4f} "
+                f"{result['records_per_sec']:>11.0f} {result['peak_bytes'] / 2**20:>9.2f}"
+            )
+
+    text = json.dumps(results, indent=2) + "\n"
+    if args.output:
+        args.output.write_text(text)
+    if args.save_baseline:
+        BASELINE_FILE.write_text(text)
+        print(f"Saved baseline to {BASELINE_FILE}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance, args.gate_scale, not args.same_runner)
+        for _, _, regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Bulk validation benchmark
+
+Loads each dataset's current CSV from the repository, validates every row
+and writes the records back out with csv.writer (to memory), once the old
+way and once through the dataset's RecordSchema (see wvu.records). The two
+steps are timed separately, since csv.writer's own cost is the same either
+way:
+
+    per-row   one pydantic BaseModel per row, written with to_list()
+    batch     the schema's validate() and write()
+
+The per-row models are copies of the BaseModel schemas the datasets used
+before they moved to slotted records, kept here as the reference. Both paths
+must produce identical CSV output, which is checked before timing.
+
+Usage:
+    python benchmarks/validation.py [--repeat N]
+"""
+
+import argparse
+import csv
+import gc
+import io
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from wvu.partitions import UNDATED, PartitionedCSV
+from wvu.paths import dataset_dir, import_script
+
+
+class LobbyingFilingModel(BaseModel):
+    name: str = Field(..., description="Lobbyist name")
+    period: str = Field(..., description="Filing period")
+    url: str = Field(..., description="PDF URL")
+
+    def to_list(self) -> list:
+        return [self.name, self.period, self.url]
+
+
+class MeetingNoticeModel(BaseModel):
+    id: str = Field(..., description="Unique identifier for the meeting notice")
+    date: str = Field(..., description="Meeting date")
+    time: str = Field(..., description="Meeting time")
+    agency: str = Field(..., description="Agency name")
+    subagency: Optional[str] = Field(None, description="Subagency name if applicable")
+    location: str = Field(..., description="Meeting location")
+    purpose: str = Field(..., description="Purpose of the meeting")
+    notes: str = Field(..., description="Additional notes")
+
+    @field_validator('location')
+    @classmethod
+    def clean_location(cls, v: str) -> str:
+        return v.replace('\r\n', ' ').replace('  ', ' ').strip()
+
+    def to_list(self) -> list:
+        return [self.id, self.date, self.time, self.agency, self.subagency, self.location, self.purpose, self.notes]
+
+
+class AgencyReportModel(BaseModel):
+    agency: str = Field(..., description="Agency name")
+    title: str = Field(..., description="Report title")
+    year: str = Field(..., description="Report year")
+    url: str = Field(..., description="Report URL")
+
+    def to_list(self) -> list:
+        return [self.agency, self.title, self.year, self.url]
+
+
+@dataclass
+class Case:
+    """A dataset CSV (or partition directory), its old per-row model and its record schema"""
+    name: str
+    csv_path: Path
+    header: bool
+    model: type[BaseModel]
+    schema: Callable[[], object]
+
+
+CASES = [
+    Case(
+        'lobbying', dataset_dir('lobbying') / 'lobbying_filings.csv', False, LobbyingFilingModel,
+        lambda: import_script('lobbying/models.py').LOBBYING_FILINGS,
+    ),
+    Case(
+        'meetings', dataset_dir('meeting-notices') / 'meeting_notices', True, MeetingNoticeModel,
+        lambda: import_script('meeting-notices/scraper.py').MEETING_NOTICES,
+    ),
+    Case(
+        'reports', dataset_dir('wv-legislature') / 'all_reports.csv', True, AgencyReportModel,
+        lambda: import_script('wv-legislature/agency_reports.py').AGENCY_REPORTS,
+    ),
+]
+
+
+def read_rows(case: Case) -> list[list[str]]:
+    if case.csv_path.is_dir():
+        return list(PartitionedCSV(case.csv_path, case.schema().fields, lambda row: UNDATED).rows())
+    with open(case.csv_path, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    return rows[1:] if case.header else rows
+
+
+def per_row_validate(case: Case, rows: list[list[str]]) -> list[BaseModel]:
+    fields = list(case.model.model_fields)
+    return [case.model(**dict(zip(fields, row))) for row in rows]
+
+
+def per_row_write(records: list[BaseModel]) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for record in records:
+        writer.writerow(record.to_list())
+    return out.getvalue()
+
+
+def batch_write(schema, records: list) -> str:
+    out = io.StringIO()
+    schema.write(csv.writer(out), records)
+    return out.getvalue()
+
+
+def best(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark bulk validation on the current CSVs")
+    parser.add_argument('--repeat', type=int, default=7, help="Timing runs per path; the fastest is kept")
+    args = parser.parse_args()
+
+    print(
+        f"{'dataset':<10} {'rows':>6}  {'validate: per-row':>17} {'batch':>8} {'speedup':>7}"
+        f"  {'write: per-row':>14} {'batch':>8} {'speedup':>7}"
+    )
+    for case in CASES:
+        rows = read_rows(case)
+        schema = case.schema()
+        models = per_row_validate(case, rows)
+        records = schema.validate(rows)
+        if per_row_write(models) != batch_write(schema, records):
+            sys.exit(f"{case.name}: batch output differs from per-row output")
+
+        validate = (best(lambda: per_row_validate(case, rows), args.repeat),
+                    best(lambda: schema.validate(rows), args.repeat))
+        write = (best(lambda: per_row_write(models), args.repeat),
+                 best(lambda: batch_write(schema, records), args.repeat))
+        print(
+            f"{case.name:<10} {len(rows):>6}  {validate[0]:>16.4f}s {validate[1]:>7.4f}s "
+            f"{validate[0] / validate[1]:>6.1f}x  {write[0]:>13.4f}s {write[1]:>7.4f}s {write[0] / write[1]:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,158 @@
-import csv
-from dateutil.parser import *
-import requests
-from bs4 import BeautifulSoup
-
-with open('crime_log.csv', 'r') as existing_reports:
-    reader = csv.DictReader(existing_reports)
-    previous_ids = [x['id'] for x in reader]
-
-r = requests.get("https://police.wvu.edu/clery-act/crime-and-fire-log")
-soup = BeautifulSoup(r.text, 'lxml')
-results = []
-
-incidents = soup.find('data').find_all('data')
-
-for incident in incidents:
-    if incident.find('case_number').contents[0] == "23-03572":
-        continue
-    if incident.find('incident_code').contents != []:
-        title = incident.find('incident_code').contents[0]
-    else:
-        title = incident.find('case_comments').contents[0].strip()
-    id = incident.find('case_number').contents[0]
-    datetime = parse(incident.find('incident_start_date_time').contents[0])
-    year = datetime.year
-    if len(incident.find('building_name').contents) > 0:
-        building = incident.find('building_name').contents[0]
-    else:
-        building = None
-    if len(incident.find('address').contents) > 0:
-        address = incident.find('address').contents[0]
-    else:
-        address = None
-    outcome = incident.find('disposition').contents[0]
-    result = [id, title, year, datetime, building, address, outcome]
-    if result not in results:
-        results.append(result)
-
-new_incidents = [x for x in results if x[0] not in previous_ids]
-
-if len(new_incidents) > 0:
-    with open("crime_log.csv", 'a') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerows(new_incidents)
+"""
+WVU campus crime log scraper
+
+Incidents are upserted into the SQLite store (see store.py) and exported to
+one CSV per incident month under crime_log/ (see wvu.partitions); only the
+months whose contents changed are rewritten.
+"""
+
+import argparse
+import io
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from lxml import etree
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from store import FIELDS, CrimeLogStore
+from wvu import metrics, profiling
+from wvu.dates import DateParser
+from wvu.http import get_client
+from wvu.partitions import UNDATED, PartitionedCSV
+from wvu.paths import dataset_dir
+
+URL = "https://police.wvu.edu/clery-act/crime-and-fire-log"
+DATA_DIR = dataset_dir('crime-log')
+PARTITION_DIR = DATA_DIR / 'crime_log'
+# Single-file CSV from before the log was partitioned
+LEGACY_CSV = DATA_DIR / 'crime_log.csv'
+DB_FILE = DATA_DIR / 'crime_log.db'
+
+_MONTH = re.compile(r'(\d{4})-(\d{2})')
+
+# Case numbers whose records are broken in the feed
+SKIPPED_CASES = {"23-03572"}
+
+
+def incident_partition(row: dict) -> str:
+    """Partition of an incident: the month of its datetime (YYYY-MM-DD ...)"""
+    match = _MONTH.match(row['datetime'])
+    return f"{match[1]}-{match[2]}" if match else UNDATED
+
+
+def open_partitions() -> PartitionedCSV:
+    """The partitioned crime log, split from the legacy single CSV if needed"""
+    incidents = PartitionedCSV(PARTITION_DIR, FIELDS, incident_partition)
+    incidents.migrate(LEGACY_CSV)
+    incidents.save_manifest()
+    return incidents
+
+
+def _text(incident, tag):
+    """Text of a child element, or None if it is missing or empty"""
+    element = incident.find(tag)
+    return element.text if element is not None else None
+
+
+def incident_dates() -> DateParser:
+    # Feed times are nearly all distinct, so caching them would only make
+    # memory grow with the feed
+    return DateParser('crime-log', cache_size=0)
+
+
+def iter_incidents(source, dates: Optional[DateParser] = None) -> Iterator[list]:
+    """
+    Stream incident rows out of the crime log feed
+
+    Each <data> record is turned into a row as soon as its closing tag is
+    parsed and then cleared, so memory use does not grow with the feed.
+
+    Args:
+        source: File-like object with the feed
+        dates: Parser for incident times, to keep its statistics
+    """
+    dates = dates or incident_dates()
+    for _, element in etree.iterparse(source, events=('end',), tag='data', html=True, recover=True):
+        if element.find('case_number') is None:
+            continue
+
+        id = _text(element, 'case_number')
+        if id not in SKIPPED_CASES:
+            title = _text(element, 'incident_code')
+            if title is None:
+                title = _text(element, 'case_comments').strip()
+            datetime = dates.parse(_text(element, 'incident_start_date_time'))
+            year = datetime.year
+            building = _text(element, 'building_name')
+            address = _text(element, 'address')
+            outcome = _text(element, 'disposition')
+            yield [id, title, year, datetime, building, address, outcome]
+
+        # Drop the finished record and anything parsed before it
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+def unique(rows: Iterable[list]) -> Iterator[list]:
+    """Drop exact duplicate rows, keeping the first"""
+    seen = set()
+    for row in rows:
+        key = tuple(row)
+        if key not in seen:
+            seen.add(key)
+            yield row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape the WVU campus crime log")
+    parser.add_argument(
+        '--profile', action='store_true',
+        help="Record a sampling profile of the run in the dataset's profiles/ directory"
+    )
+    args = parser.parse_args(argv)
+
+    with profiling.profiled('crime-log', DATA_DIR, args.profile), metrics.RunMetrics('crime-log'):
+        client = get_client()
+        r = client.get(URL, cache=True)
+        if r.unchanged:
+            print("Crime log feed unchanged since last run")
+            metrics.count(pages_unchanged=1)
+            return
+
+        incidents = open_partitions()
+        store = CrimeLogStore(DB_FILE)
+        try:
+            if store.is_empty() and incidents.exists():
+                with metrics.stage('write'):
+                    seeded = store.import_rows(incidents.rows())
+                print(f"Seeded store with {seeded} incidents from {PARTITION_DIR.name}/")
+
+            # Incidents are parsed as the upsert consumes them
+            dates = incident_dates()
+            rows = metrics.TimedIterator('parse', unique(iter_incidents(io.BytesIO(r.content), dates)))
+            started = time.monotonic()
+            inserted, updated = store.upsert(rows)
+            metrics.add_time('write', time.monotonic() - started - rows.seconds)
+            metrics.count(records_parsed=rows.count, records_new=inserted, records_changed=updated)
+            print(f"Added {inserted} new incidents, updated {updated}")
+            print(dates.summary())
+
+            if inserted or updated or not incidents.exists():
+                with metrics.stage('write'):
+                    changed = incidents.write(store.rows())
+                print(f"Rewrote {len(changed)} of {len(incidents.partitions)} monthly partitions")
+        finally:
+            store.close()
+
+        client.mark_processed(r)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+SQLite store for the crime log
+
+Incidents are kept in an indexed table keyed by case number. Each scrape is
+upserted in one transaction: new cases are inserted, and any change to an
+existing case (usually its disposition) is applied and recorded in the
+incident_history table with the time it was seen. The month-partitioned CSVs
+under crime_log/ are generated from the table rather than edited in place.
+"""
+
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator
+
+FIELDS = ["id", "title", "year", "datetime", "building", "address", "outcome"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    title TEXT,
+    year INTEGER,
+    datetime TEXT,
+    building TEXT,
+    address TEXT,
+    outcome TEXT,
+    first_seen TEXT,
+    last_seen TEXT
+);
+CREATE TABLE IF NOT EXISTS incident_history (
+    id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    old_value TEXT,
+    new_value TEXT,
+    seen_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS incident_history_id ON incident_history (id, seen_at);
+"""
+
+
+def _clean(row) -> list:
+    """Normalize a row to the values csv.writer would produce"""
+    values = ['' if value is None else str(value) for value in row]
+    values[2] = int(values[2]) if values[2] else None
+    return values
+
+
+class CrimeLogStore:
+    """Crime log incidents and their change history in SQLite"""
+
+    def __init__(self, path: Path = Path("crime_log.db")):
+        """
+        Open (and create if needed) the store
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = Path(path)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def is_empty(self) -> bool:
+        """Whether the store has no incidents yet"""
+        return self.db.execute("SELECT 1 FROM incidents LIMIT 1").fetchone() is None
+
+    def import_rows(self, rows: Iterable[list]) -> int:
+        """
+        Seed the store from existing CSV rows, keeping their order
+
+        Args:
+            rows: Incident rows in FIELDS order, as read from CSV
+
+        Returns:
+            Number of incidents imported
+        """
+        rows = [_clean(row) for row in rows if row]
+
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO incidents (id, title, year, datetime, building, address, outcome) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def upsert(self, rows: Iterable[list]) -> tuple[int, int]:
+        """
+        Insert new incidents and apply changes to known ones in one transaction
+
+        Args:
+            rows: Incident rows in FIELDS order
+
+        Returns:
+            Tuple of (inserted, updated) counts
+        """
+        seen_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        inserted = updated = 0
+
+        with self.db:
+            for row in rows:
+                row = _clean(row)
+                existing = self.db.execute(
+                    "SELECT title, year, datetime, building, address, outcome FROM incidents WHERE id = ?",
+                    (row[0],)
+                ).fetchone()
+
+                if existing is None:
+                    self.db.execute(
+                        "INSERT INTO incidents (id, title, year, datetime, building, address, outcome, "
+                        "first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (*row, seen_at, seen_at)
+                    )
+                    inserted += 1
+                    continue
+
+                changes = [
+                    (row[0], field, old, new, seen_at)
+                    for field, old, new in zip(FIELDS[1:], existing, row[1:])
+                    if old != new
+                ]
+                if changes:
+                    self.db.executemany(
+                        "INSERT INTO incident_history (id, field, old_value, new_value, seen_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        changes
+                    )
+                    self.db.execute(
+                        "UPDATE incidents SET title = ?, year = ?, datetime = ?, building = ?, "
+                        "address = ?, outcome = ?, last_seen = ? WHERE id = ?",
+                        (*row[1:], seen_at, row[0])
+                    )
+                    updated += 1
+                else:
+                    self.db.execute("UPDATE incidents SET last_seen = ? WHERE id = ?", (seen_at, row[0]))
+
+        return inserted, updated
+
+    def rows(self) -> Iterator[tuple]:
+        """Incidents in FIELDS order, in the order they were first stored"""
+        return self.db.execute(
+            "SELECT id, title, year, datetime, building, address, outcome FROM incidents ORDER BY seq"
+        )
+
+    def close(self) -> None:
+        """Close the database"""
+        self.db.close()
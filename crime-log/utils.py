@@ -1,17 +1,18 @@
-import csv
-from dateutil.parser import *
-from collections import OrderedDict
+from crime_log import DB_FILE, open_partitions
+from store import CrimeLogStore
+from wvu.dates import DateParser
 
-incidents = []
+# Normalizes incident datetimes in the store and regenerates the crime_log/ partitions.
 
-with open('crime_log.csv', 'r') as existing_reports:
-    reader = csv.DictReader(existing_reports)
-    for row in reader:
-        new_dt = parse(row['datetime'])
-        row['datetime'] = new_dt
-        incidents.append(row)
+store = CrimeLogStore(DB_FILE)
+dates = DateParser('stored incident')
 
-with open("crime_log.csv", 'w') as csvfile:
-    writer = csv.DictWriter(csvfile, fieldnames=["id","title","year","datetime","building","address","outcome"])
-    writer.writeheader()
-    writer.writerows(incidents)
+with store.db:
+    rows = store.db.execute("SELECT id, datetime FROM incidents").fetchall()
+    fixed = [(str(dates.parse(dt)), id) for id, dt in rows if dt and str(dates.parse(dt)) != dt]
+    store.db.executemany("UPDATE incidents SET datetime = ? WHERE id = ?", fixed)
+
+open_partitions().write(store.rows())
+store.close()
+print(f"Normalized {len(fixed)} datetimes")
+print(dates.summary())
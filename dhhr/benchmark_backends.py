@@ -0,0 +1,70 @@
+"""
+Compare table extraction backends on the Board of Review PDFs
+
+Extracts every FY PDF with each backend (bypassing the cache), turns the
+tables into CSV rows exactly as board_of_review.py does, and scores them
+against the checked-in board_of_review_<year>.csv files.
+
+Usage:
+    python benchmark_backends.py [--backends tabula pdfplumber]
+"""
+
+import argparse
+import csv
+import time
+
+from board_of_review import DIRECTORY, URLS, report_rows
+from extract import BACKENDS, TableExtractor
+
+
+def load_expected(year: int) -> list[list[str]]:
+    with open(DIRECTORY / f'board_of_review_{year}.csv', 'r', newline='') as f:
+        return list(csv.reader(f))[1:]
+
+
+def score(expected: list[list[str]], actual: list[list]) -> tuple[int, int]:
+    """Matching cells and total expected cells, comparing rows by position"""
+    total = sum(len(row) for row in expected)
+    matched = 0
+    for want, got in zip(expected, actual):
+        got = [str(cell) for cell in got]
+        matched += sum(1 for a, b in zip(want, got) if a == b)
+    return matched, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DHHR table extraction backends")
+    parser.add_argument('--backends', nargs='+', choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    args = parser.parse_args()
+
+    paths = [DIRECTORY / report['url'] for report in URLS]
+    print(f"{'backend':<12} {'seconds':>8} {'rows':>6} {'cells matched':>16} {'accuracy':>9}")
+
+    for backend in args.backends:
+        extractor = TableExtractor(backend, cache_dir=None)
+        start = time.perf_counter()
+        try:
+            tables = extractor.extract_all(paths)
+        except Exception as e:
+            print(f"{backend:<12} failed: {type(e).__name__}: {e}")
+            continue
+        elapsed = time.perf_counter() - start
+
+        matched = total = rows = 0
+        for report in URLS:
+            try:
+                actual = report_rows(report['year'], tables.get(DIRECTORY / report['url'], []))
+            except IndexError:
+                actual = []
+            expected = load_expected(report['year'])
+            m, t = score(expected, actual)
+            matched, total, rows = matched + m, total + t, rows + len(actual)
+
+        accuracy = matched / total if total else 0.0
+        print(f"{backend:<12} {elapsed:>8.2f} {rows:>6} {f'{matched}/{total}':>16} {accuracy:>9.1%}")
+        for path, error in extractor.failed.items():
+            print(f"{'':<12} failed on {path.name}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
-import requests
+import argparse
 import csv
-import tabula
 import re
-import time
+from pathlib import Path
+
+from extract import BACKENDS, CACHE_DIR, TableExtractor
+
+DIRECTORY = Path(__file__).resolve().parent
 
 URLS = [{'year': 2020, 'url': "FY 2020 Report by Category and Decision.pdf"}, {'year': 2019, 'url': 'FY 2019 Report by Category and Decision.pdf'},
 {'year': 2018, 'url': "FY 2018  Report by Category and Decision.pdf"}, { 'year': 2017, 'url': "FY 2017 Report by Category and Decision.pdf"},
@@ -13,23 +16,41 @@ HEADERS = ['year', 'categories', 'total_received', 'total_adjudicated', 'upheld'
 
 HEADERS_PRE_2016 = ['year', 'categories', 'total_received', 'total_adjudicated', 'upheld', 'reversed', 'total_written', 'abandoned', 'withdrawn_claimant_favor', 'withdrawn_no_change', 'dismissed', 'remanded', 'invalid']
 
-for report in URLS:
-    year = report['year']
 
-    json = tabula.read_pdf(report['url'], pages="all", output_format='json')
+def report_rows(year, tables):
+    # the data is in the second table when there is one; strip out empty
+    # rows and remove the bad header
+    table = tables[1] if len(tables) > 1 else tables[0]
+    rows = [r for r in table[2:-1] if r and r[0] != '']
+    return [[year] + [row[0]] + [re.sub("[^[0-9]", "", str(r)) for r in row[1:]] for row in rows]
 
-    # strip out empty rows and remove the bad header
-    try:
-        rows = [r for r in json[1]['data'][2:-1] if r[0]['text'] != '']
-    except:
-        rows = [r for r in json[0]['data'][2:-1] if r[0]['text'] != '']
 
-    with open(f'board_of_review_{year}.csv', 'w') as f:
+def write_report(year, rows):
+    with open(DIRECTORY / f'board_of_review_{year}.csv', 'w') as f:
         writer = csv.writer(f)
         if year > 2015:
             writer.writerow(HEADERS)
         else:
             writer.writerow(HEADERS_PRE_2016)
-        for row in rows:
-            category = row[0]['text']
-            writer.writerow([year] + [category] + [re.sub("[^[0-9]", "", str(r['text'])) for r in row[1:]])
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract Board of Review tables from the DHHR PDFs")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='pdfplumber')
+    parser.add_argument('--no-cache', action='store_true', help="Re-extract every PDF")
+    args = parser.parse_args(argv)
+
+    extractor = TableExtractor(args.backend, cache_dir=None if args.no_cache else CACHE_DIR)
+    tables = extractor.extract_all([DIRECTORY / report['url'] for report in URLS])
+
+    for report in URLS:
+        path = DIRECTORY / report['url']
+        if path in tables:
+            write_report(report['year'], report_rows(report['year'], tables[path]))
+        else:
+            print(f"Skipped {report['year']}: {path.name} could not be extracted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Table extraction for the Board of Review PDFs
+
+Extracts every table from a batch of PDFs with a pluggable backend and
+caches the parsed tables as JSON keyed by the PDF's SHA-256, so a PDF is only
+ever parsed once. Tables are returned as lists of rows of cell strings
+regardless of backend. A PDF the backend fails on is logged by name and left
+out of the results without losing the rest of the batch.
+
+Backends:
+    pdfplumber  pure Python, no JVM; PDFs are spread over a process pool
+                (the default)
+    tabula      tabula-py, which needs Java; all PDFs are read in this
+                process so the JVM is started once for the whole batch
+                (install jpype1 so tabula-py runs in-process rather than
+                spawning java per call)
+"""
+
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).resolve().parent / ".table_cache"
+
+Table = list[list[str]]
+
+
+def _tabula_tables(path: str) -> list[Table]:
+    import tabula
+
+    tables = tabula.read_pdf(path, pages="all", output_format='json')
+    return [[[str(cell['text']) for cell in row] for row in table['data']] for table in tables]
+
+
+def _pdfplumber_tables(path: str) -> list[Table]:
+    import pdfplumber
+
+    tables = []
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            for table in page.extract_tables():
+                tables.append([[cell or '' for cell in row] for row in table])
+    return tables
+
+
+def _extract_one(func: Callable[[str], list[Table]], path: str) -> tuple[list[Table], Optional[str]]:
+    """
+    Run a backend on one PDF, possibly in a worker process
+
+    Returns:
+        Tuple of (tables, error)
+    """
+    try:
+        return func(path), None
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
+
+
+BACKENDS = {
+    'tabula': (_tabula_tables, False),
+    'pdfplumber': (_pdfplumber_tables, True),
+}
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TableExtractor:
+    """Extracts and caches tables from many PDFs at once"""
+
+    def __init__(
+        self,
+        backend: str = 'pdfplumber',
+        cache_dir: Optional[Path] = CACHE_DIR,
+        max_workers: Optional[int] = None
+    ):
+        """
+        Initialize the extractor
+
+        Args:
+            backend: Name of a backend in BACKENDS
+            cache_dir: Where parsed tables are cached; None disables the cache
+            max_workers: Processes for backends that run in a pool
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, choose from {', '.join(BACKENDS)}")
+        self.backend = backend
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_workers = max_workers or os.cpu_count() or 1
+        if self.cache_dir:
+            self.cache_dir.mkdir(exist_ok=True)
+        # Error by path for the PDFs the last extract_all() could not parse
+        self.failed: dict[Path, str] = {}
+
+    def _cache_path(self, digest: str) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        return self.cache_dir / f"{digest}.{self.backend}.json"
+
+    def extract_all(self, paths: list[Path]) -> dict[Path, list[Table]]:
+        """
+        Extract tables from every PDF, using the cache where possible
+
+        Args:
+            paths: PDF files
+
+        Returns:
+            Tables for each path that was extracted; the others are in failed
+        """
+        results: dict[Path, list[Table]] = {}
+        pending: dict[Path, str] = {}
+        self.failed = {}
+
+        for path in paths:
+            digest = file_hash(path)
+            cached = self._cache_path(digest)
+            if cached and cached.exists():
+                results[path] = json.loads(cached.read_text())
+            else:
+                pending[path] = digest
+
+        logger.info(f"{len(results)} PDFs cached, extracting {len(pending)} with {self.backend}")
+        if pending:
+            func, parallel = BACKENDS[self.backend]
+            names = [str(path) for path in pending]
+            if parallel and len(names) > 1:
+                with ProcessPoolExecutor(max_workers=min(self.max_workers, len(names))) as pool:
+                    extracted = list(pool.map(_extract_one, [func] * len(names), names))
+            else:
+                # One process, so an in-process JVM is started once for the batch
+                extracted = [_extract_one(func, name) for name in names]
+
+            for (path, digest), (tables, error) in zip(pending.items(), extracted):
+                if error:
+                    logger.warning(f"Could not extract {path.name} with {self.backend}: {error}")
+                    self.failed[path] = error
+                    continue
+                cached = self._cache_path(digest)
+                if cached:
+                    tmp = cached.with_suffix('.tmp')
+                    tmp.write_text(json.dumps(tables))
+                    os.replace(tmp, cached)
+                results[path] = tables
+
+        if self.failed:
+            logger.warning(f"{len(self.failed)} of {len(paths)} PDFs failed: {', '.join(p.name for p in self.failed)}")
+        return {path: results[path] for path in paths if path in results}
@@ -0,0 +1,167 @@
+"""
+Normalize the Board of Review CSVs into one long-format fact table
+
+The yearly board_of_review_<year>.csv files come in two layouts (pre-2016
+files split withdrawn appeals into withdrawn_claimant_favor and
+withdrawn_no_change) and spell the same category many different ways. This
+maps every file onto:
+
+    categories  (category_id, name)
+    aliases     (raw_name, category_id)
+    facts       (year, category_id, measure, value)
+
+with integer values. Blank cells produce no fact. For pre-2016 years a
+withdrawn fact is also derived as the sum of the two split measures, so
+withdrawn can be compared across all years. wvu/build_db.py loads the
+result into wvu.db as board_of_review_categories,
+board_of_review_category_aliases and board_of_review_facts; running this
+module prints the category mapping for review.
+
+Usage:
+    python normalize.py
+"""
+
+import csv
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterator
+
+DIRECTORY = Path(__file__).resolve().parent
+
+MEASURES = [
+    'total_received', 'total_adjudicated', 'upheld', 'reversed', 'total_written',
+    'abandoned', 'withdrawn', 'withdrawn_claimant_favor', 'withdrawn_no_change',
+    'dismissed', 'remanded', 'invalid',
+]
+
+# Spellings that differ by more than punctuation, plurals or a trailing
+# "PROGRAM", mapped to the name used for the category
+ALIASES = {
+    "BUREAU FOR CHILD SUPPORT ENFORCEMENT": "BUREAU OF CHILD SUPPORT ENFORCEMENT",
+    "CERTIFIED NURSE AIDE": "CERTIFIED NURSING ASSISTANT",
+    "CERTIFIED-NURSE AIDE": "CERTIFIED NURSING ASSISTANT",
+    "CERTIFIED NURSING AIDE": "CERTIFIED NURSING ASSISTANT",
+    "EMEGENCY MEDICAL SERVICES": "EMERGENCY MEDICAL SERVICES",
+    "FEDERALLY FACILITATED MARKETPLACE - MEDICAID": "FEDERALLY FACILITATED MARKETPLACE",
+    "FEDERALLY-FACILITATED MARKETPLACE MEDICAID": "FEDERALLY FACILITATED MARKETPLACE",
+    "FINANCIAL ELIGIBILITY FOR LONG TERM CARE": "LONG-TERM CARE - FINANCIAL",
+    "FINANCIAL ELIGIBILITY FOR MEDICAID": "MEDICAID",
+    "FOSTER ARE": "FOSTER CARE",
+    "INTELLECTUAL AND DEVELOPMENT DISABILITIES WAIVER": "INTELLECTUAL DEVELOPMENTAL DISABILITIES",
+    "INTELLECTUAL DEVELOPMENT DISABILITIES PROGRAM": "INTELLECTUAL DEVELOPMENTAL DISABILITIES",
+    "INTELLECTUAL DEVELOPMENT DISABILITY PROGRAM": "INTELLECTUAL DEVELOPMENTAL DISABILITIES",
+    "INTERM. CARE FACILITIES FOR INDIVIDUALS W/INTELLECTUAL DISABILITIES": "INTERMEDIATE CARE FACILITIES FOR INDIV. W/INTELLECTUAL DISABILITIES",
+    "INTERMEDIATE CARE FACILITIES FOR IDD": "INTERMEDIATE CARE FACILITIES FOR INDIV. W/INTELLECTUAL DISABILITIES",
+    "INTERMEDIATE CARE FACILITY FOR INDIV/ WITH INTELLECTUAL DISABILITIES": "INTERMEDIATE CARE FACILITIES FOR INDIV. W/INTELLECTUAL DISABILITIES",
+    "INTERMEDIATE CARE FACILITY INDIV. W/INTELLECTUAL DISABILITIES": "INTERMEDIATE CARE FACILITIES FOR INDIV. W/INTELLECTUAL DISABILITIES",
+    "LONG-TERM CARE - MEDICAL ELIGIBILITY": "LONG-TERM CARE - MEDICAL",
+    "LONG-TERM CARE - MEDICAL ELIGIBLITY": "LONG-TERM CARE - MEDICAL",
+    "MEDICAL ELIGIBILITY FOR LONG TERM CARE": "LONG-TERM CARE - MEDICAL",
+    "NON-EMERGENCY MEDICAL ASSISTANCE PROGRAM": "NON-EMERGENCY MEDICAL TRANSPORTATION",
+    "NON-EMERGENCY TRANSPORTATION PROGRAM": "NON-EMERGENCY MEDICAL TRANSPORTATION",
+    "SNAP": "SUPPLEMENTAL NUTRITION ASSISTANCE PROGRAM",
+    "SPECIFIALIZED FOSTER CARE": "SPECIALIZED FOSTER CARE",
+    "SUPPLEMENTAL NUTRITION SERVICES PROGRAM": "SUPPLEMENTAL NUTRITION ASSISTANCE PROGRAM",
+    "TRAUMATIC BRAIN INJURY WAIVER": "TRAUMATIC BRAIN INJURY",
+    "TREASURY OFFSET PROGRAM - SNAP": "TREASURY OFFSET PROGRAM",
+    "WEST VIRGINIA CHILDREN'S HEALTH INSURANCE PROGRAM": "WV CHILDREN'S HEALTH INSURANCE PROGRAM",
+    "WEST VIRGINIA WORKS - CASH ASSISTANCE": "WV WORKS",
+    "WEST VIRGINIA WORKS - TANF": "WV WORKS",
+    "WIC": "WOMENS, INFANTS, AND CHILDREN",
+    "WV WORKS CASH ASSISTANCE": "WV WORKS",
+    "WVCHIP": "WV CHILDREN'S HEALTH INSURANCE PROGRAM",
+    "WVW": "WV WORKS",
+}
+
+
+def category_key(name: str) -> str:
+    """Key that is equal for spellings of the same category"""
+    name = name.strip().upper()
+    name = ALIASES.get(name, name)
+    name = re.sub(r"[-/.,']", ' ', name)
+    name = re.sub(r'\s+', ' ', name).strip()
+    name = re.sub(r' PROGRAM$', '', name)
+    return ' '.join(w[:-1] if w.endswith('S') and len(w) > 3 else w for w in name.split())
+
+
+def _integer(value: str):
+    digits = (value or '').strip()
+    return int(digits) if digits.isdigit() else None
+
+
+def report_files(directory: Path = DIRECTORY) -> list[Path]:
+    """Yearly CSVs, oldest first"""
+    return sorted(directory.glob('board_of_review_[0-9][0-9][0-9][0-9].csv'))
+
+
+def read_reports(directory: Path = DIRECTORY) -> Iterator[tuple[int, str, dict[str, int]]]:
+    """Yield (year, raw category, measures) for every row of every yearly CSV"""
+    for path in report_files(directory):
+        with open(path, 'r', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            for row in reader:
+                if len(row) < 2 or not row[1].strip():
+                    continue
+                # Extra trailing cells (2015) have no header and are ignored
+                values = dict(zip(header[2:], row[2:len(header)]))
+                measures = {
+                    name: number for name, value in values.items()
+                    if name in MEASURES and (number := _integer(value)) is not None
+                }
+                if 'withdrawn' not in header:
+                    split = [measures[m] for m in ('withdrawn_claimant_favor', 'withdrawn_no_change') if m in measures]
+                    if split:
+                        measures['withdrawn'] = sum(split)
+                yield int(row[0]), row[1].strip(), measures
+
+
+def normalize(directory: Path = DIRECTORY) -> tuple[list[tuple], list[tuple], list[tuple]]:
+    """
+    Build the category dimension and fact rows
+
+    Category IDs are assigned in order of first appearance, oldest year
+    first, so they stay stable as new years are added.
+
+    Returns:
+        Tuple of (categories, aliases, facts) row lists
+    """
+    ids: dict[str, int] = {}
+    names: dict[int, str] = {}
+    aliases: dict[str, int] = {}
+    facts: dict[tuple, int] = defaultdict(int)
+
+    for year, raw, measures in read_reports(directory):
+        key = category_key(raw)
+        if key not in ids:
+            ids[key] = len(ids) + 1
+        category_id = ids[key]
+        # Name categories after their most recent spelling
+        names[category_id] = ALIASES.get(raw.upper(), raw.upper())
+        aliases[raw] = category_id
+        for measure, value in measures.items():
+            facts[(year, category_id, measure)] += value
+
+    categories = sorted(names.items())
+    return (
+        categories,
+        sorted(aliases.items()),
+        [(*key, value) for key, value in sorted(facts.items())],
+    )
+
+
+def main():
+    categories, aliases, facts = normalize()
+    by_category = defaultdict(list)
+    for raw, category_id in aliases:
+        by_category[category_id].append(raw)
+
+    for category_id, name in categories:
+        spellings = [raw for raw in by_category[category_id] if raw.upper() != name]
+        print(f"{category_id:>3}  {name}" + (f"  <- {'; '.join(spellings)}" if spellings else ''))
+    print(f"{len(categories)} categories, {len(aliases)} spellings, {len(facts)} facts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Lobbying filing text extraction and full-text search
+
+Extracts text from every stored filing PDF on a process pool, skipping
+documents whose content hash has already been extracted, and indexes it in
+an SQLite FTS5 table alongside the filing's name, period and URL from
+lobbying_filings.csv. Each row of the filings table keeps the rowid of its
+full-text row, so re-indexing or removing a filing deletes that row directly
+instead of scanning the full-text table for its URL.
+
+Usage:
+    python extract_text.py extract
+    python extract_text.py search "coal severance"
+"""
+
+import argparse
+import csv
+import logging
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from wvu.blobstore import BlobStore
+from wvu.paths import dataset_dir
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    sha256 TEXT PRIMARY KEY,
+    pages INTEGER,
+    text TEXT,
+    error TEXT,
+    extracted_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS filings (
+    url TEXT PRIMARY KEY,
+    name TEXT,
+    period TEXT,
+    sha256 TEXT,
+    fts_rowid INTEGER
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS filings_fts USING fts5 (
+    name, period, url UNINDEXED, body
+);
+"""
+
+
+def extract_pdf_text(sha256: str, path: str) -> tuple[str, Optional[int], str, Optional[str]]:
+    """
+    Extract the text of one PDF; runs in a worker process
+
+    Returns:
+        Tuple of (sha256, page count, text, error)
+    """
+    try:
+        from pypdf import PdfReader
+
+        reader = PdfReader(path)
+        text = "\n".join(page.extract_text() or '' for page in reader.pages)
+        return sha256, len(reader.pages), text, None
+    except Exception as e:
+        return sha256, None, '', f"{type(e).__name__}: {e}"
+
+
+class TextExtractor:
+    """Extracts filing text into a full-text index"""
+
+    DATA_DIR = dataset_dir('lobbying')
+    CSV_FILE = DATA_DIR / "lobbying_filings.csv"
+    DOCUMENT_DIR = DATA_DIR / "documents"
+    INDEX_DB = DATA_DIR / "filings_text.db"
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Initialize the extractor
+
+        Args:
+            max_workers: Worker processes, defaulting to the number of CPUs
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.db = sqlite3.connect(self.INDEX_DB)
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(filings)")]
+        if columns and 'fts_rowid' not in columns:
+            # Indexes from before fts_rowid are rebuilt from the extracted texts
+            self.db.executescript("DROP TABLE filings; DROP TABLE IF EXISTS filings_fts;")
+        self.db.executescript(SCHEMA)
+
+    def load_filings(self) -> list[tuple[str, str, str]]:
+        """Load (name, period, url) rows from the filings CSV"""
+        with open(self.CSV_FILE, 'r', encoding='utf-8') as f:
+            return [tuple(row[:3]) for row in csv.reader(f) if len(row) >= 3]
+
+    def extract(self, documents: dict[str, Path]) -> int:
+        """
+        Extract text for documents not seen before
+
+        Args:
+            documents: Stored file path by content hash
+
+        Returns:
+            Number of documents extracted
+        """
+        done = {row[0] for row in self.db.execute("SELECT sha256 FROM texts")}
+        pending = [(sha, str(path)) for sha, path in documents.items() if sha not in done]
+        if not pending:
+            logger.info("No new documents to extract")
+            return 0
+
+        logger.info(f"Extracting {len(pending)} documents with {self.max_workers} processes")
+        start = time.monotonic()
+        extracted_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        failed = 0
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            shas, paths = zip(*pending)
+            chunksize = max(1, len(pending) // (self.max_workers * 4))
+            with self.db:
+                for sha, pages, text, error in pool.map(extract_pdf_text, shas, paths, chunksize=chunksize):
+                    if error:
+                        failed += 1
+                        logger.warning(f"Could not extract {sha[:12]}: {error}")
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO texts VALUES (?, ?, ?, ?, ?)",
+                        (sha, pages, text, error, extracted_at)
+                    )
+
+        logger.info(
+            f"Extracted {len(pending) - failed} documents ({failed} failed) "
+            f"in {time.monotonic() - start:.1f}s"
+        )
+        return len(pending)
+
+    def index(self, filings: list[tuple[str, str, str]], hashes: dict[str, str]) -> int:
+        """
+        Bring the full-text index in line with the filings and their documents
+
+        Filings dropped from the CSV, and ones whose document is no longer
+        in the store, are removed from the index.
+
+        Args:
+            filings: (name, period, url) rows
+            hashes: Content hash by URL of every filing with a stored document
+
+        Returns:
+            Number of filings (re)indexed
+        """
+        indexed = {}
+        rowids = {}
+        for url, name, period, sha, rowid in self.db.execute(
+            "SELECT url, name, period, sha256, fts_rowid FROM filings"
+        ):
+            indexed[url] = (name, period, sha)
+            rowids[url] = rowid
+        listed = {url for _, _, url in filings}
+        stale = [url for url in indexed if url not in listed or url not in hashes]
+        updated = 0
+
+        with self.db:
+            for url in stale:
+                self.db.execute("DELETE FROM filings_fts WHERE rowid = ?", (rowids[url],))
+                self.db.execute("DELETE FROM filings WHERE url = ?", (url,))
+
+            for name, period, url in filings:
+                sha = hashes.get(url)
+                if sha is None or indexed.get(url) == (name, period, sha):
+                    continue
+                row = self.db.execute("SELECT text FROM texts WHERE sha256 = ?", (sha,)).fetchone()
+                if row is None:
+                    continue
+
+                if url in rowids:
+                    self.db.execute("DELETE FROM filings_fts WHERE rowid = ?", (rowids[url],))
+                rowid = self.db.execute(
+                    "INSERT INTO filings_fts (name, period, url, body) VALUES (?, ?, ?, ?)",
+                    (name, period, url, row[0])
+                ).lastrowid
+                self.db.execute(
+                    "INSERT OR REPLACE INTO filings (url, name, period, sha256, fts_rowid) VALUES (?, ?, ?, ?, ?)",
+                    (url, name, period, sha, rowid)
+                )
+                updated += 1
+
+        logger.info(f"Indexed {updated} filings, removed {len(stale)}")
+        return updated
+
+    def search(self, query: str, limit: int = 20) -> list[tuple]:
+        """Full-text search; returns (name, period, url, snippet) rows by relevance"""
+        return self.db.execute(
+            "SELECT name, period, url, snippet(filings_fts, 3, '[', ']', '...', 12) "
+            "FROM filings_fts WHERE filings_fts MATCH ? ORDER BY rank LIMIT ?",
+            (query, limit)
+        ).fetchall()
+
+    def run(self) -> None:
+        """Main execution method"""
+        logger.info("Starting filing text extraction")
+
+        filings = self.load_filings()
+        store = BlobStore(self.DOCUMENT_DIR)
+        hashes = {}
+        documents = {}
+        for _, _, url in filings:
+            entry = store.lookup(url)
+            if entry is not None and store.object_path(entry['sha256']).exists():
+                hashes[url] = entry['sha256']
+                documents[entry['sha256']] = store.object_path(entry['sha256'])
+        store.close()
+
+        logger.info(f"{len(documents)} stored documents for {len(filings)} filings")
+        self.extract(documents)
+        self.index(filings, hashes)
+
+        logger.info("Extraction completed")
+
+
+def main(argv: Optional[list[str]] = None):
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Extract and search lobbying filing text")
+    commands = parser.add_subparsers(dest='command', required=True)
+    extract = commands.add_parser('extract', help="Extract text from new documents")
+    extract.add_argument('--workers', type=int, default=None, help="Worker processes")
+    search = commands.add_parser('search', help="Search the full-text index")
+    search.add_argument('query', help="FTS5 query")
+    search.add_argument('--limit', type=int, default=20, help="Maximum results")
+    args = parser.parse_args(argv)
+
+    if args.command == 'extract':
+        TextExtractor(max_workers=args.workers).run()
+        return
+
+    extractor = TextExtractor(max_workers=1)
+    start = time.perf_counter()
+    results = extractor.search(args.query, args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    for name, period, url, snippet in results:
+        print(f"{period}  {name}\n    {url}\n    {snippet}")
+    print(f"{len(results)} results in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
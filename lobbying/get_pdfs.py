@@ -1,17 +1,24 @@
 """
 Download PDFs from lobbying filings CSV
 
-This script reads the lobbying_filings.csv file and downloads all PDFs.
+This script reads the lobbying_filings.csv file and fetches all PDFs into the
+content-addressed document store.
 """
 
+import argparse
 import csv
 import logging
+import sys
 from pathlib import Path
+from typing import Optional
 
-import requests
-from pydantic import ValidationError
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from models import LobbyingFiling
+from models import LOBBYING_FILINGS, LobbyingFiling
+from wvu import metrics, profiling
+from wvu.blobstore import BlobStore
+from wvu.http import get_client
+from wvu.paths import dataset_dir
 
 # Configure logging
 logging.basicConfig(
@@ -24,18 +31,13 @@ logger = logging.getLogger(__name__)
 class PDFDownloader:
     """Downloads PDFs from a CSV file of lobbying filings"""
 
-    CSV_FILE = Path("lobbying_filings.csv")
-    PDF_DIR = Path("pdfs")
+    DATA_DIR = dataset_dir('lobbying')
+    CSV_FILE = DATA_DIR / "lobbying_filings.csv"
+    DOCUMENT_DIR = DATA_DIR / "documents"
 
-    def __init__(self):
-        self.session = requests.Session()
-        self.pdf_dir = self.PDF_DIR
-        self._ensure_pdf_directory()
-
-    def _ensure_pdf_directory(self) -> None:
-        """Create PDF directory if it doesn't exist"""
-        self.pdf_dir.mkdir(exist_ok=True)
-        logger.info(f"PDF directory: {self.pdf_dir}")
+    def __init__(self, max_workers: int = 4):
+        self.client = get_client()
+        self.store = BlobStore(self.DOCUMENT_DIR, self.client, max_workers=max_workers)
 
     def load_filings_from_csv(self) -> list[LobbyingFiling]:
         """
@@ -48,26 +50,20 @@ class PDFDownloader:
             logger.error(f"CSV file not found: {self.CSV_FILE}")
             raise FileNotFoundError(f"CSV file not found: {self.CSV_FILE}")
 
-        filings = []
-
         try:
             with open(self.CSV_FILE, 'r', encoding='utf-8') as f:
                 # CSV from lobbying_filings.py has no header
-                reader = csv.reader(f)
-                for row in reader:
+                rows = []
+                for row in csv.reader(f):
                     if len(row) >= 3:
-                        try:
-                            filing = LobbyingFiling(
-                                name=row[0],
-                                period=row[1],
-                                url=row[2]
-                            )
-                            filings.append(filing)
-                        except ValidationError as e:
-                            logger.warning(f"Invalid row: {row} - {e}")
+                        rows.append(row[:3])
                     else:
                         logger.warning(f"Skipping row with insufficient columns: {row}")
 
+            filings, rejected = LOBBYING_FILINGS.validate_rows(rows)
+            for row, error in rejected:
+                logger.warning(f"Invalid row: {row} - {error}")
+
             logger.info(f"Loaded {len(filings)} filings from CSV")
             return filings
 
@@ -77,53 +73,55 @@ class PDFDownloader:
 
     def download_pdf(self, filing: LobbyingFiling) -> bool:
         """
-        Download a PDF file
+        Fetch a PDF into the document store
 
         Args:
             filing: The filing to download
 
         Returns:
-            True if downloaded, False if skipped (already exists) or failed
+            True if a new or changed document was stored, False if unchanged or failed
         """
-        filepath = filing.get_filepath(self.pdf_dir)
-
-        if filepath.exists():
-            logger.debug(f"Skipped: {filepath.name} (already exists)")
-            return False
-
-        try:
-            response = self.session.get(filing.url, timeout=60)
-            response.raise_for_status()
+        return self.store.fetch(filing.url).status in ('new', 'changed')
 
-            filepath.write_bytes(response.content)
-            logger.info(f"Downloaded: {filepath.name}")
-            return True
-
-        except requests.RequestException as e:
-            logger.error(f"Failed to download {filing.url}: {e}")
-            logger.error(f"Status code: {getattr(e.response, 'status_code', 'N/A')}")
-            return False
+    def run(self, profile: bool = False) -> None:
+        """
+        Main execution method
 
-    def run(self) -> None:
-        """Main execution method"""
+        Args:
+            profile: Record a sampling profile of the run (see wvu.profiling)
+        """
         logger.info("Starting PDF downloader")
 
-        # Load filings from CSV
-        filings = self.load_filings_from_csv()
-
-        # Download PDFs
-        downloaded = 0
-        for filing in filings:
-            if self.download_pdf(filing):
-                downloaded += 1
+        with profiling.profiled('lobbying-pdfs', self.DATA_DIR, profile), metrics.RunMetrics('lobbying-pdfs'):
+            # Load filings from CSV
+            with metrics.stage('validate'):
+                filings = self.load_filings_from_csv()
+            metrics.count(records_parsed=len(filings))
+
+            # Download PDFs
+            results = self.store.fetch_all([filing.url for filing in filings])
+            downloaded = sum(1 for result in results if result.status in ('new', 'changed'))
+            metrics.count(
+                records_new=sum(1 for result in results if result.status == 'new'),
+                records_changed=sum(1 for result in results if result.status == 'changed'),
+                errors=sum(1 for result in results if result.status == 'failed')
+            )
 
         logger.info(f"Download complete. {downloaded} new PDFs downloaded.")
+        logger.info(f"HTTP: {self.client.stats.summary()}")
 
 
-def main():
+def main(argv: Optional[list[str]] = None):
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Fetch every filing PDF in lobbying_filings.csv")
+    parser.add_argument(
+        '--profile', action='store_true',
+        help="Record a sampling profile of the run in the dataset's profiles/ directory"
+    )
+    args = parser.parse_args(argv)
+
     downloader = PDFDownloader()
-    downloader.run()
+    downloader.run(profile=args.profile)
 
 
 if __name__ == "__main__":
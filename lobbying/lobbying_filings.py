@@ -2,8 +2,13 @@
 West Virginia Lobbying Filings Scraper
 
 Scrapes lobbying filings from the WV Ethics Commission website.
+
+lobbying_filings.csv accumulates every cycle scraped: a run merges its
+cycle's filings into the file by URL rather than replacing it, so the text
+index built from it (extract_text.py) covers all cycles.
 """
 
+import argparse
 import csv
 import logging
 import sys
@@ -11,9 +16,16 @@ from pathlib import Path
 from typing import Optional
 
 import requests
-from bs4 import BeautifulSoup
 
-from models import LobbyingFiling
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import LOBBYING_FILINGS, LobbyingFiling
+from wvu import metrics, profiling
+from wvu.blobstore import BlobStore
+from wvu.http import get_client
+from wvu.journal import atomic_write
+from wvu.parsing import parse_html
+from wvu.paths import dataset_dir
 
 # Configure logging
 logging.basicConfig(
@@ -27,25 +39,23 @@ class LobbyingFilingsScraper:
     """Scraper for WV lobbying filings"""
 
     BASE_URL = "https://ethics.wv.gov"
-    CSV_FILE = Path("lobbying_filings.csv")
-    PDF_DIR = Path("pdfs")
+    DATA_DIR = dataset_dir('lobbying')
+    CSV_FILE = DATA_DIR / "lobbying_filings.csv"
+    DOCUMENT_DIR = DATA_DIR / "documents"
 
-    def __init__(self, registration_cycle: str):
+    def __init__(self, registration_cycle: str, max_workers: int = 4):
         """
         Initialize the scraper
 
         Args:
             registration_cycle: The registration cycle (e.g., "2019-2020", "2021-2022")
+            max_workers: Maximum number of PDFs downloaded at once
         """
-        self.session = requests.Session()
+        self.client = get_client()
+        self.store = BlobStore(self.DOCUMENT_DIR, self.client, max_workers=max_workers)
         self.registration_cycle = registration_cycle
-        self.pdf_dir = self.PDF_DIR
-        self._ensure_pdf_directory()
-
-    def _ensure_pdf_directory(self) -> None:
-        """Create PDF directory if it doesn't exist"""
-        self.pdf_dir.mkdir(exist_ok=True)
-        logger.info(f"PDF directory: {self.pdf_dir}")
+        self.page_response: Optional[requests.Response] = None
+        self.failed = 0
 
     def _get_cycle_url(self) -> str:
         """
@@ -70,27 +80,18 @@ class LobbyingFilingsScraper:
         logger.info(f"Fetching filings from: {url}")
 
         try:
-            response = self.session.get(url, timeout=30)
+            response = self.client.get(url, cache=True)
             response.raise_for_status()
 
-            # Remove newlines for easier parsing
-            html = "".join(line.strip() for line in response.text.split('\n'))
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Find all links to PDF documents
-            links = [
-                x['href'] for x in soup.find_all('a')
-                if 'href' in x.attrs and 'SiteCollectionDocuments' in x['href']
-            ]
-
-            logger.info(f"Found {len(links)} filing links")
-
-            filings = []
-            for link in links:
-                filing = self._parse_filing_link(link)
-                if filing:
-                    filings.append(filing)
+            if response.unchanged:
+                logger.info("Cycle page unchanged since last run, skipping parse")
+                metrics.count(pages_unchanged=1)
+                return []
+            self.page_response = response
 
+            with metrics.stage('parse'):
+                filings = self.parse_filings(response.text)
+            metrics.count(records_parsed=len(filings))
             logger.info(f"Successfully parsed {len(filings)} filings")
             return filings
 
@@ -98,7 +99,35 @@ class LobbyingFilingsScraper:
             logger.error(f"Error fetching filings: {e}")
             raise
 
-    def _parse_filing_link(self, link: str) -> Optional[LobbyingFiling]:
+    @classmethod
+    def parse_filings(cls, html: str) -> list[LobbyingFiling]:
+        """
+        Parse the filings linked from a registration cycle page
+
+        Args:
+            html: Cycle page HTML
+
+        Returns:
+            List of LobbyingFiling objects
+        """
+        # Find all links to PDF documents; hrefs that wrap across lines are
+        # joined the way the page's lines are stripped and joined
+        hrefs = (
+            "".join(line.strip() for line in href.split('\n'))
+            for href in parse_html(html).xpath('//a/@href')
+        )
+        links = [href for href in hrefs if 'SiteCollectionDocuments' in href]
+
+        logger.info(f"Found {len(links)} filing links")
+
+        rows = [row for row in map(cls._parse_filing_link, links) if row]
+        filings, rejected = LOBBYING_FILINGS.validate_rows(rows)
+        for row, error in rejected:
+            logger.warning(f"Invalid filing {row}: {error}")
+        return filings
+
+    @classmethod
+    def _parse_filing_link(cls, link: str) -> Optional[tuple[str, str, str]]:
         """
         Parse a filing link to extract information
 
@@ -106,10 +135,10 @@ class LobbyingFilingsScraper:
             link: The href value from the link
 
         Returns:
-            LobbyingFiling object or None if parsing fails
+            (name, period, url) row, validated by the caller, or None if parsing fails
         """
         try:
-            url = self.BASE_URL + link
+            url = cls.BASE_URL + link
             parts = link.split('/')
 
             if len(parts) < 6:
@@ -126,7 +155,7 @@ class LobbyingFilingsScraper:
                 .upper()
             )
 
-            return LobbyingFiling(name=name, period=period, url=url)
+            return (name, period, url)
 
         except Exception as e:
             logger.warning(f"Error parsing link {link}: {e}")
@@ -134,7 +163,10 @@ class LobbyingFilingsScraper:
 
     def save_filings_to_csv(self, filings: list[LobbyingFiling]) -> None:
         """
-        Save filings to CSV file
+        Merge filings into the CSV file by URL
+
+        Rows from other cycles are kept; a filing already in the file is
+        replaced in place and new ones are appended.
 
         Args:
             filings: List of filings to save
@@ -144,90 +176,104 @@ class LobbyingFilingsScraper:
             return
 
         try:
-            with open(self.CSV_FILE, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.writer(f)
-                for filing in filings:
-                    writer.writerow(filing.to_list())
-
-            logger.info(f"Saved {len(filings)} filings to {self.CSV_FILE}")
+            with metrics.stage('write'):
+                rows = {}
+                if self.CSV_FILE.exists():
+                    with open(self.CSV_FILE, 'r', encoding='utf-8', newline='') as f:
+                        rows = {row[2]: row for row in csv.reader(f) if len(row) >= 3}
+                known = len(rows)
+                rows.update((filing.url, LOBBYING_FILINGS.as_row(filing)) for filing in filings)
+                with atomic_write(self.CSV_FILE, encoding='utf-8', newline='') as f:
+                    csv.writer(f).writerows(rows.values())
+
+            logger.info(f"Saved {len(filings)} filings to {self.CSV_FILE} ({len(rows) - known} new)")
         except Exception as e:
             logger.error(f"Error saving filings to CSV: {e}")
             raise
 
     def download_pdf(self, filing: LobbyingFiling) -> bool:
         """
-        Download a PDF file
+        Fetch a PDF into the document store
 
         Args:
             filing: The filing to download
 
         Returns:
-            True if downloaded, False if skipped (already exists) or failed
+            True if a new or changed document was stored, False if unchanged or failed
         """
-        filepath = filing.get_filepath(self.pdf_dir)
-
-        if filepath.exists():
-            logger.debug(f"Skipped: {filepath.name} (already exists)")
-            return False
-
-        try:
-            response = self.session.get(filing.url, timeout=60)
-            response.raise_for_status()
-
-            filepath.write_bytes(response.content)
-            logger.info(f"Downloaded: {filepath.name}")
-            return True
-
-        except requests.RequestException as e:
-            logger.error(f"Failed to download {filing.url}: {e}")
-            return False
+        return self.store.fetch(filing.url).status in ('new', 'changed')
 
     def download_all_pdfs(self, filings: list[LobbyingFiling]) -> int:
         """
-        Download all PDF files
+        Fetch all PDF files into the document store
 
         Args:
             filings: List of filings to download
 
         Returns:
-            Number of files downloaded (excluding skipped files)
+            Number of new or changed documents stored
         """
         logger.info(f"Downloading {len(filings)} PDFs...")
-        downloaded = 0
-
-        for filing in filings:
-            if self.download_pdf(filing):
-                downloaded += 1
+        results = self.store.fetch_all([filing.url for filing in filings])
+        downloaded = sum(1 for result in results if result.status in ('new', 'changed'))
+        self.failed = sum(1 for result in results if result.status == 'failed')
+        metrics.count(
+            records_new=sum(1 for result in results if result.status == 'new'),
+            records_changed=sum(1 for result in results if result.status == 'changed'),
+            errors=self.failed
+        )
 
         logger.info(f"Downloaded {downloaded} new PDFs")
         return downloaded
 
-    def run(self) -> None:
-        """Main execution method"""
+    def run(self, profile: bool = False) -> None:
+        """
+        Main execution method
+
+        Args:
+            profile: Record a sampling profile of the run (see wvu.profiling)
+        """
         logger.info(f"Starting lobbying filings scraper for cycle: {self.registration_cycle}")
 
-        # Fetch filings
-        filings = self.fetch_filings()
+        with profiling.profiled('lobbying', self.DATA_DIR, profile), metrics.RunMetrics('lobbying'):
+            # Fetch filings
+            filings = self.fetch_filings()
+            if not filings:
+                logger.info("No filings to process")
+                return
+
+            # Save to CSV
+            self.save_filings_to_csv(filings)
 
-        # Save to CSV
-        self.save_filings_to_csv(filings)
+            # Download PDFs
+            self.download_all_pdfs(filings)
 
-        # Download PDFs
-        self.download_all_pdfs(filings)
+            # Only trust the cycle page as processed when every PDF was stored,
+            # so failed downloads are retried on the next run
+            if not self.failed:
+                self.client.mark_processed(self.page_response)
+            else:
+                logger.warning(f"{self.failed} PDFs failed to download; they will be retried next run")
 
+        logger.info(f"HTTP: {self.client.stats.summary()}")
         logger.info("Scraper completed successfully")
 
 
-def main():
+def main(argv: Optional[list[str]] = None):
     """Main entry point"""
-    if len(sys.argv) != 2:
-        print("Usage: python lobbying_filings.py <registration_cycle>")
-        print("Example: python lobbying_filings.py 2021-2022")
-        sys.exit(1)
-
-    registration_cycle = sys.argv[1]
-    scraper = LobbyingFilingsScraper(registration_cycle)
-    scraper.run()
+    parser = argparse.ArgumentParser(
+        description="Scrape WV lobbying filings",
+        epilog="Example: python lobbying_filings.py 2021-2022"
+    )
+    parser.add_argument('registration_cycle', help="Registration cycle, e.g. 2021-2022")
+    parser.add_argument(
+        '--profile', action='store_true',
+        help="Record a sampling profile of the run in the dataset's profiles/ directory"
+    )
+    args = parser.parse_args(argv)
+
+    scraper = LobbyingFilingsScraper(args.registration_cycle)
+    scraper.run(profile=args.profile)
 
 
 if __name__ == "__main__":
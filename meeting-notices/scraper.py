@@ -1,17 +1,44 @@
 """
 West Virginia Meeting Notices Scraper
 
-Scrapes meeting notices from the WV Secretary of State website and saves them to CSV.
+Scrapes meeting notices from the WV Secretary of State website and saves them to
+one CSV per meeting month under meeting_notices/ (see wvu.partitions).
+
+Known notice IDs are looked up in a persistent key index (see wvu.keyindex)
+rather than read from the CSVs on every run. With --high-water, notices whose
+numeric ID is at or below the largest ID already saved are skipped without
+any lookups; notice IDs increase over time, but a notice that failed to parse
+in an earlier run stays skipped until the next run without --high-water.
+
+Each parsed notice is recorded in meetings.journal (see wvu.journal) as soon
+as its page is done. If a run fails, the next one takes those notices from
+the journal instead of fetching them again, and rolls back a half-finished
+append to the partitions before redoing it.
 """
 
-import csv
+import argparse
 import logging
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Annotated, NamedTuple, Optional
 
 import requests
-from bs4 import BeautifulSoup
-from pydantic import BaseModel, Field, field_validator
+from pydantic import AfterValidator, Field
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from wvu.fetch import ConcurrentFetcher
+from wvu import metrics, profiling
+from wvu.http import get_client
+from wvu.journal import Journal
+from wvu.keyindex import KeyIndex
+from wvu.parsing import parse_html, text, text_before
+from wvu.partitions import UNDATED, PartitionedCSV
+from wvu.paths import dataset_dir
+from wvu.records import RecordSchema
 
 # Configure logging
 logging.basicConfig(
@@ -21,151 +48,266 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class MeetingNotice(BaseModel):
+def clean_location(v: str) -> str:
+    """Clean up location text"""
+    return v.replace('\r\n', ' ').replace('  ', ' ').strip()
+
+
+@dataclass(slots=True)
+class MeetingNotice:
     """Schema for a meeting notice"""
-    id: str = Field(..., description="Unique identifier for the meeting notice")
-    date: str = Field(..., description="Meeting date")
-    time: str = Field(..., description="Meeting time")
-    agency: str = Field(..., description="Agency name")
-    subagency: Optional[str] = Field(None, description="Subagency name if applicable")
-    location: str = Field(..., description="Meeting location")
-    purpose: str = Field(..., description="Purpose of the meeting")
-    notes: str = Field(..., description="Additional notes")
-
-    @field_validator('location')
-    @classmethod
-    def clean_location(cls, v: str) -> str:
-        """Clean up location text"""
-        return v.replace('\r\n', ' ').replace('  ', ' ').strip()
-
-    def to_list(self) -> list:
-        """Convert to list for CSV writing"""
-        return [
-            self.id,
-            self.date,
-            self.time,
-            self.agency,
-            self.subagency,
-            self.location,
-            self.purpose,
-            self.notes
-        ]
+    id: Annotated[str, Field(description="Unique identifier for the meeting notice")]
+    date: Annotated[str, Field(description="Meeting date")]
+    time: Annotated[str, Field(description="Meeting time")]
+    agency: Annotated[str, Field(description="Agency name")]
+    subagency: Annotated[Optional[str], Field(description="Subagency name if applicable")]
+    location: Annotated[str, AfterValidator(clean_location), Field(description="Meeting location")]
+    purpose: Annotated[str, Field(description="Purpose of the meeting")]
+    notes: Annotated[str, Field(description="Additional notes")]
+
+
+MEETING_NOTICES = RecordSchema(MeetingNotice)
+
+
+def notice_partition(row: dict) -> str:
+    """Partition of a notice: the month of its meeting date (M/D/YYYY)"""
+    try:
+        return datetime.strptime(row['date'], '%m/%d/%Y').strftime('%Y-%m')
+    except ValueError:
+        return UNDATED
+
+
+class NoticeLink(NamedTuple):
+    """A detail link from the index page"""
+    href: Optional[str]
+    text: str
 
 
 class MeetingNoticesScraper:
     """Scraper for WV meeting notices"""
 
     BASE_URL = "http://apps.sos.wv.gov/adlaw/meetingnotices/"
-    CSV_FILE = Path("meeting_notices.csv")
-
-    def __init__(self):
-        self.session = requests.Session()
-        self.previous_ids: set[str] = set()
+    DATA_DIR = dataset_dir('meeting-notices')
+    NOTICES_DIR = DATA_DIR / "meeting_notices"
+    # Single-file CSV from before the notices were partitioned
+    LEGACY_CSV = DATA_DIR / "meeting_notices.csv"
+    JOURNAL_FILE = DATA_DIR / "meetings.journal"
+
+    def __init__(self, max_workers: int = 8, per_host: int = 4, high_water: bool = False):
+        """
+        Initialize the scraper
+
+        Args:
+            max_workers: Maximum number of detail pages fetched at once
+            per_host: Maximum number of concurrent requests to the SOS host
+            high_water: Skip notices whose ID is at or below the largest saved ID
+        """
+        self.client = get_client()
+        self.fetcher = ConcurrentFetcher(max_workers=max_workers, per_host=per_host)
+        self.high_water = high_water
+        self.notices: Optional[PartitionedCSV] = None
+        self.index: Optional[KeyIndex] = None
+        self.journal: Optional[Journal] = None
+        self.index_response: Optional[requests.Response] = None
+        self.failed = 0
 
     def load_existing_notices(self) -> None:
-        """Load existing notice IDs from CSV"""
-        if not self.CSV_FILE.exists():
-            logger.info("No existing CSV file found, creating new one")
-            self.CSV_FILE.write_text("id,date,time,agency,subagency,location,purpose,notes\n")
-            return
+        """Open the notice partitions and the index of their IDs, catching it up with them"""
+        # Replay a failed run's journal first, so a rolled-back append is not indexed
+        self.journal = Journal(self.JOURNAL_FILE)
+        self.notices = PartitionedCSV(self.NOTICES_DIR, MEETING_NOTICES.fields, notice_partition)
+        self.notices.migrate(self.LEGACY_CSV)
+        self.notices.save_manifest()
+        if not self.notices.exists():
+            logger.info("No existing notices found, starting a new dataset")
 
         try:
-            with open(self.CSV_FILE, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                self.previous_ids = {row['id'] for row in reader}
-            logger.info(f"Loaded {len(self.previous_ids)} existing notice IDs")
+            self.index = KeyIndex(self.notices, key=lambda row: row['id'])
+            logger.info(
+                f"Indexed {len(self.index)} existing notice IDs "
+                f"(high-water mark {self.index.high_water_mark()})"
+            )
         except Exception as e:
             logger.error(f"Error loading existing notices: {e}")
             raise
 
-    def fetch_page(self, url: str) -> BeautifulSoup:
-        """Fetch and parse a page"""
+    def known_ids(self, ids: list[Optional[str]]) -> set[str]:
+        """The given notice IDs that are already saved"""
+        if not self.high_water:
+            return self.index.existing(ids)
+        mark = self.index.high_water_mark()
+        if mark is None:
+            return set()
+        return {i for i in ids if i is not None and i.isdigit() and int(i) <= mark}
+
+    def fetch_page(self, url: str) -> str:
+        """Fetch a page's HTML"""
         try:
-            response = self.session.get(url, timeout=30)
+            response = self.client.get(url)
             response.raise_for_status()
-            return BeautifulSoup(response.text, 'html.parser')
+            return response.text
         except requests.RequestException as e:
             logger.error(f"Error fetching {url}: {e}")
             raise
 
-    def parse_meeting_notice(self, link) -> Optional[MeetingNotice]:
-        """Parse a single meeting notice from a link"""
+    @staticmethod
+    def extract_notice_id(href: str) -> Optional[str]:
+        """Get the notice ID from a detail link's query string"""
+        parts = href.split('=')
+        return parts[1] if len(parts) > 1 else None
+
+    def fetch_index(self) -> Optional[str]:
+        """Fetch the index page's HTML, or None if it has not changed"""
         try:
-            url = self.BASE_URL + link['href']
-            notice_id = url.split('=')[1]
+            response = self.client.get(self.BASE_URL, cache=True)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.error(f"Error fetching {self.BASE_URL}: {e}")
+            raise
+
+        if response.unchanged:
+            logger.info("Index page unchanged since last run, skipping parse")
+            metrics.count(pages_unchanged=1)
+            return None
+
+        self.index_response = response
+        return response.text
+
+    @staticmethod
+    def parse_index(html: str) -> Optional[list[NoticeLink]]:
+        """Detail links in the index page's results table, or None if it is missing"""
+        tables = parse_html(html).xpath('//table[@id="tableResults"]')
+        if not tables:
+            return None
+        return [NoticeLink(a.get('href'), text(a)) for a in tables[0].iter('a')]
+
+    @staticmethod
+    def parse_notice_page(html: str, notice_id: str, date: str, time: str) -> Optional[MeetingNotice]:
+        """
+        Parse a notice's detail page
+
+        Args:
+            html: Detail page HTML
+            notice_id: ID from the index link
+            date: Meeting date from the index link
+            time: Meeting time from the index link
+
+        Returns:
+            MeetingNotice, or None if the page lacks the detail cells
+        """
+        root = parse_html(html)
+
+        # Parse agency information
+        th = root.find('.//th')
+        h2 = th.find('.//h2') if th is not None else None
+        if h2 is not None:
+            br = h2.find('.//br')
+            agency = text_before(br) if br is not None else text(h2)
+            em_tags = h2.findall('.//em')
+            subagency = " ".join([text(x) for x in em_tags]) if em_tags else None
+        else:
+            agency = text(th) if th is not None else "Unknown"
+            subagency = None
+
+        # Parse details
+        details = list(islice(root.iter('td'), 4))
+        if len(details) < 4:
+            logger.warning(f"Insufficient details for notice {notice_id}")
+            return None
+
+        location_pre = details[1].find('.//pre')
+        location = text(location_pre) if location_pre is not None else text(details[1])
+
+        purpose_text = text(details[2])
+        purpose = purpose_text.split('Purpose: ')[1] if 'Purpose: ' in purpose_text else purpose_text
+
+        notes_text = text(details[3])
+        notes = notes_text.split('Notes: ')[1] if 'Notes: ' in notes_text else notes_text
+
+        return MEETING_NOTICES.create(
+            id=notice_id,
+            date=date,
+            time=time,
+            agency=agency,
+            subagency=subagency,
+            location=location,
+            purpose=purpose,
+            notes=notes
+        )
+
+    def parse_meeting_notice(self, link: NoticeLink) -> Optional[MeetingNotice]:
+        """Fetch and parse a single meeting notice from a link"""
+        try:
+            if link.href is None:
+                raise KeyError('href')
+            url = self.BASE_URL + link.href
+            notice_id = self.extract_notice_id(link.href)
 
             # Parse date and time from link text
             date, time = link.text.split(' -- ')
 
-            # Fetch the detail page
-            soup = self.fetch_page(url)
-
-            # Parse agency information
-            th = soup.find('th')
-            if th and th.find('h2'):
-                h2 = th.find('h2')
-                agency = h2.find('br').previous if h2.find('br') else h2.text
-                em_tags = h2.find_all('em')
-                subagency = " ".join([x.text for x in em_tags]) if em_tags else None
-            else:
-                agency = th.text if th else "Unknown"
-                subagency = None
-
-            # Parse details
-            details = soup.find_all('td')
-            if len(details) < 4:
-                logger.warning(f"Insufficient details for notice {notice_id}")
-                return None
-
-            location_pre = details[1].find('pre')
-            location = location_pre.text if location_pre else details[1].text
-
-            purpose_text = details[2].text
-            purpose = purpose_text.split('Purpose: ')[1] if 'Purpose: ' in purpose_text else purpose_text
-
-            notes_text = details[3].text
-            notes = notes_text.split('Notes: ')[1] if 'Notes: ' in notes_text else notes_text
-
-            return MeetingNotice(
-                id=notice_id,
-                date=date,
-                time=time,
-                agency=agency,
-                subagency=subagency,
-                location=location,
-                purpose=purpose,
-                notes=notes
-            )
+            html = self.fetch_page(url)
+            with metrics.stage('parse'):
+                notice = self.parse_notice_page(html, notice_id, date, time)
+            if notice is not None:
+                self.journal.record(notice.id, list(MEETING_NOTICES.as_row(notice)))
+            return notice
         except Exception as e:
-            logger.error(f"Error parsing meeting notice from {link.get('href', 'unknown')}: {e}")
+            logger.error(f"Error parsing meeting notice from {link.href or 'unknown'}: {e}")
             return None
 
     def scrape_notices(self) -> list[MeetingNotice]:
         """Scrape all meeting notices from the main page"""
         logger.info("Fetching meeting notices...")
 
-        soup = self.fetch_page(self.BASE_URL)
-        table = soup.find("table", {"id": "tableResults"})
+        # Notices parsed by a failed earlier run
+        resumed = MEETING_NOTICES.validate(self.journal.pages.values())
+
+        html = self.fetch_index()
+        if html is None:
+            return resumed
 
-        if not table:
+        with metrics.stage('parse'):
+            links = self.parse_index(html)
+        if links is None:
             logger.error("Could not find results table")
-            return []
+            return resumed
 
-        links = table.find_all('a')
         logger.info(f"Found {len(links)} meeting notice links")
 
-        notices = []
-        for link in links:
-            notice = self.parse_meeting_notice(link)
-            if notice:
-                notices.append(notice)
+        # Skip notices we already have before making any detail requests
+        pending = []
+        with metrics.stage('validate'):
+            ids = [self.extract_notice_id(link.href or '') for link in links]
+            seen = self.known_ids(ids) | {notice.id for notice in resumed}
+            for link, notice_id in zip(links, ids):
+                if notice_id in seen:
+                    continue
+                if notice_id is not None:
+                    seen.add(notice_id)
+                pending.append(link)
+
+        logger.info(
+            f"Skipping {len(links) - len(pending)} known notices "
+            f"({len(resumed)} from the journal), fetching {len(pending)} detail pages"
+        )
+
+        results = self.fetcher.map(
+            self.parse_meeting_notice,
+            pending,
+            url_for=lambda link: self.BASE_URL + (link.href or '')
+        )
+        notices = [notice for notice in results if notice]
+        self.failed = len(results) - len(notices)
+        metrics.count(records_parsed=len(notices), errors=self.failed)
 
         logger.info(f"Successfully parsed {len(notices)} notices")
-        return notices
+        return resumed + notices
 
     def save_new_notices(self, notices: list[MeetingNotice]) -> int:
         """Save new notices to CSV and return count of new notices"""
-        new_notices = [n for n in notices if n.id not in self.previous_ids]
+        known = self.index.existing(n.id for n in notices)
+        new_notices = [n for n in notices if n.id not in known]
 
         if not new_notices:
             logger.info("No new notices to save")
@@ -174,10 +316,9 @@ class MeetingNoticesScraper:
         logger.info(f"Saving {len(new_notices)} new notices")
 
         try:
-            with open(self.CSV_FILE, 'a', encoding='utf-8', newline='') as f:
-                writer = csv.writer(f)
-                for notice in new_notices:
-                    writer.writerow(notice.to_list())
+            rows = [MEETING_NOTICES.as_row(notice) for notice in new_notices]
+            with metrics.stage('write'), self.journal.writing(*self.notices.paths_for(rows)):
+                self.index.append(rows)
 
             logger.info(f"Successfully saved {len(new_notices)} new notices")
             return len(new_notices)
@@ -185,21 +326,58 @@ class MeetingNoticesScraper:
             logger.error(f"Error saving notices: {e}")
             raise
 
-    def run(self) -> None:
-        """Main execution method"""
+    def run(self, profile: bool = False) -> None:
+        """
+        Main execution method
+
+        Args:
+            profile: Record a sampling profile of the run (see wvu.profiling)
+        """
         logger.info("Starting meeting notices scraper")
 
-        self.load_existing_notices()
-        notices = self.scrape_notices()
-        new_count = self.save_new_notices(notices)
+        with profiling.profiled('meetings', self.DATA_DIR, profile), metrics.RunMetrics('meetings'):
+            with metrics.stage('validate'):
+                self.load_existing_notices()
+            try:
+                notices = self.scrape_notices()
+                new_count = self.save_new_notices(notices)
+                metrics.count(records_new=new_count)
+                self.journal.commit()
+            finally:
+                self.index.close()
+                self.journal.close()
+
+            # Only trust the index as processed when every detail page parsed
+            if self.index_response is not None and not self.failed:
+                self.client.mark_processed(self.index_response)
 
         logger.info(f"Scraper completed. {new_count} new notices added.")
+        logger.info(f"HTTP: {self.client.stats.summary()}")
 
 
-def main():
+def main(argv: Optional[list[str]] = None):
     """Main entry point"""
-    scraper = MeetingNoticesScraper()
-    scraper.run()
+    parser = argparse.ArgumentParser(description="Scrape WV meeting notices")
+    parser.add_argument(
+        '--workers', type=int, default=8,
+        help="Maximum number of detail pages fetched at once"
+    )
+    parser.add_argument(
+        '--per-host', type=int, default=4,
+        help="Maximum number of concurrent requests to the SOS host"
+    )
+    parser.add_argument(
+        '--high-water', action='store_true',
+        help="Skip notices whose ID is at or below the largest ID already saved"
+    )
+    parser.add_argument(
+        '--profile', action='store_true',
+        help="Record a sampling profile of the run in the dataset's profiles/ directory"
+    )
+    args = parser.parse_args(argv)
+
+    scraper = MeetingNoticesScraper(max_workers=args.workers, per_host=args.per_host, high_water=args.high_water)
+    scraper.run(profile=args.profile)
 
 
 if __name__ == "__main__":
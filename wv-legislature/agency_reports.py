@@ -2,16 +2,49 @@
 West Virginia Legislature Agency Reports Scraper
 
 Scrapes agency reports from the WV Legislature website and saves them to CSV.
+
+Years are fetched concurrently. In incremental mode a content fingerprint is
+kept per year and only years whose listing changed are re-parsed; daily runs
+can also limit themselves to the most recent years, with a full resweep of
+every year once the last one is more than a week old.
+
+Every run also records inserted, updated and deleted reports in an
+append-only change log, report_changes.db (see changelog.py).
+
+Each year's parsed listing is recorded in reports.journal (see wvu.journal)
+as soon as it is done. If a run fails, the next one takes those years from
+the journal instead of fetching them again, and rolls back a half-finished
+append to all_reports.csv before redoing it. new_reports.csv and the
+fingerprints are replaced atomically.
 """
 
+import argparse
 import csv
+import json
 import logging
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Annotated, Optional
 
 import requests
-from bs4 import BeautifulSoup
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import Field
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from changelog import ReportChangelog
+from wvu import metrics, profiling
+from wvu.blobstore import BlobStore
+from wvu.fetch import ConcurrentFetcher
+from wvu.http import get_client
+from wvu.journal import Journal, atomic_write
+from wvu.keyindex import KeyIndex
+from wvu.parsing import parse_html, text
+from wvu.paths import dataset_dir
+from wvu.records import RecordSchema
 
 # Configure logging
 logging.basicConfig(
@@ -21,16 +54,16 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class AgencyReport(BaseModel):
+@dataclass(slots=True)
+class AgencyReport:
     """Schema for an agency report"""
-    agency: str = Field(..., description="Agency name")
-    title: str = Field(..., description="Report title")
-    year: str = Field(..., description="Report year")
-    url: str = Field(..., description="Report URL")
+    agency: Annotated[str, Field(description="Agency name")]
+    title: Annotated[str, Field(description="Report title")]
+    year: Annotated[str, Field(description="Report year")]
+    url: Annotated[str, Field(description="Report URL")]
+
 
-    def to_list(self) -> list:
-        """Convert to list for CSV writing"""
-        return [self.agency, self.title, self.year, self.url]
+AGENCY_REPORTS = RecordSchema(AgencyReport)
 
 
 class AgencyReportsScraper:
@@ -38,106 +71,223 @@ class AgencyReportsScraper:
 
     BASE_URL = "http://www.wvlegislature.gov"
     REPORTS_URL = f"{BASE_URL}/Reports/Agency_Reports/agencylist_all.cfm"
-    ALL_REPORTS_CSV = Path("all_reports.csv")
-    NEW_REPORTS_CSV = Path("new_reports.csv")
-
-    def __init__(self, start_year: int = 2001, end_year: int = 2025):
+    DATA_DIR = dataset_dir('wv-legislature')
+    ALL_REPORTS_CSV = DATA_DIR / "all_reports.csv"
+    NEW_REPORTS_CSV = DATA_DIR / "new_reports.csv"
+    FINGERPRINTS_FILE = DATA_DIR / "year_fingerprints.json"
+    CHANGELOG_DB = DATA_DIR / "report_changes.db"
+    JOURNAL_FILE = DATA_DIR / "reports.journal"
+    DOCUMENT_DIR = DATA_DIR / "documents"
+
+    def __init__(
+        self,
+        start_year: int = 2001,
+        end_year: int = 2025,
+        max_workers: int = 6,
+        incremental: bool = False,
+        recent_years: Optional[int] = None,
+        full_sweep_days: int = 7
+    ):
         """
         Initialize the scraper
 
         Args:
             start_year: First year to scrape (inclusive)
             end_year: Last year to scrape (exclusive)
+            max_workers: Maximum number of years fetched at once
+            incremental: Only re-parse years whose listing changed
+            recent_years: In incremental mode, only fetch this many of the latest years
+            full_sweep_days: In incremental mode, fetch every year once the last
+                full sweep is older than this
         """
-        self.session = requests.Session()
+        self.client = get_client()
+        self.fetcher = ConcurrentFetcher(max_workers=max_workers, per_host=max_workers)
         self.start_year = start_year
         self.end_year = end_year
-        self.previous_urls: set[str] = set()
+        self.incremental = incremental
+        self.recent_years = recent_years
+        self.full_sweep_days = full_sweep_days
+        self.index: Optional[KeyIndex] = None
+        self.journal: Optional[Journal] = None
+        self.fingerprints: dict[str, str] = {}
+        self.last_full_sweep: Optional[datetime] = None
+        self.new_fingerprints: dict[str, str] = {}
+        self.failed_years: list[int] = []
+        self.unchanged_years: list[int] = []
+        # Listing year each scraped report URL came from
+        self.report_years: dict[str, int] = {}
+
+    @staticmethod
+    def report_key(row: dict) -> Optional[str]:
+        """A report row's URL, or None for placeholders and repeated header rows"""
+        url = row['url']
+        return url if url and url not in ('url', 'No Report') else None
 
     def load_existing_reports(self) -> None:
-        """Load existing report URLs from CSV"""
+        """Open the index of existing report URLs, catching it up with the CSV"""
+        # Replay a failed run's journal first, so a rolled-back append is not indexed
+        self.journal = Journal(self.JOURNAL_FILE)
         if not self.ALL_REPORTS_CSV.exists():
             logger.info("No existing CSV file found, creating new one")
             self.ALL_REPORTS_CSV.write_text("agency,title,year,url\n")
-            return
 
         try:
-            with open(self.ALL_REPORTS_CSV, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                self.previous_urls = {
-                    row['url'] for row in reader
-                    if row['url'] and row['url'] != 'No Report'
-                }
-            logger.info(f"Loaded {len(self.previous_urls)} existing report URLs")
+            self.index = KeyIndex(self.ALL_REPORTS_CSV, self.report_key, AGENCY_REPORTS.fields)
+            logger.info(f"Indexed {len(self.index)} existing report URLs")
         except Exception as e:
             logger.error(f"Error loading existing reports: {e}")
             raise
 
+    def load_fingerprints(self) -> None:
+        """Load per-year content fingerprints from the last incremental run"""
+        if not self.FINGERPRINTS_FILE.exists():
+            return
+
+        state = json.loads(self.FINGERPRINTS_FILE.read_text())
+        self.fingerprints = state.get('years', {})
+        if state.get('last_full_sweep'):
+            self.last_full_sweep = datetime.fromisoformat(state['last_full_sweep'])
+        logger.info(f"Loaded fingerprints for {len(self.fingerprints)} years")
+
+    def save_fingerprints(self, full_sweep: bool) -> None:
+        """Record fingerprints for years that were fetched successfully"""
+        self.fingerprints.update(self.new_fingerprints)
+        if full_sweep and not self.failed_years:
+            self.last_full_sweep = datetime.now(timezone.utc)
+
+        state = {
+            'last_full_sweep': self.last_full_sweep.isoformat() if self.last_full_sweep else None,
+            'years': dict(sorted(self.fingerprints.items()))
+        }
+        with atomic_write(self.FINGERPRINTS_FILE) as f:
+            f.write(json.dumps(state, indent=2) + "\n")
+
+    def full_sweep_due(self) -> bool:
+        """Whether this run should fetch every year"""
+        if not self.incremental or not self.recent_years:
+            return True
+        if self.last_full_sweep is None:
+            return True
+        return datetime.now(timezone.utc) - self.last_full_sweep > timedelta(days=self.full_sweep_days)
+
+    def years_to_fetch(self) -> list[int]:
+        """Years to request on this run"""
+        years = list(range(self.start_year, self.end_year))
+        if self.full_sweep_due():
+            return years
+        return years[-self.recent_years:]
+
     def fetch_reports_for_year(self, year: int) -> list[AgencyReport]:
         """
         Fetch reports for a specific year
 
+        In incremental mode, a year whose listing matches its stored
+        fingerprint is not parsed and yields no reports.
+
         Args:
             year: The year to fetch reports for
 
         Returns:
             List of AgencyReport objects
         """
+        resumed = self.journal.get(str(year))
+        if resumed is not None:
+            logger.info(f"Year {year} taken from the journal")
+            if resumed['unchanged']:
+                self.unchanged_years.append(year)
+                return []
+            self.new_fingerprints[str(year)] = resumed['hash']
+            return AGENCY_REPORTS.validate(resumed['records'])
+
         logger.info(f"Fetching reports for year {year}")
-        reports = []
 
         try:
-            response = self.session.post(
+            response = self.client.post(
                 self.REPORTS_URL,
                 data={'report_year': year},
-                timeout=30
+                cache=True
             )
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-            rows = soup.find_all('tr')[1:-1]  # Skip header and footer rows
-
-            for row in rows:
-                try:
-                    cells = row.find_all('td')
-                    if len(cells) < 3:
-                        continue
-
-                    agency = cells[0].text.strip()
-                    title = cells[1].text.strip()
-                    year_str = cells[2].text.strip()
-
-                    # Check if there's a link
-                    link = row.find('a')
-                    if link and 'href' in link.attrs:
-                        url = self.BASE_URL + link['href']
-                        reports.append(
-                            AgencyReport(
-                                agency=agency,
-                                title=title,
-                                year=year_str,
-                                url=url
-                            )
-                        )
-                except Exception as e:
-                    logger.warning(f"Error parsing row in year {year}: {e}")
-                    continue
+            if self.incremental and self.fingerprints.get(str(year)) == response.content_hash:
+                logger.info(f"Year {year} unchanged since last run, skipping parse")
+                metrics.count(pages_unchanged=1)
+                self.unchanged_years.append(year)
+                self.journal.record(str(year), {'hash': response.content_hash, 'unchanged': True})
+                return []
 
+            with metrics.stage('parse'):
+                reports = self.parse_year_listing(response.text, year)
             logger.info(f"Found {len(reports)} reports for year {year}")
+            self.new_fingerprints[str(year)] = response.content_hash
+            self.journal.record(str(year), {
+                'hash': response.content_hash,
+                'unchanged': False,
+                'records': [list(AGENCY_REPORTS.as_row(report)) for report in reports],
+            })
             return reports
 
         except requests.RequestException as e:
             logger.error(f"Error fetching reports for year {year}: {e}")
+            self.failed_years.append(year)
+            metrics.count(errors=1)
             return []
 
-    def scrape_all_reports(self) -> list[AgencyReport]:
-        """Scrape reports for all configured years"""
-        logger.info(f"Scraping reports from {self.start_year} to {self.end_year-1}")
-        all_reports = []
+    @classmethod
+    def parse_year_listing(cls, html: str, year: int) -> list[AgencyReport]:
+        """
+        Parse the reports table returned for one year
+
+        Args:
+            html: Listing page HTML
+            year: The year requested, for log messages
 
-        for year in range(self.start_year, self.end_year):
-            reports = self.fetch_reports_for_year(year)
-            all_reports.extend(reports)
+        Returns:
+            List of AgencyReport objects for rows that link to a report
+        """
+        records = []
+        rows = list(parse_html(html).iter('tr'))[1:-1]  # Skip header and footer rows
+
+        for row in rows:
+            try:
+                cells = list(islice(row.iter('td'), 3))
+                if len(cells) < 3:
+                    continue
+
+                agency = text(cells[0]).strip()
+                title = text(cells[1]).strip()
+                year_str = text(cells[2]).strip()
+
+                # Check if there's a link
+                link = row.find('.//a')
+                if link is not None and link.get('href') is not None:
+                    url = cls.BASE_URL + link.get('href')
+                    records.append((agency, title, year_str, url))
+            except Exception as e:
+                logger.warning(f"Error parsing row in year {year}: {e}")
+                continue
+
+        reports, rejected = AGENCY_REPORTS.validate_rows(records)
+        for record, error in rejected:
+            logger.warning(f"Error parsing row in year {year}: {record}: {error}")
+        return reports
+
+    def scrape_all_reports(self, years: Optional[list[int]] = None) -> list[AgencyReport]:
+        """Scrape reports for the given years, defaulting to all configured years"""
+        if years is None:
+            years = list(range(self.start_year, self.end_year))
+        logger.info(f"Scraping reports for {len(years)} years ({years[0]}-{years[-1]})")
+
+        results = self.fetcher.map(
+            self.fetch_reports_for_year,
+            years,
+            url_for=lambda year: self.REPORTS_URL
+        )
+        all_reports = []
+        for year, reports in zip(years, results):
+            for report in reports:
+                self.report_years.setdefault(report.url, year)
+                all_reports.append(report)
 
         logger.info(f"Total reports scraped: {len(all_reports)}")
         return all_reports
@@ -156,7 +306,7 @@ class AgencyReportsScraper:
         all_urls = {r.url for r in reports}
 
         # Find new URLs
-        new_urls = all_urls - self.previous_urls
+        new_urls = all_urls - self.index.existing(all_urls)
 
         # Filter reports to only include new ones
         new_reports = [r for r in reports if r.url in new_urls]
@@ -182,51 +332,177 @@ class AgencyReportsScraper:
             logger.info(f"No reports to save to {filepath}")
             return
 
-        mode = 'a' if append else 'w'
+        write_header = not append or not filepath.exists()
+        if append:
+            opened = open(filepath, 'a', encoding='utf-8', newline='')
+        else:
+            opened = atomic_write(filepath, encoding='utf-8', newline='')
 
         try:
-            with open(filepath, mode, encoding='utf-8', newline='') as f:
+            with metrics.stage('write'), opened as f:
                 writer = csv.writer(f)
 
                 # Write header if creating new file
-                if not append or not filepath.exists():
+                if write_header:
                     writer.writerow(['agency', 'title', 'year', 'url'])
 
-                for report in reports:
-                    writer.writerow(report.to_list())
+                AGENCY_REPORTS.write(writer, reports)
 
             logger.info(f"Successfully saved {len(reports)} reports to {filepath}")
         except Exception as e:
             logger.error(f"Error saving reports to {filepath}: {e}")
             raise
 
-    def run(self) -> None:
-        """Main execution method"""
-        logger.info("Starting agency reports scraper")
+    def record_changes(self, reports: list[AgencyReport], complete: bool) -> Counter:
+        """
+        Log inserted, updated and deleted reports in the change log
+
+        An empty change log is first seeded from all_reports.csv, so that its
+        history starts with every report already known. Reports known from
+        years whose listing was unchanged are carried forward, so they are
+        not taken for deletes.
+
+        Args:
+            reports: Every report scraped this run
+            complete: Whether every year was fetched without errors, so that
+                missing reports count as deleted
+
+        Returns:
+            Counter of change events by op
+        """
+        changelog = ReportChangelog(self.CHANGELOG_DB)
+        try:
+            if changelog.is_empty() and self.ALL_REPORTS_CSV.exists():
+                with open(self.ALL_REPORTS_CSV, 'r', encoding='utf-8', newline='') as f:
+                    seeded = changelog.apply(
+                        ((row['agency'], row['title'], row['year'], row['url'])
+                         for row in csv.DictReader(f) if self.report_key(row)),
+                        complete=False
+                    )
+                logger.info(f"Seeded change log with {seeded['insert']} reports from {self.ALL_REPORTS_CSV.name}")
+
+            records = [AGENCY_REPORTS.as_row(report) for report in reports]
+            if self.unchanged_years:
+                carried = changelog.known_reports(self.unchanged_years)
+                logger.info(f"Carried {len(carried)} known reports forward from {len(self.unchanged_years)} unchanged years")
+                records.extend(carried)
+            changes = changelog.apply(records, complete=complete, listing_years=self.report_years)
+        finally:
+            changelog.close()
+
+        logger.info(
+            f"Change log: {changes['insert']} inserted, {changes['update']} updated, "
+            f"{changes['delete']} deleted" + ("" if complete else " (partial scrape, deletes not checked)")
+        )
+        return changes
+
+    def archive_reports(self) -> int:
+        """
+        Fetch every report PDF in all_reports.csv into the document store
 
-        # Load existing reports
-        self.load_existing_reports()
+        Returns:
+            Number of new or changed documents stored
+        """
+        with open(self.ALL_REPORTS_CSV, 'r', encoding='utf-8') as f:
+            urls = [url for url in map(self.report_key, csv.DictReader(f)) if url]
 
-        # Scrape all reports
-        all_reports = self.scrape_all_reports()
+        store = BlobStore(self.DOCUMENT_DIR, self.client)
+        results = store.fetch_all(urls)
+        store.close()
+        return sum(1 for result in results if result.status in ('new', 'changed'))
 
-        # Filter for new reports
-        new_reports = self.filter_new_reports(all_reports)
+    def run(self, profile: bool = False) -> None:
+        """
+        Main execution method
 
-        # Save new reports to separate file
-        self.save_reports(new_reports, self.NEW_REPORTS_CSV, append=False)
+        Args:
+            profile: Record a sampling profile of the run (see wvu.profiling)
+        """
+        logger.info("Starting agency reports scraper")
 
-        # Append new reports to all reports file
-        if new_reports:
-            self.save_reports(new_reports, self.ALL_REPORTS_CSV, append=True)
+        with profiling.profiled('reports', self.DATA_DIR, profile), metrics.RunMetrics('reports'):
+            # Load existing reports
+            with metrics.stage('validate'):
+                self.load_existing_reports()
+
+            try:
+                if self.incremental:
+                    self.load_fingerprints()
+                full_sweep = self.full_sweep_due()
+
+                # Scrape all reports
+                years = self.years_to_fetch()
+                all_reports = self.scrape_all_reports(years)
+
+                # Filter for new reports
+                with metrics.stage('validate'):
+                    new_reports = self.filter_new_reports(all_reports)
+                metrics.count(records_parsed=len(all_reports), records_new=len(new_reports))
+
+                # Save new reports to separate file
+                self.save_reports(new_reports, self.NEW_REPORTS_CSV, append=False)
+
+                # Append new reports to all reports file, recording their URLs in the index
+                if new_reports:
+                    with metrics.stage('write'), self.journal.writing(self.ALL_REPORTS_CSV):
+                        self.index.append(map(AGENCY_REPORTS.as_row, new_reports))
+                    logger.info(f"Successfully saved {len(new_reports)} reports to {self.ALL_REPORTS_CSV}")
+
+                with metrics.stage('write'):
+                    complete = len(years) == self.end_year - self.start_year and not self.failed_years
+                    changes = self.record_changes(all_reports, complete)
+                metrics.count(records_changed=changes['update'] + changes['delete'])
+
+                if self.incremental:
+                    self.save_fingerprints(full_sweep)
+                self.journal.commit()
+            finally:
+                self.index.close()
+                self.journal.close()
 
         logger.info(f"Scraper completed. {len(new_reports)} new reports added.")
+        logger.info(f"HTTP: {self.client.stats.summary()}")
 
 
-def main():
+def main(argv: Optional[list[str]] = None):
     """Main entry point"""
-    scraper = AgencyReportsScraper(start_year=2001, end_year=2025)
-    scraper.run()
+    parser = argparse.ArgumentParser(description="Scrape WV Legislature agency reports")
+    parser.add_argument('--workers', type=int, default=6, help="Years fetched at once")
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help="Only re-parse years whose listing changed since the last run"
+    )
+    parser.add_argument(
+        '--recent', type=int, default=None, metavar='N',
+        help="With --incremental, only fetch the latest N years between full sweeps"
+    )
+    parser.add_argument(
+        '--full-sweep-days', type=int, default=7,
+        help="With --recent, fetch every year when the last full sweep is older than this"
+    )
+    parser.add_argument(
+        '--archive', action='store_true',
+        help="Also fetch every report PDF into the content-addressed document store"
+    )
+    parser.add_argument(
+        '--profile', action='store_true',
+        help="Record a sampling profile of the run in the dataset's profiles/ directory"
+    )
+    args = parser.parse_args(argv)
+
+    scraper = AgencyReportsScraper(
+        start_year=2001,
+        end_year=2025,
+        max_workers=args.workers,
+        incremental=args.incremental,
+        recent_years=args.recent,
+        full_sweep_days=args.full_sweep_days
+    )
+    scraper.run(profile=args.profile)
+
+    if args.archive:
+        archived = scraper.archive_reports()
+        logger.info(f"Archived {archived} new or changed report PDFs")
 
 
 if __name__ == "__main__":
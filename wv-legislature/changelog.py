@@ -0,0 +1,269 @@
+"""
+Change log for agency reports
+
+Reports are keyed by URL. Every scrape is compared with the last known
+version of each report by a hash of its full record, and the differences are
+appended to the report_changes table:
+
+    insert   a URL not seen before, or one that reappeared after a delete
+    update   a known URL whose agency, title or year changed
+    delete   a known URL missing from a complete scrape
+
+Deletes are only inferred when the scrape covered every year with no failed
+years, since a partial scrape says nothing about the reports it did not
+reach. Each report remembers the year whose listing it was scraped from
+(listing_year), so an incremental run that skips unchanged years can carry
+their known reports forward (known_reports) and still detect deletes in the
+rest. report_changes is append-only: triggers reject UPDATE and DELETE.
+Its seq column increases with every event, so consumers can poll by time
+(changes_since) or by the last seq they saw (changes_after); both are index
+range scans.
+
+Usage:
+    python changelog.py since 2024-01-01T00:00:00+00:00 [--db report_changes.db]
+    python changelog.py after SEQ [--db report_changes.db]
+"""
+
+import argparse
+import csv
+import hashlib
+import re
+import sqlite3
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    url TEXT PRIMARY KEY,
+    agency TEXT,
+    title TEXT,
+    year TEXT,
+    listing_year INTEGER,
+    hash TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    deleted_at TEXT
+);
+CREATE TABLE IF NOT EXISTS report_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    changed_at TEXT NOT NULL,
+    op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete')),
+    url TEXT NOT NULL,
+    agency TEXT,
+    title TEXT,
+    year TEXT,
+    hash TEXT,
+    previous_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS report_changes_changed_at ON report_changes (changed_at);
+CREATE INDEX IF NOT EXISTS report_changes_url ON report_changes (url, seq);
+CREATE TRIGGER IF NOT EXISTS report_changes_no_update BEFORE UPDATE ON report_changes
+BEGIN SELECT RAISE(ABORT, 'report_changes is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS report_changes_no_delete BEFORE DELETE ON report_changes
+BEGIN SELECT RAISE(ABORT, 'report_changes is append-only'); END;
+"""
+
+FIELDS = ["seq", "changed_at", "op", "url", "agency", "title", "year", "hash", "previous_hash"]
+
+
+class Change(NamedTuple):
+    """An event in the change log"""
+    seq: int
+    changed_at: str
+    op: str
+    url: str
+    agency: Optional[str]
+    title: Optional[str]
+    year: Optional[str]
+    hash: Optional[str]
+    previous_hash: Optional[str]
+
+
+def listing_year(year: str) -> Optional[int]:
+    """Listing year of a report known only by its year text, e.g. 'Fiscal Year 2024'"""
+    match = re.search(r'\b(\d{4})\b', year or '')
+    return int(match.group(1)) if match else None
+
+
+def record_hash(agency: str, title: str, year: str, url: str) -> str:
+    """Hash of a report's full record"""
+    return hashlib.sha256("\x1f".join((agency, title, year, url)).encode('utf-8')).hexdigest()
+
+
+def timestamp(value: Union[str, datetime]) -> str:
+    """A time in the log's format (UTC, seconds); naive times are taken as UTC"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec='seconds')
+
+
+class ReportChangelog:
+    """Latest version of every agency report and the log of changes to them"""
+
+    def __init__(self, path: Path = Path("report_changes.db")):
+        """
+        Open (and create if needed) the change log
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = Path(path)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(reports)")]
+        if 'listing_year' not in columns:
+            # Logs created before listing years were kept: infer them from the year text
+            with self.db:
+                self.db.execute("ALTER TABLE reports ADD COLUMN listing_year INTEGER")
+                self.db.create_function('listing_year', 1, listing_year)
+                self.db.execute("UPDATE reports SET listing_year = listing_year(year)")
+
+    def is_empty(self) -> bool:
+        """Whether no report has been recorded yet"""
+        return self.db.execute("SELECT 1 FROM reports LIMIT 1").fetchone() is None
+
+    def known_reports(self, years: Iterable[int]) -> list[tuple]:
+        """
+        Current reports from the given listing years, plus those whose listing year is unknown
+
+        Returns:
+            (agency, title, year, url) tuples
+        """
+        years = list(years)
+        return self.db.execute(
+            "SELECT agency, title, year, url FROM reports WHERE deleted_at IS NULL "
+            f"AND (listing_year IS NULL OR listing_year IN ({', '.join('?' for _ in years)}))",
+            years
+        ).fetchall()
+
+    def apply(
+        self,
+        records: Iterable[tuple],
+        complete: bool,
+        listing_years: Optional[dict[str, int]] = None
+    ) -> Counter:
+        """
+        Record the changes between a scrape and the known reports in one transaction
+
+        Args:
+            records: (agency, title, year, url) tuples; the first record for a URL wins
+            complete: Whether the scrape covered every report, so that known
+                reports missing from it are recorded as deleted
+            listing_years: Year of the listing each URL was scraped from; for
+                URLs not in it, the listing year is kept or inferred from the year text
+
+        Returns:
+            Counter of events by op
+        """
+        changed_at = timestamp(datetime.now(timezone.utc))
+        scraped: dict[str, tuple] = {}
+        for agency, title, year, url in records:
+            scraped.setdefault(url, (agency, title, year))
+
+        known = {
+            url: (hash, deleted_at)
+            for url, hash, deleted_at in self.db.execute("SELECT url, hash, deleted_at FROM reports")
+        }
+
+        events = []
+        upserts = []
+        for url, (agency, title, year) in scraped.items():
+            digest = record_hash(agency, title, year, url)
+            previous, deleted_at = known.get(url, (None, None))
+            if previous is None or deleted_at is not None:
+                events.append((changed_at, 'insert', url, agency, title, year, digest, previous))
+            elif previous != digest:
+                events.append((changed_at, 'update', url, agency, title, year, digest, previous))
+            upserts.append((url, agency, title, year, listing_year(year), digest, changed_at, changed_at))
+
+        deleted = []
+        if complete:
+            deleted = [
+                url for url, (_, deleted_at) in known.items()
+                if deleted_at is None and url not in scraped
+            ]
+
+        with self.db:
+            for url in deleted:
+                agency, title, year, previous = self.db.execute(
+                    "SELECT agency, title, year, hash FROM reports WHERE url = ?", (url,)
+                ).fetchone()
+                events.append((changed_at, 'delete', url, agency, title, year, None, previous))
+            self.db.executemany(
+                "INSERT INTO report_changes (changed_at, op, url, agency, title, year, hash, previous_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                events
+            )
+            self.db.executemany(
+                "INSERT INTO reports (url, agency, title, year, listing_year, hash, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET agency = excluded.agency, title = excluded.title, "
+                "year = excluded.year, hash = excluded.hash, last_seen = excluded.last_seen, deleted_at = NULL, "
+                "listing_year = COALESCE(reports.listing_year, excluded.listing_year)",
+                upserts
+            )
+            self.db.executemany(
+                "UPDATE reports SET listing_year = ? WHERE url = ?",
+                ((year, url) for url, year in (listing_years or {}).items() if url in scraped)
+            )
+            self.db.executemany(
+                "UPDATE reports SET deleted_at = ? WHERE url = ?", ((changed_at, url) for url in deleted)
+            )
+
+        return Counter(event[1] for event in events)
+
+    def changes_since(self, since: Union[str, datetime]) -> list[Change]:
+        """Events recorded after a time, oldest first"""
+        return [
+            Change(*row) for row in self.db.execute(
+                f"SELECT {', '.join(FIELDS)} FROM report_changes WHERE changed_at > ? ORDER BY changed_at, seq",
+                (timestamp(since),)
+            )
+        ]
+
+    def changes_after(self, seq: int) -> list[Change]:
+        """Events after a sequence number, oldest first"""
+        return [
+            Change(*row) for row in self.db.execute(
+                f"SELECT {', '.join(FIELDS)} FROM report_changes WHERE seq > ? ORDER BY seq", (seq,)
+            )
+        ]
+
+    def close(self) -> None:
+        """Close the database"""
+        self.db.close()
+
+
+def main(argv: Optional[list[str]] = None):
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Print agency report changes as CSV")
+    parser.add_argument(
+        '--db', type=Path, default=Path(__file__).resolve().parent / "report_changes.db",
+        help="Change log database"
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    since = commands.add_parser('since', help="Changes recorded after a time")
+    since.add_argument('time', help="ISO 8601 time; without an offset it is taken as UTC")
+    after = commands.add_parser('after', help="Changes after a sequence number")
+    after.add_argument('seq', type=int, help="Last seq already processed")
+    args = parser.parse_args(argv)
+
+    changelog = ReportChangelog(args.db)
+    if args.command == 'since':
+        changes = changelog.changes_since(args.time)
+    else:
+        changes = changelog.changes_after(args.seq)
+    changelog.close()
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(FIELDS)
+    writer.writerows(changes)
+
+
+if __name__ == "__main__":
+    main()
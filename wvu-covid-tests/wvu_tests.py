@@ -1,21 +1,63 @@
-import dateparser
-import requests
-from bs4 import BeautifulSoup
+import argparse
 import csv
+import sys
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from wvu import metrics, profiling
+from wvu.dates import DateParser
+from wvu.http import get_client
+from wvu.paths import dataset_dir
+
+URL = "https://www.wvu.edu/return-to-campus/daily-test-results/morgantown/all#daily-campus-testing"
+CSV_FILE = dataset_dir('wvu-covid-tests') / 'wvu_morgantown_covid_testing_2021.csv'
+
+
+def _dateparser(value):
+    # Only imported for dates the fast path cannot handle; it is slow to load
+    import dateparser
+    return dateparser.parse(value)
+
+
+def parse_results(text, dates=None):
+    dates = dates or DateParser('covid', fallback=_dateparser)
+    html = "".join(line.strip() for line in text.split('\n'))
+    soup = BeautifulSoup(html, 'html.parser')
+    results = []
+
+    rows = soup.find_all('table')[0].find_all('tr')[2:]
+
+    for row in rows:
+        date = dates.parse(row.find('time').text)
+        total_results, total_positive, total_positive_pct = [x.text for x in row.find_all('td')]
+        results.append([date, total_results, total_positive, total_positive_pct])
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape WVU Morgantown COVID test results")
+    parser.add_argument(
+        '--profile', action='store_true',
+        help="Record a sampling profile of the run in the dataset's profiles/ directory"
+    )
+    args = parser.parse_args(argv)
 
-r = requests.get("https://www.wvu.edu/return-to-campus/daily-test-results/morgantown/all#daily-campus-testing")
-html = "".join(line.strip() for line in r.text.split('\n'))
-soup = BeautifulSoup(html, 'html.parser')
-results = []
+    with profiling.profiled('covid', CSV_FILE.parent, args.profile), metrics.RunMetrics('covid'):
+        r = get_client().get(URL)
+        with metrics.stage('parse'):
+            dates = DateParser('covid', fallback=_dateparser)
+            results = parse_results(r.text, dates)
+        print(dates.summary())
+        metrics.count(records_parsed=len(results))
 
-rows = soup.find_all('table')[0].find_all('tr')[2:]
+        with metrics.stage('write'), open(CSV_FILE, 'w') as tests:
+            writer = csv.writer(tests)
+            writer.writerow(['date', 'total_results', 'total_positive', 'total_positive_pct'])
+            writer.writerows(results)
 
-for row in rows:
-    date = dateparser.parse(row.find('time').text)
-    total_results, total_positive, total_positive_pct = [x.text for x in row.find_all('td')]
-    results.append([date, total_results, total_positive, total_positive_pct])
 
-with open('wvu_morgantown_covid_testing_2021.csv', 'w') as tests:
-    writer = csv.writer(tests)
-    writer.writerow(['date', 'total_results', 'total_positive', 'total_positive_pct'])
-    writer.writerows(results)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Content-addressed document store
+
+Documents are stored once under objects/<aa>/<sha256>, however many URLs
+point at them, so re-uploaded or identically named files can neither
+overwrite nor shadow each other. A SQLite manifest maps each URL to the
+hash, size, fetch time and HTTP validators of its current version.
+
+A URL that is already in the manifest is checked with a HEAD request that
+carries its validators (If-None-Match / If-Modified-Since). It is only
+downloaded again when the server reports a change or cannot answer.
+
+Usage:
+    python -m wvu.blobstore lobbying/documents stats
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+from wvu.download import Downloader
+from wvu.fetch import ConcurrentFetcher
+from wvu.http import HttpClient, get_client
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    content_type TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at TEXT NOT NULL,
+    checked_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_sha256 ON documents (sha256);
+"""
+
+
+@dataclass
+class StoredDocument:
+    """Result of fetching a URL into the store"""
+    url: str
+    status: str  # new, changed, unchanged or failed
+    sha256: Optional[str] = None
+    path: Optional[Path] = None
+    error: Optional[str] = None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class BlobStore:
+    """SHA-256 addressed files with a URL manifest"""
+
+    def __init__(self, root: Path, client: Optional[HttpClient] = None, max_workers: int = 4):
+        """
+        Open (and create if needed) a store
+
+        Args:
+            root: Directory holding objects/, tmp/ and manifest.db
+            client: HTTP client to use, defaulting to the shared client
+            max_workers: Maximum number of documents fetched at once
+        """
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.tmp_dir = self.root / "tmp"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        self.client = client or get_client()
+        self.downloader = Downloader(self.client, max_workers=1)
+        self.fetcher = ConcurrentFetcher(max_workers=max_workers, per_host=max_workers)
+
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(self.root / "manifest.db", check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def object_path(self, sha256: str) -> Path:
+        """Where the document with a given hash is stored"""
+        return self.objects_dir / sha256[:2] / sha256
+
+    def lookup(self, url: str) -> Optional[sqlite3.Row]:
+        """Manifest entry for a URL"""
+        with self._lock:
+            return self.db.execute("SELECT * FROM documents WHERE url = ?", (url,)).fetchone()
+
+    def path_for(self, url: str) -> Optional[Path]:
+        """Stored file for a URL, if it has been fetched"""
+        entry = self.lookup(url)
+        if entry is None:
+            return None
+        path = self.object_path(entry['sha256'])
+        return path if path.exists() else None
+
+    def _is_unchanged(self, url: str, entry: sqlite3.Row) -> bool:
+        """Check a known URL with a conditional HEAD request"""
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        if not headers:
+            return False
+
+        try:
+            response = self.client.request('HEAD', url, headers=headers, allow_redirects=True)
+        except requests.RequestException as e:
+            logger.warning(f"HEAD {url} failed ({e}), downloading instead")
+            return False
+
+        if response.status_code == 304:
+            return True
+        if response.status_code != 200:
+            return False
+        # Servers that ignore conditional headers still report the validators
+        if entry['etag'] and response.headers.get('ETag') == entry['etag']:
+            return True
+        return bool(entry['last_modified']) and response.headers.get('Last-Modified') == entry['last_modified']
+
+    def fetch(self, url: str) -> StoredDocument:
+        """
+        Make sure the current version of a URL is in the store
+
+        Args:
+            url: Document URL
+
+        Returns:
+            StoredDocument describing what happened; errors are not raised
+        """
+        entry = self.lookup(url)
+        if entry is not None and self.object_path(entry['sha256']).exists():
+            if self._is_unchanged(url, entry):
+                with self._lock, self.db:
+                    self.db.execute("UPDATE documents SET checked_at = ? WHERE url = ?", (_now(), url))
+                return StoredDocument(url, 'unchanged', entry['sha256'], self.object_path(entry['sha256']))
+
+        # Named after the URL so an interrupted download resumes on the next run
+        tmp = self.tmp_dir / hashlib.sha256(url.encode('utf-8')).hexdigest()
+        tmp.unlink(missing_ok=True)
+        result = self.downloader.download(url, tmp)
+        if not result.ok:
+            return StoredDocument(url, 'failed', error=result.error)
+
+        path = self.object_path(result.sha256)
+        if path.exists():
+            tmp.unlink()
+        else:
+            path.parent.mkdir(exist_ok=True)
+            os.replace(tmp, path)
+
+        now = _now()
+        with self._lock, self.db:
+            self.db.execute(
+                """
+                INSERT INTO documents
+                    (url, sha256, size, content_type, etag, last_modified, fetched_at, checked_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    sha256 = excluded.sha256,
+                    size = excluded.size,
+                    content_type = excluded.content_type,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    fetched_at = excluded.fetched_at,
+                    checked_at = excluded.checked_at
+                """,
+                (url, result.sha256, path.stat().st_size, result.headers.get('Content-Type'),
+                 result.headers.get('ETag'), result.headers.get('Last-Modified'), now, now)
+            )
+
+        if entry is None:
+            status = 'new'
+        elif entry['sha256'] != result.sha256:
+            status = 'changed'
+        else:
+            status = 'unchanged'
+        return StoredDocument(url, status, result.sha256, path)
+
+    def fetch_all(self, urls: list[str]) -> list[StoredDocument]:
+        """
+        Fetch many URLs concurrently
+
+        Returns:
+            One StoredDocument per distinct URL, in input order
+        """
+        urls = list(dict.fromkeys(urls))
+        logger.info(f"Checking {len(urls)} documents")
+        results = self.fetcher.map(self.fetch, urls, url_for=lambda url: url)
+
+        counts: dict[str, int] = {}
+        for result in results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        logger.info("Documents: " + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+        return results
+
+    def stats(self) -> dict[str, int]:
+        """URL, object and byte counts"""
+        with self._lock:
+            urls, objects, size = self.db.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT sha256), "
+                "(SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT sha256, size FROM documents)) "
+                "FROM documents"
+            ).fetchone()
+        return {'urls': urls, 'objects': objects, 'bytes': size}
+
+    def close(self) -> None:
+        """Close the manifest"""
+        self.db.close()
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Inspect a document store")
+    parser.add_argument('root', type=Path, help="Store directory")
+    parser.add_argument('command', choices=['stats', 'list'])
+    args = parser.parse_args()
+
+    store = BlobStore(args.root)
+    if args.command == 'stats':
+        stats = store.stats()
+        print(f"{stats['urls']} URLs, {stats['objects']} distinct documents, "
+              f"{stats['bytes'] / 1_000_000:.1f} MB")
+    else:
+        for row in store.db.execute("SELECT url, sha256, size, fetched_at FROM documents ORDER BY url"):
+            print(f"{row['sha256'][:12]}  {row['size']:>10}  {row['fetched_at']}  {row['url']}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
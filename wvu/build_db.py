@@ -0,0 +1,724 @@
+"""
+Incremental wvu.db builder
+
+Loads every dataset in the repository into the SQLite database published
+with Datasette. Each table has typed columns, a primary key and indexes.
+The builder keeps a content hash of each table's source files and skips
+tables whose sources have not changed. Changed tables are upserted in one
+transaction per table. Only rows that are new or differ are written, and
+rows that left the source are deleted. ANALYZE and VACUUM run only when
+something changed.
+
+Month-partitioned datasets (see wvu.partitions) are hashed from their
+manifest without reading the partitions. Only partitions whose hash differs
+from the last build are read and upserted; if the table's row count then
+differs from the manifest's (rows were removed), the table is rebuilt from
+every partition.
+
+After the tables are loaded, the summary tables in SUMMARIES are recomputed
+from any table that changed, so Datasette serves counts by month, building,
+title and outcome from a few hundred precomputed rows instead of grouping
+the whole crime log on every request. Tables with full-text columns get an
+external-content FTS5 table (<table>_fts), which Datasette detects and
+offers as a search box. The FTS index is rebuilt after VACUUM, since VACUUM
+may renumber the rowids it refers to.
+
+When run under GitHub Actions, changed=true|false is written to
+$GITHUB_OUTPUT so the deploy step can be skipped when nothing changed.
+
+Usage:
+    python -m wvu.build_db [wvu.db]
+"""
+
+import argparse
+import csv
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Union
+
+from wvu.partitions import UNDATED, PartitionedCSV
+from wvu.paths import import_script, root as data_root
+
+logger = logging.getLogger(__name__)
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS _build_state (
+    table_name TEXT PRIMARY KEY,
+    source_hash TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    built_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS _build_partitions (
+    table_name TEXT NOT NULL,
+    partition TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (table_name, partition)
+);
+"""
+
+
+def _integer(value: Optional[str]) -> Optional[int]:
+    """Parse an integer column, treating blanks and placeholders as NULL"""
+    if value is None:
+        return None
+    digits = value.replace(',', '').strip()
+    return int(digits) if digits.lstrip('-').isdigit() else None
+
+
+def _real(value: Optional[str]) -> Optional[float]:
+    """Parse a numeric column such as '4.55%', treating placeholders as NULL"""
+    if value is None:
+        return None
+    try:
+        return float(value.replace('%', '').replace(',', '').strip())
+    except ValueError:
+        return None
+
+
+def _text(value: Optional[str]) -> Optional[str]:
+    """Text column; empty strings are kept as-is"""
+    return value
+
+
+def _board_of_review(part: int) -> Callable[[Path], Iterator[tuple]]:
+    """Rows of one of the normalized Board of Review tables (see dhhr/normalize.py)"""
+    def records(root: Path) -> Iterator[tuple]:
+        normalize = import_script('dhhr/normalize.py').normalize
+        return iter(normalize(root / 'dhhr')[part])
+    return records
+
+
+BOARD_OF_REVIEW_SOURCES = [f'dhhr/board_of_review_{year}.csv' for year in range(2014, 2021)]
+
+
+def _report_changes(root: Path) -> Iterator[tuple]:
+    """Every event in the agency report change log (see wv-legislature/changelog.py)"""
+    changelog = import_script('wv-legislature/changelog.py').ReportChangelog(root / 'wv-legislature/report_changes.db')
+    try:
+        return iter(changelog.changes_after(0))
+    finally:
+        changelog.close()
+
+
+CONVERTERS: dict[str, Callable] = {
+    'INTEGER': _integer,
+    'REAL': _real,
+    'TEXT': _text,
+}
+
+
+def read_csv(path: Path, fieldnames: Optional[list[str]] = None) -> Iterator[dict]:
+    """Read CSV rows as dicts, optionally for a file without a header"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        yield from csv.DictReader(f, fieldnames=fieldnames)
+
+
+class _FullBuildNeeded(Exception):
+    """A partitioned table cannot be updated from its changed partitions alone"""
+
+
+@dataclass
+class Dataset:
+    """A table in wvu.db and the CSV files it is built from"""
+    table: str
+    sources: list[str]
+    columns: list[tuple[str, str]]
+    primary_key: list[str]
+    indexes: list[list[str]] = field(default_factory=list)
+    fieldnames: Optional[list[str]] = None
+    keep: Callable[[dict], bool] = lambda row: True
+    records: Optional[Callable[[Path], Iterator[tuple]]] = None
+    # The single source is a month-partitioned dataset directory
+    partitioned: bool = False
+    # Columns indexed in <table>_fts for full-text search
+    fts: list[str] = field(default_factory=list)
+
+    def partitions(self, root: Path) -> PartitionedCSV:
+        return PartitionedCSV(root / self.sources[0], [name for name, _ in self.columns], lambda row: UNDATED)
+
+    def source_paths(self, root: Path) -> list[Path]:
+        if self.partitioned:
+            return self.partitions(root).paths()
+        return [root / source for source in self.sources]
+
+    def records_from(self, root: Path, partitions: Optional[list[str]] = None) -> Iterator[dict]:
+        """Source rows as dicts, from the given partitions only if any are given"""
+        if self.partitioned:
+            yield from self.partitions(root).read(partitions)
+            return
+        for path in self.source_paths(root):
+            yield from read_csv(path, self.fieldnames)
+
+    def rows(self, root: Path, partitions: Optional[list[str]] = None) -> Iterator[tuple]:
+        """Typed rows for the table, deduplicated on the primary key (last wins)"""
+        if self.records is not None:
+            return self.records(root)
+
+        converters = [(name, CONVERTERS[kind]) for name, kind in self.columns]
+        key_positions = [i for i, (name, _) in enumerate(self.columns) if name in self.primary_key]
+        rows: dict[tuple, tuple] = {}
+
+        for record in self.records_from(root, partitions):
+            if not self.keep(record):
+                continue
+            row = tuple(convert(record.get(name)) for name, convert in converters)
+            key = tuple(row[i] for i in key_positions)
+            if None in key:
+                continue
+            rows[key] = row
+
+        return iter(rows.values())
+
+
+@dataclass
+class Summary:
+    """A table in wvu.db aggregated from another table"""
+    table: str
+    source: str
+    columns: list[tuple[str, str]]
+    primary_key: list[str]
+    # SELECT returning the columns in order
+    query: str
+    indexes: list[list[str]] = field(default_factory=list)
+
+
+DATASETS = [
+    Dataset(
+        table='crimelog',
+        sources=['crime-log/crime_log'],
+        partitioned=True,
+        columns=[
+            ('id', 'TEXT'), ('title', 'TEXT'), ('year', 'INTEGER'), ('datetime', 'TEXT'),
+            ('building', 'TEXT'), ('address', 'TEXT'), ('outcome', 'TEXT'),
+        ],
+        primary_key=['id'],
+        # Facet counts and filtered listings sorted by time read only the index
+        indexes=[['datetime'], ['year'], ['building', 'datetime'], ['title', 'datetime'], ['outcome', 'datetime']],
+        fts=['title', 'address'],
+    ),
+    Dataset(
+        table='meeting_notices',
+        sources=['meeting-notices/meeting_notices'],
+        partitioned=True,
+        columns=[
+            ('id', 'INTEGER'), ('date', 'TEXT'), ('time', 'TEXT'), ('agency', 'TEXT'),
+            ('subagency', 'TEXT'), ('location', 'TEXT'), ('purpose', 'TEXT'), ('notes', 'TEXT'),
+        ],
+        primary_key=['id'],
+        indexes=[['agency']],
+        fts=['purpose', 'location'],
+    ),
+    Dataset(
+        table='agency_reports',
+        sources=['wv-legislature/all_reports.csv'],
+        columns=[('agency', 'TEXT'), ('title', 'TEXT'), ('year', 'TEXT'), ('url', 'TEXT')],
+        primary_key=['url'],
+        indexes=[['agency'], ['year']],
+        # Header rows were appended to the CSV by earlier runs
+        keep=lambda row: row['url'] not in ('url', 'No Report', ''),
+    ),
+    Dataset(
+        table='agency_report_changes',
+        sources=['wv-legislature/report_changes.db'],
+        columns=[
+            ('seq', 'INTEGER'), ('changed_at', 'TEXT'), ('op', 'TEXT'), ('url', 'TEXT'), ('agency', 'TEXT'),
+            ('title', 'TEXT'), ('year', 'TEXT'), ('hash', 'TEXT'), ('previous_hash', 'TEXT'),
+        ],
+        primary_key=['seq'],
+        indexes=[['changed_at'], ['url']],
+        records=_report_changes,
+    ),
+    Dataset(
+        table='lobbying_filings',
+        sources=['lobbying/lobbying_filings.csv'],
+        columns=[('name', 'TEXT'), ('period', 'TEXT'), ('url', 'TEXT')],
+        primary_key=['url'],
+        indexes=[['period'], ['name']],
+        fieldnames=['name', 'period', 'url'],
+    ),
+    Dataset(
+        table='board_of_review',
+        sources=BOARD_OF_REVIEW_SOURCES,
+        columns=[
+            ('year', 'INTEGER'), ('categories', 'TEXT'), ('total_received', 'INTEGER'),
+            ('total_adjudicated', 'INTEGER'), ('upheld', 'INTEGER'), ('reversed', 'INTEGER'),
+            ('total_written', 'INTEGER'), ('abandoned', 'INTEGER'), ('withdrawn', 'INTEGER'),
+            ('withdrawn_claimant_favor', 'INTEGER'), ('withdrawn_no_change', 'INTEGER'),
+            ('dismissed', 'INTEGER'), ('remanded', 'INTEGER'), ('invalid', 'INTEGER'),
+        ],
+        primary_key=['year', 'categories'],
+        indexes=[['categories']],
+        keep=lambda row: bool(row.get('categories')),
+    ),
+    Dataset(
+        table='board_of_review_categories',
+        sources=BOARD_OF_REVIEW_SOURCES,
+        columns=[('category_id', 'INTEGER'), ('name', 'TEXT')],
+        primary_key=['category_id'],
+        records=_board_of_review(0),
+    ),
+    Dataset(
+        table='board_of_review_category_aliases',
+        sources=BOARD_OF_REVIEW_SOURCES,
+        columns=[('raw_name', 'TEXT'), ('category_id', 'INTEGER')],
+        primary_key=['raw_name'],
+        indexes=[['category_id']],
+        records=_board_of_review(1),
+    ),
+    Dataset(
+        table='board_of_review_facts',
+        sources=BOARD_OF_REVIEW_SOURCES,
+        columns=[('year', 'INTEGER'), ('category_id', 'INTEGER'), ('measure', 'TEXT'), ('value', 'INTEGER')],
+        primary_key=['year', 'category_id', 'measure'],
+        indexes=[['category_id', 'measure'], ['measure', 'year']],
+        records=_board_of_review(2),
+    ),
+    Dataset(
+        table='covid_tests',
+        sources=['wvu-covid-tests/wvu_morgantown_covid_testing.csv'],
+        columns=[
+            ('date', 'TEXT'), ('student_results', 'INTEGER'), ('student_positive', 'INTEGER'),
+            ('student_positive_pct', 'REAL'), ('staff_results', 'INTEGER'),
+            ('staff_positive', 'INTEGER'), ('staff_positive_pct', 'REAL'),
+            ('total_results', 'INTEGER'), ('total_positive', 'INTEGER'),
+            ('total_positive_pct', 'REAL'),
+        ],
+        primary_key=['date'],
+    ),
+    Dataset(
+        table='covid_tests_2021',
+        sources=['wvu-covid-tests/wvu_morgantown_covid_testing_2021.csv'],
+        columns=[
+            ('date', 'TEXT'), ('total_results', 'INTEGER'), ('total_positive', 'INTEGER'),
+            ('total_positive_pct', 'REAL'),
+        ],
+        primary_key=['date'],
+    ),
+]
+
+
+SUMMARIES = [
+    Summary(
+        table='crimelog_by_month',
+        source='crimelog',
+        columns=[('month', 'TEXT'), ('incidents', 'INTEGER')],
+        primary_key=['month'],
+        query="SELECT substr(datetime, 1, 7), COUNT(*) FROM crimelog WHERE datetime != '' GROUP BY 1",
+    ),
+    Summary(
+        table='crimelog_by_building',
+        source='crimelog',
+        columns=[
+            ('building', 'TEXT'), ('incidents', 'INTEGER'),
+            ('first_incident', 'TEXT'), ('last_incident', 'TEXT'),
+        ],
+        primary_key=['building'],
+        query="SELECT building, COUNT(*), MIN(datetime), MAX(datetime) FROM crimelog "
+              "WHERE building != '' GROUP BY building",
+        indexes=[['incidents']],
+    ),
+    Summary(
+        table='crimelog_by_title',
+        source='crimelog',
+        columns=[
+            ('title', 'TEXT'), ('incidents', 'INTEGER'),
+            ('first_incident', 'TEXT'), ('last_incident', 'TEXT'),
+        ],
+        primary_key=['title'],
+        query="SELECT title, COUNT(*), MIN(datetime), MAX(datetime) FROM crimelog "
+              "WHERE title != '' GROUP BY title",
+        indexes=[['incidents']],
+    ),
+    Summary(
+        table='crimelog_by_outcome',
+        source='crimelog',
+        columns=[('outcome', 'TEXT'), ('incidents', 'INTEGER')],
+        primary_key=['outcome'],
+        query="SELECT outcome, COUNT(*) FROM crimelog WHERE outcome != '' GROUP BY outcome",
+    ),
+    Summary(
+        table='crimelog_by_month_title',
+        source='crimelog',
+        columns=[('month', 'TEXT'), ('title', 'TEXT'), ('incidents', 'INTEGER')],
+        primary_key=['month', 'title'],
+        query="SELECT substr(datetime, 1, 7), title, COUNT(*) FROM crimelog "
+              "WHERE datetime != '' AND title != '' GROUP BY 1, 2",
+        indexes=[['title', 'month']],
+    ),
+]
+
+
+def _quote(name: str) -> str:
+    return f'"{name}"'
+
+
+class DatabaseBuilder:
+    """Builds and incrementally updates wvu.db"""
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        root: Optional[Path] = None,
+        datasets: list[Dataset] = DATASETS,
+        summaries: list[Summary] = SUMMARIES
+    ):
+        """
+        Initialize the builder
+
+        Args:
+            db_path: SQLite database to update, defaulting to wvu.db in the root
+            root: Directory the dataset sources are relative to (see wvu.paths)
+            datasets: Tables to build
+            summaries: Tables aggregated from them
+        """
+        self.root = Path(root) if root else data_root()
+        self.db_path = Path(db_path) if db_path else self.root / "wvu.db"
+        self.datasets = datasets
+        self.summaries = summaries
+        self.db = sqlite3.connect(self.db_path)
+        self.db.executescript(STATE_SCHEMA)
+
+    def source_hash(self, dataset: Dataset) -> Optional[str]:
+        """Hash of a dataset's source files, or None if any are missing"""
+        digest = hashlib.sha256()
+        if dataset.partitioned:
+            partitions = dataset.partitions(self.root).partitions
+            if not partitions:
+                return None
+            for key in sorted(partitions):
+                digest.update(f"{key}:{partitions[key]['sha256']}\n".encode('utf-8'))
+            return digest.hexdigest()
+
+        for path in dataset.source_paths(self.root):
+            if not path.exists():
+                return None
+            digest.update(path.name.encode('utf-8'))
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    def _schema_matches(self, dataset: Union[Dataset, Summary]) -> bool:
+        """Whether the existing table has the expected columns, types and key"""
+        info = self.db.execute(f"PRAGMA table_info({_quote(dataset.table)})").fetchall()
+        expected = [
+            (name, kind, dataset.primary_key.index(name) + 1 if name in dataset.primary_key else 0)
+            for name, kind in dataset.columns
+        ]
+        return [(row[1], row[2], row[5]) for row in info] == expected
+
+    def _create_table(self, dataset: Union[Dataset, Summary]) -> None:
+        """Create the table and its indexes, replacing a table with an old schema"""
+        table = _quote(dataset.table)
+        if not self._schema_matches(dataset):
+            self.db.execute(f"DROP TABLE IF EXISTS {table}")
+            columns = ", ".join(f"{_quote(name)} {kind}" for name, kind in dataset.columns)
+            key = ", ".join(_quote(name) for name in dataset.primary_key)
+            self.db.execute(f"CREATE TABLE {table} ({columns}, PRIMARY KEY ({key}))")
+        self._create_indexes(dataset)
+
+    def _create_indexes(self, dataset: Union[Dataset, Summary]) -> int:
+        """
+        Create the table's indexes and drop ones no longer listed
+
+        Returns:
+            Number of indexes created or dropped
+        """
+        wanted = {f"idx_{dataset.table}_{'_'.join(columns)}": columns for columns in dataset.indexes}
+        existing = {
+            row[0] for row in self.db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND name GLOB 'idx_*'",
+                (dataset.table,)
+            )
+        }
+        for name in existing - wanted.keys():
+            self.db.execute(f"DROP INDEX {_quote(name)}")
+        for name in wanted.keys() - existing:
+            self.db.execute(
+                f"CREATE INDEX {_quote(name)} ON {_quote(dataset.table)} ({', '.join(map(_quote, wanted[name]))})"
+            )
+        return len(existing ^ wanted.keys())
+
+    @staticmethod
+    def _upsert(dataset: Dataset) -> str:
+        """Statement that inserts a row or updates it only if a value differs"""
+        table = _quote(dataset.table)
+        names = [name for name, _ in dataset.columns]
+        values = [name for name in names if name not in dataset.primary_key]
+        key = ", ".join(map(_quote, dataset.primary_key))
+        return (
+            f"INSERT INTO {table} ({', '.join(map(_quote, names))}) "
+            f"VALUES ({', '.join('?' for _ in names)}) "
+            f"ON CONFLICT ({key}) DO UPDATE SET "
+            + ", ".join(f"{_quote(n)} = excluded.{_quote(n)}" for n in values)
+            + " WHERE "
+            + " OR ".join(f"{table}.{_quote(n)} IS NOT excluded.{_quote(n)}" for n in values)
+        )
+
+    def _record_state(self, dataset: Dataset, source_hash: str, row_count: int) -> None:
+        """Remember what a table was built from; call inside the build's transaction"""
+        self.db.execute(
+            "INSERT OR REPLACE INTO _build_state VALUES (?, ?, ?, ?)",
+            (dataset.table, source_hash, row_count, time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+        )
+        if dataset.partitioned:
+            self.db.execute("DELETE FROM _build_partitions WHERE table_name = ?", (dataset.table,))
+            self.db.executemany(
+                "INSERT INTO _build_partitions VALUES (?, ?, ?)",
+                [(dataset.table, key, entry['sha256'])
+                 for key, entry in dataset.partitions(self.root).partitions.items()]
+            )
+
+    def build_table(self, dataset: Dataset, source_hash: str) -> int:
+        """
+        Upsert a dataset's rows and delete rows no longer in its sources
+
+        Returns:
+            Number of rows inserted, updated or deleted
+        """
+        table = _quote(dataset.table)
+        names = [name for name, _ in dataset.columns]
+        key = ", ".join(map(_quote, dataset.primary_key))
+
+        with self.db:
+            self._create_table(dataset)
+            before = self.db.total_changes
+
+            rows = list(dataset.rows(self.root))
+            self.db.executemany(self._upsert(dataset), rows)
+            changed = self.db.total_changes - before
+
+            key_positions = [names.index(name) for name in dataset.primary_key]
+            self.db.execute("DROP TABLE IF EXISTS temp._keys")
+            self.db.execute(f"CREATE TEMP TABLE _keys ({key})")
+            self.db.executemany(
+                f"INSERT INTO temp._keys VALUES ({', '.join('?' for _ in key_positions)})",
+                [tuple(row[i] for i in key_positions) for row in rows]
+            )
+            deleted = self.db.execute(
+                f"DELETE FROM {table} WHERE ({key}) NOT IN (SELECT {key} FROM temp._keys)"
+            ).rowcount
+            self.db.execute("DROP TABLE temp._keys")
+            changed += deleted
+
+            self._record_state(dataset, source_hash, len(rows))
+
+        return changed
+
+    def build_partitions(self, dataset: Dataset, source_hash: str) -> Optional[int]:
+        """
+        Upsert the rows of partitions whose hash changed since the last build
+
+        Returns:
+            Number of rows inserted or updated, or None if the table needs a
+            full build (no partition state yet, or rows left the dataset)
+        """
+        partitions = dataset.partitions(self.root)
+        loaded = dict(self.db.execute(
+            "SELECT partition, sha256 FROM _build_partitions WHERE table_name = ?", (dataset.table,)
+        ))
+        if not loaded or loaded.keys() - partitions.partitions.keys():
+            return None
+        changed_partitions = [
+            key for key, entry in partitions.partitions.items() if loaded.get(key) != entry['sha256']
+        ]
+
+        try:
+            with self.db:
+                before = self.db.total_changes
+                self.db.executemany(self._upsert(dataset), dataset.rows(self.root, changed_partitions))
+                changed = self.db.total_changes - before
+
+                # Every partition row is in the table now, so equal counts mean nothing was removed
+                count = self.db.execute(f"SELECT COUNT(*) FROM {_quote(dataset.table)}").fetchone()[0]
+                if count != partitions.total_rows():
+                    raise _FullBuildNeeded()
+                self._record_state(dataset, source_hash, count)
+        except _FullBuildNeeded:
+            return None
+
+        logger.info(f"{dataset.table}: read {len(changed_partitions)} of {len(partitions.partitions)} partitions")
+        return changed
+
+    def build_summary(self, summary: Summary) -> int:
+        """
+        Recompute a summary table from its source table
+
+        Returns:
+            Number of summary rows
+        """
+        table = _quote(summary.table)
+        with self.db:
+            self._create_table(summary)
+            self.db.execute(f"DELETE FROM {table}")
+            return self.db.execute(
+                f"INSERT INTO {table} ({', '.join(_quote(name) for name, _ in summary.columns)}) {summary.query}"
+            ).rowcount
+
+    def _fts_sql(self, dataset: Dataset) -> str:
+        columns = ", ".join(map(_quote, dataset.fts))
+        return (
+            f"CREATE VIRTUAL TABLE {_quote(dataset.table + '_fts')} "
+            f"USING fts5({columns}, content={_quote(dataset.table)})"
+        )
+
+    def fts_current(self, dataset: Dataset) -> bool:
+        """Whether the table's FTS index exists with the expected columns"""
+        row = self.db.execute(
+            "SELECT sql FROM sqlite_master WHERE name = ?", (dataset.table + '_fts',)
+        ).fetchone()
+        return row is not None and row[0] == self._fts_sql(dataset)
+
+    def build_fts(self, dataset: Dataset) -> None:
+        """Create the table's FTS index if needed and rebuild it from the table"""
+        fts = _quote(dataset.table + '_fts')
+        with self.db:
+            if not self.fts_current(dataset):
+                self.db.execute(f"DROP TABLE IF EXISTS {fts}")
+                self.db.execute(self._fts_sql(dataset))
+            self.db.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+    def _table_exists(self, table: str) -> bool:
+        return self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+
+    def new_runs(self) -> int:
+        """
+        Count the rows wvu.metrics added to the runs table since the last build
+
+        The runs table is written by the scrapers rather than built here, so
+        only the highest run id seen is remembered in _build_state.
+        """
+        if not self._table_exists('runs'):
+            return 0
+        state = self.db.execute("SELECT source_hash FROM _build_state WHERE table_name = 'runs'").fetchone()
+        seen = int(state[0]) if state else 0
+        new, last, total = self.db.execute(
+            "SELECT count(*) FILTER (WHERE id > ?), max(id), count(*) FROM runs", (seen,)
+        ).fetchone()
+        if new:
+            with self.db:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO _build_state VALUES ('runs', ?, ?, ?)",
+                    (str(last), total, time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+                )
+        return new
+
+    def build(self) -> bool:
+        """
+        Update every table whose sources changed
+
+        Returns:
+            True if any row in the database changed, including runs recorded
+            by the scrapers since the last build
+        """
+        changed_rows = 0
+        changed_tables = set()
+
+        for dataset in self.datasets:
+            source_hash = self.source_hash(dataset)
+            if source_hash is None:
+                logger.warning(f"Skipping {dataset.table}: source files missing")
+                continue
+
+            state = self.db.execute(
+                "SELECT source_hash FROM _build_state WHERE table_name = ?", (dataset.table,)
+            ).fetchone()
+            if state and state[0] == source_hash and self._schema_matches(dataset):
+                with self.db:
+                    indexes = self._create_indexes(dataset)
+                if indexes:
+                    logger.info(f"{dataset.table}: {indexes} indexes created or dropped")
+                    changed_tables.add(dataset.table)
+                else:
+                    logger.info(f"{dataset.table}: unchanged")
+                continue
+
+            changed = None
+            if dataset.partitioned and state and self._schema_matches(dataset):
+                changed = self.build_partitions(dataset, source_hash)
+            if changed is None:
+                changed = self.build_table(dataset, source_hash)
+            logger.info(f"{dataset.table}: {changed} rows inserted, updated or deleted")
+            changed_rows += changed
+            if changed:
+                changed_tables.add(dataset.table)
+
+        for summary in self.summaries:
+            if not self._table_exists(summary.source):
+                continue
+            if summary.source in changed_tables or not self._schema_matches(summary):
+                rows = self.build_summary(summary)
+                logger.info(f"{summary.table}: {rows} rows from {summary.source}")
+                changed_tables.add(summary.table)
+
+        if changed_tables:
+            self.db.execute("ANALYZE")
+            self.db.execute("VACUUM")
+
+        # VACUUM may renumber the rowids the FTS indexes point at, so they are rebuilt after it
+        for dataset in self.datasets:
+            if not dataset.fts or not self._table_exists(dataset.table):
+                continue
+            if changed_tables or not self.fts_current(dataset):
+                self.build_fts(dataset)
+                logger.info(f"{dataset.table}_fts: rebuilt on {', '.join(dataset.fts)}")
+                changed_tables.add(dataset.table + '_fts')
+
+        runs = self.new_runs()
+        if runs:
+            logger.info(f"runs: {runs} new runs recorded")
+        return bool(changed_tables) or bool(runs)
+
+    def close(self) -> None:
+        """Close the database"""
+        self.db.close()
+
+
+def build_database(db_path: Optional[Path] = None) -> bool:
+    """
+    Build wvu.db and report whether it changed
+
+    Under GitHub Actions the result is also written to $GITHUB_OUTPUT.
+
+    Args:
+        db_path: Database to update, defaulting to wvu.db in the data root
+
+    Returns:
+        True if any row in the database changed
+    """
+    builder = DatabaseBuilder(db_path)
+    try:
+        changed = builder.build()
+    finally:
+        builder.close()
+
+    logger.info("Database changed" if changed else "Database unchanged")
+    if os.environ.get('GITHUB_OUTPUT'):
+        with open(os.environ['GITHUB_OUTPUT'], 'a') as f:
+            f.write(f"changed={'true' if changed else 'false'}\n")
+    return changed
+
+
+def main(argv: Optional[list[str]] = None):
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Incrementally build wvu.db")
+    parser.add_argument('db', nargs='?', type=Path, default=None, help="Database to update (default: wvu.db)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    build_database(args.db)
+
+
+if __name__ == "__main__":
+    main()
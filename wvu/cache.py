@@ -0,0 +1,284 @@
+"""
+On-disk HTTP response cache
+
+Stores response bodies alongside their validators (ETag / Last-Modified) so
+the client can make conditional requests and rebuild the response from disk
+on a 304. Every body is hashed; scrapers compare that hash with the one they
+last finished processing to skip parsing unchanged pages entirely.
+
+The index lives in SQLite and bodies are plain files. Once the bodies grow
+past max_bytes, the least recently used entries are evicted.
+
+Usage:
+    python -m wvu.cache stats
+    python -m wvu.cache list
+    python -m wvu.cache purge [--url-contains TEXT]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".http_cache"
+# Cache sizes given in "MB" (WVU_CACHE_MAX_MB, --max-mb) are MiB
+MIB = 1024 * 1024
+DEFAULT_MAX_BYTES = 256 * MIB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    processed_sha256 TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+"""
+
+# Response headers worth keeping to rebuild a usable response from disk
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+@dataclass
+class CacheEntry:
+    """A cached response"""
+    key: str
+    method: str
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    headers: dict[str, str]
+    sha256: str
+    size: int
+    stored_at: float
+    last_used: float
+    processed_sha256: Optional[str]
+
+    def validators(self) -> dict[str, str]:
+        """Request headers for a conditional request"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def cache_key(method: str, url: str, data=None) -> str:
+    """Key for a request; POST form data is part of the key"""
+    payload = json.dumps([method.upper(), url, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of response bodies and validators"""
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the cache
+
+        Args:
+            directory: Where the index and bodies are stored
+            max_bytes: Total body size to keep before evicting
+        """
+        self.directory = Path(directory)
+        self.body_dir = self.directory / "bodies"
+        self.body_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.directory / "index.db", check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+
+    def _body_path(self, key: str) -> Path:
+        return self.body_dir / key
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Look up an entry and mark it as recently used"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if not self._body_path(key).exists():
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            now = time.time()
+            self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        entry = dict(row)
+        entry['headers'] = json.loads(entry['headers'])
+        entry['last_used'] = now
+        return CacheEntry(**entry)
+
+    def read_body(self, entry: CacheEntry) -> bytes:
+        """Read a cached body from disk"""
+        return self._body_path(entry.key).read_bytes()
+
+    def store(self, key: str, method: str, url: str, headers, body: bytes) -> CacheEntry:
+        """
+        Store a response body and its validators
+
+        Args:
+            key: Cache key from cache_key()
+            method: HTTP method
+            url: Request URL
+            headers: Response headers
+            body: Response body
+
+        Returns:
+            The stored entry, keeping any previously processed hash
+        """
+        sha256 = hashlib.sha256(body).hexdigest()
+        kept = {name: headers[name] for name in KEPT_HEADERS if name in headers}
+
+        path = self._body_path(key)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_bytes(body)
+        os.replace(tmp, path)
+
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO entries
+                    (key, method, url, etag, last_modified, headers, sha256, size, stored_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    headers = excluded.headers,
+                    sha256 = excluded.sha256,
+                    size = excluded.size,
+                    stored_at = excluded.stored_at,
+                    last_used = excluded.last_used
+                """,
+                (key, method, url, kept.get('ETag'), kept.get('Last-Modified'),
+                 json.dumps(kept), sha256, len(body), now, now)
+            )
+            self._db.commit()
+        self.evict()
+        return self.get(key)
+
+    def mark_processed(self, key: str, sha256: str) -> None:
+        """Record that a scraper finished processing this version of a body"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET processed_sha256 = ? WHERE key = ?", (sha256, key)
+            )
+            self._db.commit()
+
+    def total_size(self) -> int:
+        """Total size of cached bodies in bytes"""
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Drop least recently used entries until the cache fits
+
+        Returns:
+            Number of entries evicted
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        evicted = 0
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= limit:
+                return 0
+            rows = self._db.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall()
+            for row in rows:
+                if total <= limit:
+                    break
+                self._body_path(row['key']).unlink(missing_ok=True)
+                self._db.execute("DELETE FROM entries WHERE key = ?", (row['key'],))
+                total -= row['size']
+                evicted += 1
+            self._db.commit()
+        return evicted
+
+    def purge(self, url_contains: Optional[str] = None) -> int:
+        """
+        Remove entries, optionally only those whose URL contains some text
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if url_contains:
+                rows = self._db.execute(
+                    "SELECT key FROM entries WHERE instr(url, ?) > 0", (url_contains,)
+                ).fetchall()
+            else:
+                rows = self._db.execute("SELECT key FROM entries").fetchall()
+            for row in rows:
+                self._body_path(row['key']).unlink(missing_ok=True)
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(r['key'],) for r in rows])
+            self._db.commit()
+        return len(rows)
+
+    def entries(self) -> list[sqlite3.Row]:
+        """All entries, most recently used first"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT key, method, url, etag, last_modified, sha256, size, stored_at, last_used, "
+                "processed_sha256 FROM entries ORDER BY last_used DESC"
+            ).fetchall()
+
+    def close(self) -> None:
+        """Close the index database"""
+        self._db.close()
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Inspect or purge the HTTP response cache")
+    parser.add_argument(
+        '--dir', type=Path, default=Path(os.environ.get('WVU_CACHE_DIR', DEFAULT_CACHE_DIR)),
+        help="Cache directory"
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help="Show entry count and size")
+    commands.add_parser('list', help="List cached URLs")
+    purge = commands.add_parser('purge', help="Remove cached entries")
+    purge.add_argument('--url-contains', help="Only remove entries whose URL contains this text")
+    evict = commands.add_parser('evict', help="Evict least recently used entries")
+    evict.add_argument('--max-mb', type=float, required=True, help="Size to shrink the cache to, in MiB")
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.dir)
+
+    if args.command == 'stats':
+        rows = cache.entries()
+        print(f"{len(rows)} entries, {cache.total_size() / MIB:.2f} MiB in {cache.directory}")
+    elif args.command == 'list':
+        writer = sys.stdout.write
+        for row in cache.entries():
+            validators = 'etag' if row['etag'] else ('last-modified' if row['last_modified'] else '-')
+            stale = '' if row['processed_sha256'] == row['sha256'] else ' (unprocessed)'
+            used = time.strftime('%Y-%m-%d %H:%M', time.localtime(row['last_used']))
+            writer(f"{used}  {row['size']:>10}  {validators:<13}  {row['method']:<4} {row['url']}{stale}\n")
+    elif args.command == 'purge':
+        print(f"Removed {cache.purge(args.url_contains)} entries")
+    elif args.command == 'evict':
+        print(f"Evicted {cache.evict(int(args.max_mb * MIB))} entries")
+
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+wvu command line
+
+One entry point for every dataset:
+
+    wvu crime-log
+    wvu meetings [--workers N]
+    wvu reports [--incremental --recent 3]
+    wvu lobbying 2023-2024
+    wvu lobbying-text extract
+    wvu covid
+    wvu dhhr [--backend tabula]
+    wvu db
+    wvu all [--jobs 4] [--publish]
+
+`wvu all` runs the live scrapers concurrently in one process (see
+wvu.orchestrator), refreshes the lobbying full-text index once the lobbying
+scrape is done, then builds wvu.db and, with --publish, deploys it.
+
+Arguments after the command are passed to the dataset's own script, so
+`wvu reports --help` shows that script's options. Scripts are only imported
+when their command runs, which keeps `wvu --help` free of requests, bs4,
+pydantic, lxml and the PDF libraries; `python -m wvu.startup_check` enforces
+that along with a startup-time budget.
+
+Install with `pip install -e .` from the repository root.
+"""
+
+import argparse
+import os
+import sys
+from typing import Optional
+
+# Command name -> (script relative to the repository or module name, help)
+COMMANDS = {
+    'crime-log': ('crime-log/crime_log.py', "Scrape the WVU campus crime log"),
+    'meetings': ('meeting-notices/scraper.py', "Scrape WV Secretary of State meeting notices"),
+    'reports': ('wv-legislature/agency_reports.py', "Scrape WV Legislature agency reports"),
+    'lobbying': ('lobbying/lobbying_filings.py', "Scrape lobbying filings for a registration cycle"),
+    'lobbying-text': ('lobbying/extract_text.py', "Extract and search lobbying filing text"),
+    'covid': ('wvu-covid-tests/wvu_tests.py', "Scrape WVU Morgantown COVID test results"),
+    'dhhr': ('dhhr/board_of_review.py', "Extract Board of Review tables from the DHHR PDFs"),
+    'db': ('wvu.build_db', "Incrementally build wvu.db from every dataset"),
+}
+
+DEFAULT_LOBBYING_CYCLE = '2023-2024'
+DEFAULT_FLY_APP = 'wvu-crime-log'
+
+# Live sources scraped by `wvu all`, with their arguments
+SCHEDULED = [
+    ('reports', ['--incremental', '--recent', '3']),
+    ('crime-log', []),
+    ('meetings', []),
+]
+
+# Steps of `wvu all` that run once a source is done: (command, arguments, source)
+FOLLOW_UPS = [
+    ('lobbying-text', ['extract'], 'lobbying'),
+]
+
+
+def load_command(name: str):
+    """Import the script or module behind a command"""
+    target, _ = COMMANDS[name]
+    if target.endswith('.py'):
+        from wvu.paths import import_script
+        return import_script(target)
+    import importlib
+    return importlib.import_module(target)
+
+
+def run_command(name: str, args: list[str]) -> int:
+    """
+    Import a command's script and run its main()
+
+    Args:
+        name: Command name in COMMANDS
+        args: Arguments for the script
+
+    Returns:
+        Exit status
+    """
+    try:
+        load_command(name).main(args)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    return 0
+
+
+def publish(db_path: str, app: str) -> None:
+    """Deploy the database to Fly with datasette"""
+    import subprocess
+    subprocess.run(['datasette', 'publish', 'fly', db_path, '--app', app], check=True)
+
+
+def run_all(args: list[str]) -> int:
+    """Run the scrapers concurrently, then build (and optionally publish) wvu.db"""
+    parser = argparse.ArgumentParser(prog='wvu all', description="Run the scheduled update")
+    parser.add_argument('--lobbying-cycle', default=DEFAULT_LOBBYING_CYCLE, help="Registration cycle to scrape")
+    parser.add_argument('--jobs', type=int, default=4, help="Maximum number of sources scraped at once")
+    parser.add_argument(
+        '--max-requests', type=int, default=None,
+        help="Maximum number of HTTP requests in flight across all sources"
+    )
+    parser.add_argument('--publish', action='store_true', help="Deploy wvu.db with datasette if it changed")
+    parser.add_argument('--app', default=DEFAULT_FLY_APP, help="Fly app to publish to")
+    options = parser.parse_args(args)
+
+    import functools
+    import logging
+
+    from wvu.orchestrator import Orchestrator, Task
+    from wvu.paths import root
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    if options.max_requests:
+        os.environ['WVU_HTTP_MAX_IN_FLIGHT'] = str(options.max_requests)
+
+    steps = SCHEDULED + [('lobbying', [options.lobbying_cycle])]
+    # Import every script up front, on this thread, so only the runs overlap
+    tasks = [Task(name, functools.partial(load_command(name).main, step_args)) for name, step_args in steps]
+    sources = [name for name, _ in steps]
+    for name, step_args, source in FOLLOW_UPS:
+        tasks.append(Task(name, functools.partial(load_command(name).main, step_args), after=[source]))
+
+    db_path = root() / 'wvu.db'
+    build_database = load_command('db').build_database
+    tasks.append(Task('db', functools.partial(build_database, db_path), after=sources))
+    if options.publish:
+        tasks.append(Task(
+            'publish', functools.partial(publish, str(db_path), options.app),
+            requires=['db'], condition=lambda results: bool(results['db'].value)
+        ))
+
+    orchestrator = Orchestrator(tasks, max_workers=options.jobs)
+    results = orchestrator.run()
+    report = orchestrator.report(results)
+    print(report, file=sys.stderr)
+    if os.environ.get('GITHUB_STEP_SUMMARY'):
+        with open(os.environ['GITHUB_STEP_SUMMARY'], 'a') as f:
+            f.write(f"```\n{report}\n```\n")
+
+    return 1 if any(result.status == 'failed' for result in results.values()) else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    commands = "\n".join(f"  {name:<12}{help}" for name, (_, help) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog='wvu',
+        description="Scrape and publish the WVU projects datasets",
+        epilog=f"commands:\n{commands}\n  {'all':<12}Scrape every live source concurrently, then build wvu.db",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--root', default=None,
+        help="Directory holding the dataset directories (default: $WVU_ROOT or this repository)"
+    )
+    parser.add_argument('command', choices=[*COMMANDS, 'all'], metavar='command')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help="Arguments for the command")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Main entry point"""
+    options = build_parser().parse_args(argv)
+    if options.root:
+        os.environ['WVU_ROOT'] = os.path.abspath(options.root)
+
+    if options.command == 'all':
+        return run_all(options.args)
+    return run_command(options.command, options.args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Fast date parsing for sources with a fixed format
+
+The scrapers used to hand every timestamp to a general-purpose parser
+(dateutil, or dateparser for the COVID table), which re-discovers the format
+on each call. A source only ever uses one or two formats, so DateParser
+works out the format from the first value and parses the rest with a
+compiled regex:
+
+    cache       the same string was parsed before
+    fast path   the string matches the source's format exactly
+    fallback    anything else goes to the general parser
+
+The candidate formats are complete, month-first formats that dateutil and
+dateparser read the same way, so the general parser (and its import) is
+only needed for values none of them match exactly, such as ones with a
+time zone or a day-first order. A value the current format misses re-runs
+inference, so a source that changes format switches after one miss.
+
+summary() reports how many values were served from the cache, the fast path
+and the fallback.
+"""
+
+import re
+from datetime import datetime
+from typing import Callable, Optional
+
+# Candidate formats, most specific first; the directives below are supported
+FORMATS = (
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%m/%d/%Y %I:%M:%S %p',
+    '%m/%d/%Y %I:%M %p',
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y',
+    '%B %d, %Y',
+    '%b %d, %Y',
+)
+
+MONTHS = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+          'august', 'september', 'october', 'november', 'december']
+# Full and three-letter month names -> month number
+_MONTH_NUMBERS = {
+    **{name: i for i, name in enumerate(MONTHS, 1)},
+    **{name[:3]: i for i, name in enumerate(MONTHS, 1)},
+}
+
+_DIRECTIVES = {
+    'Y': r'(?P<year>\d{4})',
+    'm': r'(?P<month>\d{1,2})',
+    'd': r'(?P<day>\d{1,2})',
+    'H': r'(?P<hour>\d{1,2})',
+    'I': r'(?P<hour12>\d{1,2})',
+    'M': r'(?P<minute>\d{2})',
+    'S': r'(?P<second>\d{2})',
+    'p': r'(?P<ampm>[AaPp][Mm])',
+    'B': r'(?P<month_name>' + '|'.join(MONTHS) + ')',
+    'b': r'(?P<month_abbr>' + '|'.join(month[:3] for month in MONTHS) + ')',
+}
+
+
+def _dateutil(value: str) -> datetime:
+    from dateutil.parser import parse
+    return parse(value)
+
+
+class CompiledFormat:
+    """A strptime-style format compiled to a strict regex"""
+
+    def __init__(self, fmt: str):
+        self.format = fmt
+        parts = []
+        for literal, directive in re.findall(r'([^%]*)(?:%(.))?', fmt):
+            parts.append(r'\s+'.join(map(re.escape, literal.split(' '))))
+            if directive:
+                parts.append(_DIRECTIVES[directive])
+        self.pattern = re.compile(''.join(parts), re.IGNORECASE)
+
+    def parse(self, text: str) -> Optional[datetime]:
+        """The datetime text represents, or None if it does not match exactly"""
+        match = self.pattern.fullmatch(text)
+        if match is None:
+            return None
+        fields = match.groupdict()
+
+        name = fields.get('month_name') or fields.get('month_abbr')
+        month = _MONTH_NUMBERS[name.lower()] if name else int(fields['month'])
+
+        if fields.get('hour12'):
+            hour = int(fields['hour12'])
+            if not 1 <= hour <= 12:
+                return None
+            hour = hour % 12 + (12 if fields['ampm'].lower() == 'pm' else 0)
+        else:
+            hour = int(fields.get('hour') or 0)
+
+        try:
+            return datetime(
+                int(fields['year']), month, int(fields['day']),
+                hour, int(fields.get('minute') or 0), int(fields.get('second') or 0)
+            )
+        except ValueError:
+            return None
+
+
+class DateParser:
+    """Parses one source's date strings, learning its format from the first values"""
+
+    def __init__(
+        self,
+        name: str,
+        fallback: Callable[[str], Optional[datetime]] = _dateutil,
+        formats: tuple[str, ...] = FORMATS,
+        cache_size: int = 4096
+    ):
+        """
+        Args:
+            name: Source name used in summary()
+            fallback: General parser for values the format does not match;
+                its exceptions propagate as before
+            formats: Candidate formats, tried in order during inference
+            cache_size: Most distinct strings remembered; 0 turns the cache off
+        """
+        self.name = name
+        self.fallback = fallback
+        self.candidates = [CompiledFormat(fmt) for fmt in formats]
+        self.format: Optional[CompiledFormat] = None
+        self.cache_size = cache_size
+        self._cache: dict[str, Optional[datetime]] = {}
+        self.cached = 0
+        self.fast = 0
+        self.fallbacks = 0
+
+    def _infer(self, text: str) -> Optional[datetime]:
+        """Adopt the first candidate format that matches text and parse it"""
+        for candidate in self.candidates:
+            if candidate is not self.format:
+                result = candidate.parse(text)
+                if result is not None:
+                    self.format = candidate
+                    return result
+        return None
+
+    def parse(self, value: Optional[str]) -> Optional[datetime]:
+        """
+        Parse a date string
+
+        Returns:
+            What the fallback parser returns for value; None for None
+        """
+        if value is None:
+            return None
+        if value in self._cache:
+            self.cached += 1
+            return self._cache[value]
+
+        text = value.strip()
+        result = self.format.parse(text) if self.format is not None else None
+        if result is None:
+            result = self._infer(text)
+        if result is not None:
+            self.fast += 1
+        else:
+            self.fallbacks += 1
+            result = self.fallback(value)
+
+        if len(self._cache) < self.cache_size:
+            self._cache[value] = result
+        return result
+
+    @property
+    def total(self) -> int:
+        return self.cached + self.fast + self.fallbacks
+
+    def hit_ratio(self) -> float:
+        """Share of values served without the fallback parser"""
+        return (self.cached + self.fast) / self.total if self.total else 0.0
+
+    def summary(self) -> str:
+        """One-line report of where values were parsed"""
+        fmt = self.format.format if self.format else 'none'
+        return (
+            f"{self.name} dates: {self.total} parsed, {self.cached} cached, {self.fast} fast path, "
+            f"{self.fallbacks} fallback ({self.hit_ratio():.1%} hits, format {fmt})"
+        )
@@ -0,0 +1,290 @@
+"""
+Streaming file downloader
+
+Downloads are streamed in chunks to a .part file next to the destination
+and renamed into place only once the size (and checksum, when one is known)
+has been verified, so a crash never leaves a truncated file at the final
+path. A leftover .part file is resumed with an HTTP Range request. The
+first response's ETag or Last-Modified is saved next to it in a .part.meta
+file and sent as If-Range, so a document that changed since the .part was
+started is downloaded again from the start instead of being spliced onto
+the old prefix. A .part without a validator is not resumed. Downloads ask
+for the identity encoding, since sizes and byte ranges refer to the bytes
+on the wire; a response the server compresses anyway is saved decoded,
+without a size check, and is not resumed. Many
+files are downloaded at once on a bounded worker pool, and a progress and
+throughput summary is logged at the end.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+from wvu import metrics
+from wvu.fetch import ConcurrentFetcher
+from wvu.http import HttpClient, get_client
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadError(Exception):
+    """Raised when a downloaded file fails verification"""
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of a single download"""
+    url: str
+    path: Path
+    status: str  # downloaded, resumed, skipped or failed
+    bytes: int = 0
+    sha256: Optional[str] = None
+    error: Optional[str] = None
+    headers: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.status != 'failed'
+
+
+@dataclass
+class DownloadSummary:
+    """Totals for a batch of downloads"""
+    results: list[DownloadResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def count(self, status: str) -> int:
+        return sum(1 for r in self.results if r.status == status)
+
+    @property
+    def bytes(self) -> int:
+        return sum(r.bytes for r in self.results)
+
+    def __str__(self) -> str:
+        rate = self.bytes / self.elapsed / 1_000_000 if self.elapsed else 0.0
+        return (
+            f"{self.count('downloaded')} downloaded, {self.count('resumed')} resumed, "
+            f"{self.count('skipped')} skipped, {self.count('failed')} failed; "
+            f"{self.bytes / 1_000_000:.1f} MB in {self.elapsed:.1f}s ({rate:.2f} MB/s)"
+        )
+
+
+def _content_range_total(value: str) -> Optional[int]:
+    """Total size from a 'bytes start-end/total' Content-Range header"""
+    match = re.match(r'bytes \d+-\d+/(\d+)', value or '')
+    return int(match.group(1)) if match else None
+
+
+class Downloader:
+    """Downloads files atomically, resuming partial downloads"""
+
+    def __init__(
+        self,
+        client: Optional[HttpClient] = None,
+        max_workers: int = 4,
+        per_host: int = 4,
+        timeout: float = 60,
+        attempts: int = 3
+    ):
+        """
+        Initialize the downloader
+
+        Args:
+            client: HTTP client to use, defaulting to the shared client
+            max_workers: Maximum number of files downloaded at once
+            per_host: Maximum number of concurrent downloads from one host
+            timeout: Timeout in seconds for connecting and between chunks
+            attempts: Tries per file; later tries resume from the .part file
+        """
+        self.client = client or get_client()
+        self.fetcher = ConcurrentFetcher(max_workers=max_workers, per_host=per_host)
+        self.timeout = timeout
+        self.attempts = attempts
+        self._progress_lock = threading.Lock()
+        self._completed = 0
+
+    @staticmethod
+    def part_path(dest: Path) -> Path:
+        """Path of the in-progress file for a destination"""
+        return dest.with_name(dest.name + '.part')
+
+    @staticmethod
+    def meta_path(dest: Path) -> Path:
+        """Path of the validators saved for a destination's .part file"""
+        return dest.with_name(dest.name + '.part.meta')
+
+    def _discard(self, dest: Path) -> None:
+        self.part_path(dest).unlink(missing_ok=True)
+        self.meta_path(dest).unlink(missing_ok=True)
+
+    def _validator(self, dest: Path) -> Optional[str]:
+        """If-Range value for resuming dest's .part file, or None if it cannot be resumed"""
+        try:
+            saved = json.loads(self.meta_path(dest).read_text())
+        except (OSError, ValueError):
+            return None
+        etag = saved.get('ETag')
+        # If-Range only accepts strong ETags
+        if etag and not etag.startswith('W/'):
+            return etag
+        return saved.get('Last-Modified')
+
+    @staticmethod
+    def _same_document(saved: dict, headers) -> bool:
+        """Whether a 206 response carries the validators the .part was started with"""
+        matches = [headers[name] == value for name, value in saved.items() if name in headers]
+        return bool(matches) and all(matches)
+
+    def _fetch(self, url: str, dest: Path, expected_sha256: Optional[str]) -> DownloadResult:
+        """Stream one file into its .part file and move it into place"""
+        part = self.part_path(dest)
+        meta = self.meta_path(dest)
+        offset = part.stat().st_size if part.exists() else 0
+        validator = self._validator(dest) if offset else None
+        if offset and validator is None:
+            logger.info(f"Restarting {dest.name}: no validator saved for the partial download")
+            self._discard(dest)
+            offset = 0
+        headers = {'Accept-Encoding': 'identity'}
+        if offset:
+            headers.update({'Range': f'bytes={offset}-', 'If-Range': validator})
+
+        response = self.client.get(url, stream=True, headers=headers, timeout=self.timeout)
+        try:
+            if response.status_code == 416:
+                # Our partial file is not a prefix of the current document
+                self._discard(dest)
+                raise DownloadError("range not satisfiable, restarting")
+            response.raise_for_status()
+            kept = {
+                name: response.headers[name]
+                for name in ('Content-Type', 'ETag', 'Last-Modified')
+                if name in response.headers
+            }
+            validators = {name: kept[name] for name in ('ETag', 'Last-Modified') if name in kept}
+            # iter_content() decodes gzip and deflate, so lengths and ranges no longer match
+            encoded = response.headers.get('Content-Encoding', 'identity').lower() != 'identity'
+
+            resumed = offset > 0 and response.status_code == 206
+            if resumed:
+                if encoded:
+                    self._discard(dest)
+                    raise DownloadError("server compressed a range response, restarting")
+                if not self._same_document(json.loads(meta.read_text()), response.headers):
+                    # A server that ignores If-Range must not splice two versions together
+                    self._discard(dest)
+                    raise DownloadError("document changed since the partial download, restarting")
+                expected_size = _content_range_total(response.headers.get('Content-Range'))
+            else:
+                # A 200 answer to If-Range means the document changed: start over
+                offset = 0
+                length = response.headers.get('Content-Length')
+                expected_size = int(length) if length and length.isdigit() and not encoded else None
+                if validators and not encoded:
+                    meta.write_text(json.dumps(validators))
+                else:
+                    meta.unlink(missing_ok=True)
+
+            digest = hashlib.sha256()
+            if resumed:
+                with open(part, 'rb') as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                        digest.update(chunk)
+
+            received = 0
+            with metrics.stage('fetch'), open(part, 'ab' if resumed else 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    received += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            self.client.add_stats(bytes_received=received)
+        finally:
+            response.close()
+
+        size = offset + received
+        if expected_size is not None and size != expected_size:
+            raise DownloadError(f"expected {expected_size} bytes, got {size}")
+
+        sha256 = digest.hexdigest()
+        if expected_sha256 and sha256 != expected_sha256:
+            self._discard(dest)
+            raise DownloadError(f"checksum mismatch: expected {expected_sha256}, got {sha256}")
+
+        os.replace(part, dest)
+        meta.unlink(missing_ok=True)
+        status = 'resumed' if resumed else 'downloaded'
+        return DownloadResult(url, dest, status, received, sha256, headers=kept)
+
+    def download(self, url: str, dest: Path, expected_sha256: Optional[str] = None) -> DownloadResult:
+        """
+        Download a URL to a path unless the path already exists
+
+        Args:
+            url: URL to download
+            dest: Final path of the file
+            expected_sha256: Verify the file against this hash when given
+
+        Returns:
+            DownloadResult describing what happened; errors are not raised
+        """
+        dest = Path(dest)
+        if dest.exists():
+            logger.debug(f"Skipped: {dest.name} (already exists)")
+            return DownloadResult(url, dest, 'skipped')
+
+        error = None
+        for attempt in range(1, self.attempts + 1):
+            try:
+                result = self._fetch(url, dest, expected_sha256)
+                logger.info(f"Downloaded: {dest.name} ({result.bytes} bytes, {result.status})")
+                return result
+            except (requests.RequestException, DownloadError, OSError) as e:
+                error = str(e)
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if status is not None and status < 500:
+                    # Client errors such as 404 will not go away on retry
+                    break
+                logger.warning(f"Attempt {attempt} for {url} failed: {e}")
+
+        logger.error(f"Failed to download {url}: {error}")
+        return DownloadResult(url, dest, 'failed', error=error)
+
+    def download_all(self, jobs: list[tuple[str, Path]]) -> DownloadSummary:
+        """
+        Download many files concurrently
+
+        Args:
+            jobs: (url, destination) pairs
+
+        Returns:
+            Summary with one result per job, in job order
+        """
+        total = len(jobs)
+        self._completed = 0
+        start = time.monotonic()
+
+        def run(job: tuple[str, Path]) -> DownloadResult:
+            result = self.download(*job)
+            with self._progress_lock:
+                self._completed += 1
+                if self._completed % 50 == 0 or self._completed == total:
+                    logger.info(f"Progress: {self._completed}/{total} files")
+            return result
+
+        results = self.fetcher.map(run, jobs, url_for=lambda job: job[0])
+        summary = DownloadSummary(results, time.monotonic() - start)
+        logger.info(f"Downloads: {summary}")
+        return summary
@@ -0,0 +1,348 @@
+"""
+Shared HTTP client
+
+One pooled, retrying, rate-limited client used by every scraper. Requests to
+each host go through a token bucket, transient failures (connection errors,
+timeouts, 429 and 5xx responses) are retried with exponential backoff and
+full jitter, and request/byte counters are kept for the run summary.
+
+Setting WVU_HTTP_STUB to the address of a local stub server (see
+wvu.stub_server) sends every request there instead of the real host, which
+lets the scrapers run against recorded fixtures.
+
+Requests made with cache=True go through the on-disk response cache
+(wvu.cache): they are sent with If-None-Match / If-Modified-Since, a 304 is
+answered from disk, and the returned response carries content_hash and
+unchanged attributes so callers can skip parsing a body they have already
+processed. Call mark_processed() once the body's data has been saved.
+
+Counters and time spent sending requests are also added to the current
+scraper run, if any (see wvu.metrics).
+"""
+
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from wvu import metrics
+from wvu.cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, MIB, ResponseCache, cache_key
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "wvu-projects-scraper (+https://github.com/dwillis/wvu-projects)"
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """Thread-safe token bucket that blocks callers until a token is free"""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize the bucket
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens that can accumulate (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until it is available
+
+        Returns:
+            Seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now and sleep off the debt outside the lock
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+@dataclass
+class HttpStats:
+    """Counters for requests made through a client"""
+    requests: int = 0
+    retries: int = 0
+    errors: int = 0
+    bytes_received: int = 0
+    cache_hits: int = 0
+    throttled_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, **counts) -> None:
+        """Increment one or more counters"""
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self) -> str:
+        """Human-readable one-line summary"""
+        return (
+            f"{self.requests} requests, {self.retries} retries, {self.errors} errors, "
+            f"{self.cache_hits} cache hits, {self.bytes_received / 1_000_000:.2f} MB received, "
+            f"{self.throttled_seconds:.1f}s throttled"
+        )
+
+
+class HttpClient:
+    """Pooled requests session with retries, backoff and per-host rate limits"""
+
+    def __init__(
+        self,
+        timeout: float = 30,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        rate: float = 5.0,
+        burst: float = 10.0,
+        pool_maxsize: int = 16,
+        stub_url: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        max_in_flight: Optional[int] = None
+    ):
+        """
+        Initialize the client
+
+        Args:
+            timeout: Default timeout in seconds for each request
+            max_retries: Retries after the first attempt for transient failures
+            backoff_base: Base delay in seconds for exponential backoff
+            backoff_max: Upper bound on a single backoff delay
+            rate: Requests per second allowed to each host
+            burst: Number of requests a host can receive back to back
+            pool_maxsize: Keep-alive connections kept per host
+            stub_url: Send all requests to this local stub server instead
+            cache: Response cache used by requests made with cache=True
+            max_in_flight: Cap on requests being sent at once across all hosts
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate = rate
+        self.burst = burst
+        self.stub_url = stub_url.rstrip('/') if stub_url else None
+        self.cache = cache
+        self.stats = HttpStats()
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+
+    def _bucket(self, host: str) -> TokenBucket:
+        """Get the rate limiter for a host"""
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def _target_url(self, url: str) -> str:
+        """Rewrite a URL to point at the stub server when in test mode"""
+        if not self.stub_url:
+            return url
+        parts = urlsplit(url)
+        target = f"{self.stub_url}/{parts.netloc}{parts.path or '/'}"
+        return f"{target}?{parts.query}" if parts.query else target
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Delay before the next attempt, honoring Retry-After when given"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(self.backoff_max, float(retry_after))
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, method: str, url: str, cache: bool = False, **kwargs) -> requests.Response:
+        """
+        Make a request with rate limiting and retries
+
+        Args:
+            method: HTTP method
+            url: Full URL on the real host
+            cache: Revalidate against and update the response cache
+            **kwargs: Passed through to requests.Session.request
+
+        Returns:
+            The final response; callers still call raise_for_status()
+
+        Raises:
+            requests.RequestException: If every attempt failed to connect
+        """
+        if not cache or kwargs.get('stream'):
+            return self._send(method, url, **kwargs)
+        if self.cache is not None:
+            return self._cached_request(method, url, **kwargs)
+
+        response = self._send(method, url, **kwargs)
+        response.from_cache = False
+        response.cache_key = None
+        response.content_hash = hashlib.sha256(response.content).hexdigest()
+        response.unchanged = False
+        return response
+
+    def _cached_request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Make a conditional request and answer 304s from the cache"""
+        key = cache_key(method, url, kwargs.get('data'))
+        entry = self.cache.get(key)
+        if entry:
+            kwargs['headers'] = {**entry.validators(), **(kwargs.get('headers') or {})}
+
+        response = self._send(method, url, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.add_stats(cache_hits=1)
+            cached = requests.Response()
+            cached.status_code = 200
+            cached.headers = CaseInsensitiveDict(entry.headers)
+            cached.encoding = requests.utils.get_encoding_from_headers(cached.headers)
+            cached._content = self.cache.read_body(entry)
+            cached.url = url
+            cached.request = response.request
+            cached.from_cache = True
+            response = cached
+            content_hash = entry.sha256
+        else:
+            response.from_cache = False
+            content_hash = hashlib.sha256(response.content).hexdigest()
+            if response.status_code == 200:
+                entry = self.cache.store(key, method, url, response.headers, response.content)
+
+        response.cache_key = key
+        response.content_hash = content_hash
+        response.unchanged = bool(entry) and entry.processed_sha256 == content_hash
+        return response
+
+    def add_stats(self, **counts) -> None:
+        """Increment client counters and those of the current run"""
+        self.stats.add(**counts)
+        metrics.record_http(**counts)
+
+    def mark_processed(self, response: requests.Response) -> None:
+        """Record that a cached response's body has been fully processed"""
+        if self.cache is not None and getattr(response, 'cache_key', None):
+            self.cache.mark_processed(response.cache_key, response.content_hash)
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the rate limiter, retrying transient failures"""
+        with metrics.stage('fetch'):
+            return self._send_with_retries(method, url, **kwargs)
+
+    def _send_with_retries(self, method: str, url: str, **kwargs) -> requests.Response:
+        host = urlsplit(url).netloc.lower()
+        target = self._target_url(url)
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            waited = self._bucket(host).acquire()
+            self.add_stats(requests=1, throttled_seconds=waited)
+
+            try:
+                if self._in_flight is not None:
+                    with self._in_flight:
+                        response = self.session.request(method, target, **kwargs)
+                else:
+                    response = self.session.request(method, target, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    self.add_stats(errors=1)
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"{method} {url} failed ({e}), retrying in {delay:.1f}s")
+                self.add_stats(retries=1)
+                time.sleep(delay)
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = self._backoff(attempt, response)
+                logger.warning(
+                    f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s"
+                )
+                response.close()
+                self.add_stats(retries=1)
+                time.sleep(delay)
+                continue
+
+            if response.status_code >= 400:
+                self.add_stats(errors=1)
+            if not kwargs.get('stream'):
+                self.add_stats(bytes_received=len(response.content))
+            return response
+
+        raise AssertionError("unreachable")
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Make a GET request"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Make a POST request"""
+        return self.request('POST', url, **kwargs)
+
+    def close(self) -> None:
+        """Close pooled connections and the cache"""
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """
+    Get the process-wide client, creating it on first use
+
+    WVU_HTTP_STUB, WVU_HTTP_RATE, WVU_HTTP_TIMEOUT and WVU_HTTP_MAX_IN_FLIGHT
+    override the defaults.
+    WVU_CACHE_DIR moves the response cache and WVU_CACHE_MAX_MB bounds its
+    size in MiB; setting WVU_CACHE_DIR to an empty string disables it.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            cache_dir = os.environ.get('WVU_CACHE_DIR', str(DEFAULT_CACHE_DIR))
+            cache = None
+            if cache_dir:
+                max_mb = float(os.environ.get('WVU_CACHE_MAX_MB', DEFAULT_MAX_BYTES / MIB))
+                cache = ResponseCache(Path(cache_dir), max_bytes=int(max_mb * MIB))
+            _client = HttpClient(
+                timeout=float(os.environ.get('WVU_HTTP_TIMEOUT', 30)),
+                rate=float(os.environ.get('WVU_HTTP_RATE', 5.0)),
+                stub_url=os.environ.get('WVU_HTTP_STUB') or None,
+                cache=cache,
+                max_in_flight=int(os.environ.get('WVU_HTTP_MAX_IN_FLIGHT', 0)) or None
+            )
+        return _client
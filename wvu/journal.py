@@ -0,0 +1,162 @@
+"""
+Write-ahead journal for resumable scraper runs
+
+A run appends one JSON line to its journal for every page it finishes, and
+around its final write:
+
+    {"page": KEY, "data": ...}     a page fetched and parsed, with its records
+    {"write": FILE, "size": N}     an append to FILE (N bytes long) is starting
+    {"commit": true}               every result of the run has been written
+
+Each line is flushed and fsynced before the run moves on. If a run fails,
+its journal stays behind and the next run replays it: pages already in the
+journal are taken from it instead of being fetched and parsed again. If the
+failed run had started its final write, each file it appended to is first
+truncated back to the size recorded before that write (or removed, if the
+write created it), so the write can be redone without leaving a partial or
+duplicated tail. Once the commit marker is written the journal is deleted.
+
+Files that are rewritten in full go through atomic_write(), which writes a
+temporary file next to the target and renames it over the target.
+"""
+
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = 'w', **kwargs) -> Iterator:
+    """
+    Open a temporary file that replaces path once the block succeeds
+
+    Args:
+        path: File to replace
+        mode: 'w' or 'wb'
+        **kwargs: Passed to open(), e.g. encoding and newline
+
+    Yields:
+        The open temporary file
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    try:
+        with open(tmp, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+class Journal:
+    """Progress of one scraper run, replayed by the next run if it fails"""
+
+    def __init__(self, path: Path):
+        """
+        Open the journal, replaying what a failed run left behind
+
+        Args:
+            path: Journal file, e.g. meetings.journal in the dataset directory
+        """
+        self.path = Path(path)
+        self.pages: dict[str, Any] = {}
+        self._file = None
+        self._lock = threading.Lock()
+        self._replay()
+
+    def _replay(self) -> None:
+        if not self.path.exists():
+            return
+
+        writes = []
+        committed = False
+        good = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line from a crash mid-append
+                    break
+                good += len(line)
+                if 'page' in entry:
+                    self.pages[entry['page']] = entry['data']
+                elif 'write' in entry:
+                    writes.append(entry)
+                elif entry.get('commit'):
+                    committed = True
+
+        if committed:
+            self.pages.clear()
+            self.path.unlink()
+            return
+
+        os.truncate(self.path, good)
+        for entry in reversed(writes):
+            target = self.path.parent / entry['write']
+            if target.exists() and target.stat().st_size > entry['size']:
+                logger.warning(f"Rolling back an unfinished write to {entry['write']}")
+                if entry['size']:
+                    os.truncate(target, entry['size'])
+                else:
+                    target.unlink()
+        if self.pages:
+            logger.info(f"Resuming from {self.path.name}: {len(self.pages)} pages already done")
+
+    def _append(self, entry: dict) -> None:
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(entry, separators=(',', ':')) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.pages
+
+    def get(self, key: str) -> Optional[Any]:
+        """Data recorded for a page by this or a failed earlier run"""
+        return self.pages.get(key)
+
+    def record(self, key: str, data: Any) -> None:
+        """
+        Record a finished page; safe to call from worker threads
+
+        Args:
+            key: Page identifier, e.g. a notice ID or a year
+            data: JSON-serializable parse results
+        """
+        self._append({'page': key, 'data': data})
+        self.pages[key] = data
+
+    @contextmanager
+    def writing(self, *paths: Path) -> Iterator[None]:
+        """Record the sizes of files before appending to them in the block"""
+        for path in map(Path, paths):
+            size = path.stat().st_size if path.exists() else 0
+            self._append({'write': os.path.relpath(path, self.path.parent), 'size': size})
+        yield
+
+    def commit(self) -> None:
+        """Mark the run's results as written and delete the journal"""
+        if self._file is not None or self.path.exists():
+            self._append({'commit': True})
+            self.close()
+            self.path.unlink()
+        self.pages.clear()
+
+    def close(self) -> None:
+        """Close the journal file, leaving it for the next run to replay"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
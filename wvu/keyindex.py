@@ -0,0 +1,281 @@
+"""
+Persistent key index for append-only CSV datasets
+
+Scrapers need the set of keys already in a dataset (notice IDs, report URLs)
+to skip known records. Instead of reading the whole dataset on every run,
+the keys are kept in a small SQLite table that is looked up per key.
+
+A dataset is a single CSV or a month-partitioned one (see wvu.partitions).
+For each file the index records how many bytes it covers and a fingerprint
+of the block just before that point. On open it compares that with the file:
+
+    same size              the file's keys are current
+    grown, same prefix     only the appended tail is scanned
+    shrunk or rewritten    the file's keys are re-read
+    gone                   the file's keys are dropped
+
+so only files that changed are read. Appends go through KeyIndex.append(),
+which writes the rows, fsyncs, and then records the keys and the new sizes
+in one transaction. A crash in between leaves a file ahead of the index,
+which the next open repairs by scanning its tail. Appends made by other
+tools (or a git pull) are picked up the same way, so the index is only ever
+a cache of the files.
+
+For numeric keys the index also keeps a high-water mark, the largest key
+seen, so a scraper can skip everything at or below it without lookups.
+
+Indexes live under .index/ in the data root (WVU_INDEX_DIR moves them) and
+are not committed; a missing index is rebuilt on first use.
+"""
+
+import csv
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Sequence, Union
+
+from wvu.partitions import PartitionedCSV
+from wvu.paths import root
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS keys (
+    key TEXT NOT NULL,
+    file TEXT NOT NULL,
+    PRIMARY KEY (key, file)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS keys_file ON keys (file);
+CREATE TABLE IF NOT EXISTS files (
+    file TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    high_water INTEGER
+);
+"""
+
+# Bytes before the covered size that are hashed to detect a rewritten file
+FINGERPRINT_BYTES = 4096
+# Keys per IN (...) lookup, well under SQLite's parameter limit
+LOOKUP_CHUNK = 500
+
+
+def default_index_dir() -> Path:
+    return Path(os.environ.get('WVU_INDEX_DIR') or root() / '.index')
+
+
+def _fingerprint(f, size: int) -> str:
+    """Hash of the block of an open binary file that ends at size"""
+    start = max(0, size - FINGERPRINT_BYTES)
+    f.seek(start)
+    return hashlib.sha256(f.read(size - start)).hexdigest()
+
+
+def _numeric(key: str) -> Optional[int]:
+    return int(key) if key.isdigit() else None
+
+
+class _SingleCSV:
+    """A plain CSV file, indexed like a dataset with one partition"""
+
+    def __init__(self, path: Path, fieldnames: list[str]):
+        self.path = Path(path)
+        self.directory = self.path.parent
+        self.fieldnames = fieldnames
+
+    def paths(self) -> list[Path]:
+        return [self.path] if self.path.exists() else []
+
+    def append(self, rows: Iterable[Sequence]) -> dict[Path, list[list[str]]]:
+        rows = [['' if value is None else str(value) for value in row] for row in rows]
+        if not rows:
+            return {}
+        new_file = not self.path.exists()
+        with open(self.path, 'a', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(self.fieldnames)
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        return {self.path: rows}
+
+
+class KeyIndex:
+    """Keys of an append-only dataset, kept in step with its files"""
+
+    def __init__(
+        self,
+        source: Union[Path, PartitionedCSV],
+        key: Callable[[dict], Optional[str]],
+        fieldnames: Optional[list[str]] = None,
+        index_path: Optional[Path] = None
+    ):
+        """
+        Open the index and bring it up to date with the dataset
+
+        Args:
+            source: A CSV file that starts with a header row, or a partitioned dataset
+            key: Key of a row (as a dict of strings), or None to skip the row
+            fieldnames: For a CSV file, the header written if it does not exist yet
+            index_path: SQLite file, defaulting to one under default_index_dir()
+        """
+        if isinstance(source, PartitionedCSV):
+            self.source = source
+            location = source.directory
+        else:
+            self.source = _SingleCSV(source, fieldnames or [])
+            location = self.source.path
+        self.key = key
+
+        if index_path is None:
+            try:
+                relative = location.resolve().relative_to(root().resolve())
+            except ValueError:
+                relative = Path(location.name)
+            index_path = default_index_dir() / relative.with_suffix('.keys.db')
+        self.index_path = Path(index_path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.index_path)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.db.executescript("DROP TABLE IF EXISTS keys; DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS state;")
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.executescript(SCHEMA)
+        self.sync()
+
+    def _name(self, path: Path) -> str:
+        return path.relative_to(self.source.directory).as_posix()
+
+    def _scan(self, path: Path, offset: int) -> int:
+        """
+        Index a file's rows from a byte offset at a row boundary
+
+        Returns:
+            Number of keyed rows scanned
+        """
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            header = next(csv.reader(f), None) or self.source.fieldnames
+
+        with open(path, 'rb') as raw:
+            raw.seek(offset)
+            text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+            reader = csv.DictReader(text, fieldnames=header)
+            if offset == 0:
+                next(reader, None)
+            keys = [key for key in map(self.key, reader) if key]
+            size = raw.seek(0, os.SEEK_END)
+            fingerprint = _fingerprint(raw, size)
+
+        self._record(self._name(path), keys, size, fingerprint)
+        return len(keys)
+
+    def _record(self, name: str, keys: list[str], size: int, fingerprint: str) -> None:
+        numbers = [n for n in map(_numeric, keys) if n is not None]
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO keys VALUES (?, ?)", ((key, name) for key in keys))
+            self.db.execute(
+                "INSERT INTO files (file, size, fingerprint, high_water) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (file) DO UPDATE SET size = excluded.size, fingerprint = excluded.fingerprint, "
+                "high_water = MAX(COALESCE(files.high_water, excluded.high_water), "
+                "COALESCE(excluded.high_water, files.high_water))",
+                (name, size, fingerprint, max(numbers) if numbers else None)
+            )
+
+    def _forget(self, name: str) -> None:
+        with self.db:
+            self.db.execute("DELETE FROM keys WHERE file = ?", (name,))
+            self.db.execute("DELETE FROM files WHERE file = ?", (name,))
+
+    def rebuild(self) -> int:
+        """
+        Re-index every file
+
+        Returns:
+            Number of distinct keys
+        """
+        with self.db:
+            self.db.execute("DELETE FROM keys")
+            self.db.execute("DELETE FROM files")
+        self.sync()
+        return len(self)
+
+    def sync(self) -> None:
+        """Bring the index up to date with the dataset's files"""
+        current = {self._name(path): path for path in self.source.paths()}
+        state = {
+            file: (size, fingerprint)
+            for file, size, fingerprint in self.db.execute("SELECT file, size, fingerprint FROM files")
+        }
+
+        for name in state.keys() - current.keys():
+            self._forget(name)
+
+        scanned = 0
+        for name, path in current.items():
+            if name not in state:
+                scanned += self._scan(path, 0)
+                continue
+
+            covered, fingerprint = state[name]
+            with open(path, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                prefix_unchanged = size >= covered and _fingerprint(f, covered) == fingerprint
+            if not prefix_unchanged:
+                logger.info(f"{name} was rewritten, re-reading its keys")
+                self._forget(name)
+                scanned += self._scan(path, 0)
+            elif size > covered:
+                scanned += self._scan(path, covered)
+
+        if scanned:
+            logger.info(f"Indexed {scanned} keys from {self.source.directory.name}")
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(DISTINCT key) FROM keys").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        return self.db.execute("SELECT 1 FROM keys WHERE key = ?", (key,)).fetchone() is not None
+
+    def existing(self, keys: Iterable[str]) -> set[str]:
+        """The given keys that are already in the dataset"""
+        keys = list(dict.fromkeys(k for k in keys if k is not None))
+        found: set[str] = set()
+        for i in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[i:i + LOOKUP_CHUNK]
+            found.update(
+                row[0] for row in self.db.execute(
+                    f"SELECT DISTINCT key FROM keys WHERE key IN ({', '.join('?' for _ in chunk)})", chunk
+                )
+            )
+        return found
+
+    def high_water_mark(self) -> Optional[int]:
+        """Largest numeric key in the dataset, if any"""
+        return self.db.execute("SELECT MAX(high_water) FROM files").fetchone()[0]
+
+    def append(self, rows: Iterable[Sequence]) -> int:
+        """
+        Append rows to the dataset and record their keys
+
+        Args:
+            rows: Rows in field order; None is written as an empty field
+
+        Returns:
+            Number of rows written
+        """
+        self.sync()
+        written = self.source.append(rows)
+        for path, group in written.items():
+            keys = [key for key in (self.key(dict(zip(self.source.fieldnames, row))) for row in group) if key]
+            with open(path, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                self._record(self._name(path), keys, size, _fingerprint(f, size))
+        return sum(len(group) for group in written.values())
+
+    def close(self) -> None:
+        """Close the index database"""
+        self.db.close()
@@ -0,0 +1,368 @@
+"""
+Per-run metrics
+
+Each scraper run is wrapped in a RunMetrics, which times the run's stages
+(fetch, parse, validate, write), counts records parsed, new and changed and
+errors, and collects the HTTP counters (requests, bytes, cache hits) for the
+requests the run made. When the run ends a row is added to the runs table in
+wvu.db, so Datasette can chart each scraper's latency and yield over time.
+
+The current run is kept in a context variable. The shared HTTP client and
+the concurrent fetcher read it from there, so requests made on worker
+threads count against the run that made them, even when `wvu all` runs
+several scrapers at once. Stage times are summed across worker threads.
+
+A finished run is compared with the scraper's recent successful runs. If its
+duration or record count is far from their median, a warning is logged and
+the reason is stored in the run's alert column. Runs that skipped unchanged
+pages are left out of the record-count comparison, since a quiet day
+legitimately parses nothing.
+
+Set WVU_METRICS_DB to record into another database, or to an empty string to
+turn recording off.
+
+Usage:
+    python -m wvu.metrics list [--scraper NAME] [--limit N]
+    python -m wvu.metrics alerts [--limit N]
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+from wvu.paths import root
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('fetch', 'parse', 'validate', 'write')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    scraper TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    seconds REAL NOT NULL,
+    fetch_seconds REAL NOT NULL,
+    parse_seconds REAL NOT NULL,
+    validate_seconds REAL NOT NULL,
+    write_seconds REAL NOT NULL,
+    requests INTEGER NOT NULL,
+    retries INTEGER NOT NULL,
+    http_errors INTEGER NOT NULL,
+    bytes_received INTEGER NOT NULL,
+    cache_hits INTEGER NOT NULL,
+    throttled_seconds REAL NOT NULL,
+    records_parsed INTEGER NOT NULL,
+    records_new INTEGER NOT NULL,
+    records_changed INTEGER NOT NULL,
+    pages_unchanged INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    alert TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_scraper_started ON runs (scraper, started_at);
+"""
+
+# Successful runs compared against, and how many are needed before alerting
+HISTORY_RUNS = 20
+MIN_HISTORY = 5
+# A run alerts when its duration or record count is this many times above
+# or below the median of its history
+ALERT_FACTOR = 3.0
+# Durations closer than this to the median never alert, however large the ratio
+MIN_DURATION_DELTA = 10.0
+
+_current: ContextVar[Optional['RunMetrics']] = ContextVar('wvu_run_metrics', default=None)
+
+
+def _now() -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+
+def default_db_path() -> Optional[Path]:
+    """Database runs are recorded in, or None when recording is turned off"""
+    path = os.environ.get('WVU_METRICS_DB', str(root() / 'wvu.db'))
+    return Path(path) if path else None
+
+
+@dataclass
+class RunCounts:
+    """Counters for one run"""
+    requests: int = 0
+    retries: int = 0
+    http_errors: int = 0
+    bytes_received: int = 0
+    cache_hits: int = 0
+    throttled_seconds: float = 0.0
+    records_parsed: int = 0
+    records_new: int = 0
+    records_changed: int = 0
+    pages_unchanged: int = 0
+    errors: int = 0
+
+
+class RunMetrics:
+    """Stage timings and counters for one scraper run"""
+
+    def __init__(self, scraper: str, db_path: Optional[Path] = None):
+        """
+        Initialize the run
+
+        Args:
+            scraper: Name the run is recorded under, e.g. 'meetings'
+            db_path: Database to record into, defaulting to default_db_path()
+        """
+        self.scraper = scraper
+        self.db_path = Path(db_path) if db_path else default_db_path()
+        self.counts = RunCounts()
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.status = 'running'
+        self.error: Optional[str] = None
+        self.alert: Optional[str] = None
+        self.started_at = ''
+        self.seconds = 0.0
+        self._started = 0.0
+        self._lock = threading.Lock()
+        self._token = None
+
+    def __enter__(self) -> 'RunMetrics':
+        self.started_at = _now()
+        self._started = time.monotonic()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current.reset(self._token)
+        if exc_type is None or (exc_type is SystemExit and not exc.code):
+            self.status = 'ok'
+        else:
+            self.status = 'failed'
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.finish()
+        return False
+
+    def count(self, **counts) -> None:
+        """Increment one or more counters"""
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self.counts, name, getattr(self.counts, name) + value)
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        """Add time spent in a stage"""
+        if stage not in self.stages:
+            raise ValueError(f"Unknown stage: {stage}")
+        with self._lock:
+            self.stages[stage] += seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the block as part of a stage"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.monotonic() - started)
+
+    def summary(self) -> str:
+        """Human-readable one-line summary"""
+        stages = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.stages.items())
+        c = self.counts
+        return (
+            f"{self.status} in {self.seconds:.1f}s ({stages}); "
+            f"{c.records_parsed} parsed, {c.records_new} new, {c.records_changed} changed, "
+            f"{c.errors} errors; {c.requests} requests, {c.cache_hits} cache hits, "
+            f"{c.bytes_received / 1_000_000:.2f} MB"
+        )
+
+    def check(self, db: sqlite3.Connection) -> Optional[str]:
+        """
+        Compare the run with the scraper's recent successful runs
+
+        Returns:
+            Why the run looks abnormal, or None
+        """
+        history = db.execute(
+            "SELECT seconds, records_parsed, pages_unchanged FROM runs "
+            "WHERE scraper = ? AND status = 'ok' ORDER BY id DESC LIMIT ?",
+            (self.scraper, HISTORY_RUNS)
+        ).fetchall()
+        if len(history) < MIN_HISTORY:
+            return None
+
+        reasons = []
+        median = statistics.median(row[0] for row in history)
+        if abs(self.seconds - median) >= MIN_DURATION_DELTA and not (
+            median / ALERT_FACTOR <= self.seconds <= median * ALERT_FACTOR
+        ):
+            reasons.append(f"took {self.seconds:.1f}s, median {median:.1f}s")
+
+        parsed = [row[1] for row in history if not row[2]]
+        if not self.counts.pages_unchanged and len(parsed) >= MIN_HISTORY:
+            median = statistics.median(parsed)
+            records = self.counts.records_parsed
+            if median and not (median / ALERT_FACTOR <= records <= median * ALERT_FACTOR):
+                reasons.append(f"parsed {records} records, median {median:g}")
+
+        return "; ".join(reasons) or None
+
+    def finish(self) -> None:
+        """Record the run in the database and alert on outliers"""
+        self.seconds = time.monotonic() - self._started
+        logger.info(f"Run {self.scraper}: {self.summary()}")
+        if self.db_path is None:
+            return
+
+        try:
+            db = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                with db:
+                    db.executescript(SCHEMA)
+                    if self.status == 'ok':
+                        self.alert = self.check(db)
+                    row = {
+                        'scraper': self.scraper,
+                        'started_at': self.started_at,
+                        'finished_at': _now(),
+                        'status': self.status,
+                        'error': self.error,
+                        'seconds': round(self.seconds, 3),
+                        **{f'{name}_seconds': round(s, 3) for name, s in self.stages.items()},
+                        **asdict(self.counts),
+                        'alert': self.alert,
+                    }
+                    db.execute(
+                        f"INSERT INTO runs ({', '.join(row)}) VALUES ({', '.join('?' for _ in row)})",
+                        list(row.values())
+                    )
+            finally:
+                db.close()
+        except sqlite3.Error as e:
+            # Losing a metrics row must never fail the scrape itself
+            logger.warning(f"Could not record run in {self.db_path}: {e}")
+            return
+
+        if self.alert:
+            logger.warning(f"ALERT {self.scraper}: {self.alert}")
+
+
+def current() -> Optional[RunMetrics]:
+    """The run being recorded in this context, if any"""
+    return _current.get()
+
+
+def count(**counts) -> None:
+    """Increment counters on the current run; does nothing outside a run"""
+    run = _current.get()
+    if run is not None:
+        run.count(**counts)
+
+
+def record_http(**counts) -> None:
+    """Add HTTP client counters to the current run"""
+    run = _current.get()
+    if run is not None:
+        if 'errors' in counts:
+            counts['http_errors'] = counts.pop('errors')
+        run.count(**counts)
+
+
+def add_time(name: str, seconds: float) -> None:
+    """Add time to a stage of the current run; does nothing outside a run"""
+    run = _current.get()
+    if run is not None:
+        run.add_time(name, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the block as part of a stage of the current run, if any"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        add_time(name, time.monotonic() - started)
+
+
+class TimedIterator:
+    """
+    Wraps an iterator, timing each item it produces as part of a stage
+
+    Lets a streaming parse that is consumed by a writer be split into parse
+    and write time: the writer's own time is its total minus `seconds`.
+    """
+
+    def __init__(self, stage: str, iterable):
+        self.stage = stage
+        self.count = 0
+        self.seconds = 0.0
+        self._iterator = iter(iterable)
+
+    def __iter__(self) -> 'TimedIterator':
+        return self
+
+    def __next__(self):
+        started = time.monotonic()
+        try:
+            item = next(self._iterator)
+        finally:
+            elapsed = time.monotonic() - started
+            self.seconds += elapsed
+            add_time(self.stage, elapsed)
+        self.count += 1
+        return item
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Show recorded scraper runs")
+    parser.add_argument('--db', type=Path, default=None, help="Database (default: wvu.db)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    show = commands.add_parser('list', help="List recent runs")
+    show.add_argument('--scraper', help="Only runs of this scraper")
+    show.add_argument('--limit', type=int, default=20, help="Number of runs to show")
+    alerts = commands.add_parser('alerts', help="List recent runs that raised an alert")
+    alerts.add_argument('--limit', type=int, default=20, help="Number of runs to show")
+    args = parser.parse_args()
+
+    db_path = args.db or default_db_path()
+    if db_path is None or not db_path.exists():
+        sys.exit("No runs recorded")
+    db = sqlite3.connect(db_path)
+    db.executescript(SCHEMA)
+
+    where, params = [], []
+    if args.command == 'list' and args.scraper:
+        where.append("scraper = ?")
+        params.append(args.scraper)
+    if args.command == 'alerts':
+        where.append("alert IS NOT NULL")
+    sql = (
+        "SELECT started_at, scraper, status, seconds, records_parsed, records_new, "
+        "records_changed, errors, requests, alert FROM runs"
+        + (f" WHERE {' AND '.join(where)}" if where else "")
+        + " ORDER BY id DESC LIMIT ?"
+    )
+
+    writer = sys.stdout.write
+    writer(f"{'started':<20}  {'scraper':<10} {'status':<7} {'seconds':>8} "
+           f"{'parsed':>7} {'new':>6} {'changed':>7} {'errors':>6} {'requests':>8}  alert\n")
+    for row in db.execute(sql, params + [args.limit]):
+        writer(f"{row[0]:<20}  {row[1]:<10} {row[2]:<7} {row[3]:>8.1f} "
+               f"{row[4]:>7} {row[5]:>6} {row[6]:>7} {row[7]:>6} {row[8]:>8}  {row[9] or ''}\n")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Run tasks as a dependency graph on a thread pool
+
+Each task starts as soon as the tasks it depends on have finished, up to a
+global cap on how many run at once, so independent scrapers overlap and the
+wall time of a run is its slowest chain rather than the sum of every step.
+
+A failing task never stops the run. Tasks listed in another task's `after`
+only order it; tasks listed in `requires` must succeed, otherwise the
+dependent task is skipped. A finished run is summarised in a timing report.
+"""
+
+import contextvars
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Task:
+    """A named unit of work and the tasks it waits for"""
+    name: str
+    run: Callable[[], Any]
+    after: list[str] = field(default_factory=list)
+    requires: list[str] = field(default_factory=list)
+    # Checked once dependencies are done; returning False skips the task
+    condition: Optional[Callable[[dict[str, 'TaskResult']], bool]] = None
+
+    @property
+    def dependencies(self) -> list[str]:
+        return self.after + self.requires
+
+
+@dataclass
+class TaskResult:
+    """Outcome of one task"""
+    name: str
+    status: str  # ok, failed or skipped
+    started: float = 0.0
+    seconds: float = 0.0
+    value: Any = None
+    error: Optional[str] = None
+
+
+class Orchestrator:
+    """Runs a graph of tasks concurrently with per-task failure isolation"""
+
+    def __init__(self, tasks: list[Task], max_workers: int = 4):
+        """
+        Initialize the orchestrator
+
+        Args:
+            tasks: Tasks to run; dependencies must name other tasks
+            max_workers: Maximum number of tasks running at once
+
+        Raises:
+            ValueError: On duplicate names, unknown dependencies or cycles
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.tasks = {task.name: task for task in tasks}
+        if len(self.tasks) != len(tasks):
+            raise ValueError("Task names must be unique")
+        for task in tasks:
+            unknown = set(task.dependencies) - set(self.tasks)
+            if unknown:
+                raise ValueError(f"{task.name} depends on unknown tasks: {', '.join(sorted(unknown))}")
+        self._check_acyclic()
+        self.max_workers = max_workers
+        self.elapsed = 0.0
+
+    def _check_acyclic(self) -> None:
+        remaining = {name: set(task.dependencies) for name, task in self.tasks.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps & remaining.keys()]
+            if not ready:
+                raise ValueError(f"Dependency cycle between: {', '.join(sorted(remaining))}")
+            for name in ready:
+                del remaining[name]
+
+    def _execute(self, task: Task, origin: float) -> TaskResult:
+        started = time.monotonic()
+        logger.info(f"{task.name}: started")
+
+        def result(status: str, value: Any = None, error: Optional[str] = None) -> TaskResult:
+            return TaskResult(task.name, status, started - origin, time.monotonic() - started, value, error)
+
+        try:
+            # Each task gets its own context so per-run state such as the
+            # current metrics run (wvu.metrics) does not leak between tasks
+            value = contextvars.copy_context().run(task.run)
+        except SystemExit as e:
+            # A script's main() exiting must not end the whole run
+            if not e.code:
+                return result('ok')
+            return result('failed', error=f"exit status {e.code}")
+        except Exception as e:
+            logger.exception(f"{task.name}: failed")
+            return result('failed', error=f"{type(e).__name__}: {e}")
+        return result('ok', value)
+
+    def _blocked(self, task: Task, results: dict[str, TaskResult]) -> Optional[str]:
+        """Why a task whose dependencies are done should be skipped, if it should"""
+        failed = [name for name in task.requires if results[name].status != 'ok']
+        if failed:
+            return f"requires {', '.join(failed)}"
+        if task.condition is not None and not task.condition(results):
+            return "nothing to do"
+        return None
+
+    def run(self) -> dict[str, TaskResult]:
+        """
+        Run every task
+
+        Returns:
+            Result of each task, in the order tasks were given
+        """
+        origin = time.monotonic()
+        results: dict[str, TaskResult] = {}
+        waiting = dict(self.tasks)
+        running: dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while waiting or running:
+                for name, task in list(waiting.items()):
+                    if not all(dep in results for dep in task.dependencies):
+                        continue
+                    del waiting[name]
+                    reason = self._blocked(task, results)
+                    if reason:
+                        logger.info(f"{name}: skipped ({reason})")
+                        results[name] = TaskResult(name, 'skipped', time.monotonic() - origin, error=reason)
+                    else:
+                        running[pool.submit(self._execute, task, origin)] = name
+
+                if not running:
+                    # Skipping may have unblocked more tasks
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result = future.result()
+                    results[name] = result
+                    logger.info(f"{name}: {result.status} in {result.seconds:.1f}s")
+
+        self.elapsed = time.monotonic() - origin
+        return {name: results[name] for name in self.tasks}
+
+    def report(self, results: dict[str, TaskResult]) -> str:
+        """Timing report for a finished run"""
+        lines = [f"{'task':<14} {'status':<8} {'start':>7} {'seconds':>8}  note"]
+        for result in sorted(results.values(), key=lambda r: r.started):
+            lines.append(
+                f"{result.name:<14} {result.status:<8} {result.started:>7.1f} {result.seconds:>8.1f}  {result.error or ''}"
+            )
+        busy = sum(result.seconds for result in results.values())
+        lines.append(
+            f"wall time {self.elapsed:.1f}s for {busy:.1f}s of task time "
+            f"({self.max_workers} at a time)"
+        )
+        return "\n".join(lines)
@@ -0,0 +1,90 @@
+"""
+Fast HTML extraction with lxml
+
+The scrapers used to build a full BeautifulSoup html.parser tree for every
+page and then walk it. Here pages are parsed by libxml2 and the few elements
+a scraper needs are pulled out with XPath. The helpers reproduce what the
+BeautifulSoup code returned, so scraped values stay byte-for-byte identical.
+BeautifulSoup's `.text` becomes text(), and the string before a tag
+(`tag.previous`) becomes text_before().
+
+libxml2 turns every carriage return into a newline while html.parser keeps
+them, and pages from Windows servers are full of CRLFs. Before parsing, CRs
+outside tags are swapped for a private-use character. text() swaps them
+back.
+"""
+
+import re
+import threading
+from typing import Optional
+
+from lxml import etree, html
+
+# Private-use code point standing in for \r while libxml2 parses the page
+_CR = '\ue000'
+_TAG_OR_CR = re.compile(r'(<[^>]*>)|\r')
+_local = threading.local()
+
+
+def _protect_cr(match: re.Match) -> str:
+    return match.group(1) or _CR
+
+
+def _parser() -> html.HTMLParser:
+    # lxml parsers must not be shared between threads
+    parser = getattr(_local, 'parser', None)
+    if parser is None:
+        parser = _local.parser = html.HTMLParser(encoding='utf-8')
+    return parser
+
+
+def parse_html(text: str) -> html.HtmlElement:
+    """
+    Parse a page into an lxml tree
+
+    Args:
+        text: Page HTML
+
+    Returns:
+        Root element; an empty <html> element for an empty page
+    """
+    if '\r' in text:
+        text = _TAG_OR_CR.sub(_protect_cr, text)
+    try:
+        # Bytes avoid lxml's refusal of str input that declares an encoding
+        return html.document_fromstring(text.encode('utf-8'), parser=_parser())
+    except etree.ParserError:
+        return html.Element('html')
+
+
+def text(element) -> str:
+    """All text inside an element, like BeautifulSoup's .text"""
+    return element.text_content().replace(_CR, '\r')
+
+
+def _last_text(element) -> Optional[str]:
+    """The last string inside an element, in document order"""
+    for child in reversed(element):
+        if child.tail:
+            return child.tail
+        inner = _last_text(child)
+        if inner is not None:
+            return inner
+    return element.text or None
+
+
+def text_before(element) -> Optional[str]:
+    """
+    The string immediately before an element, like BeautifulSoup's `.previous`
+    when that is a string
+
+    Returns:
+        The text, or None when the element is first in its parent or follows
+        an empty element
+    """
+    previous = element.getprevious()
+    if previous is None:
+        found = element.getparent().text if element.getparent() is not None else None
+    else:
+        found = previous.tail or _last_text(previous)
+    return found.replace(_CR, '\r') if found else None
@@ -0,0 +1,299 @@
+"""
+Month-partitioned CSV datasets
+
+Large datasets are stored as one CSV per month under a directory, with a
+manifest of each partition's row count, size and hash:
+
+    meeting_notices/
+        manifest.json
+        2023/2023-12.csv
+        2024/2024-01.csv
+        undated.csv         rows whose date is missing or unparseable
+
+Every partition starts with the header row. Appends only touch the
+partitions the new rows fall in, and full rewrites only replace partitions
+whose content changed, so a daily update rewrites a few small files and git
+diffs stay small as the archive grows. Readers use the manifest to find
+changed partitions without opening the others: wvu.build_db compares
+partition hashes with those it last loaded, and wvu.keyindex tracks each
+partition's size.
+
+When a dataset is opened, each partition's size is checked against the
+manifest, and a partition whose size differs is hashed again. This covers
+an append rolled back by wvu.journal or a partition edited by hand.
+
+Usage:
+    python -m wvu.partitions check DIRECTORY
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from wvu.journal import atomic_write
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+UNDATED = 'undated'
+
+
+def partition_file(key: str) -> str:
+    """Path of a partition relative to the dataset directory"""
+    return f"{UNDATED}.csv" if key == UNDATED else f"{key[:4]}/{key}.csv"
+
+
+def describe(path: Path) -> dict:
+    """Manifest entry for a partition file"""
+    data = path.read_bytes()
+    rows = sum(1 for _ in csv.reader(io.StringIO(data.decode('utf-8'), newline=''))) - 1
+    return {'rows': max(rows, 0), 'bytes': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+
+
+class PartitionedCSV:
+    """A CSV dataset split into one file per month"""
+
+    def __init__(self, directory: Path, fieldnames: list[str], partition: Callable[[dict], str]):
+        """
+        Open the dataset, refreshing manifest entries that are out of date
+
+        Args:
+            directory: Directory holding the partitions and manifest.json
+            fieldnames: Header row of every partition
+            partition: Partition key of a row (as a dict of strings): 'YYYY-MM' or UNDATED
+        """
+        self.directory = Path(directory)
+        self.fieldnames = fieldnames
+        self.partition = partition
+        self.manifest_path = self.directory / MANIFEST
+        self.partitions: dict[str, dict] = {}
+        self.dirty = False
+
+        if self.manifest_path.exists():
+            self.partitions = json.loads(self.manifest_path.read_text())['partitions']
+        self.refresh()
+
+    def refresh(self) -> list[str]:
+        """
+        Bring manifest entries in line with the files on disk
+
+        Returns:
+            Keys of partitions whose entries changed
+        """
+        changed = []
+        for key in list(self.partitions):
+            if not self.path(key).exists():
+                del self.partitions[key]
+                changed.append(key)
+
+        on_disk = {path.stem: path for path in self.directory.glob('[0-9][0-9][0-9][0-9]/*.csv')}
+        undated = self.directory / partition_file(UNDATED)
+        if undated.exists():
+            on_disk[UNDATED] = undated
+
+        for key, path in on_disk.items():
+            entry = self.partitions.get(key)
+            if entry is None or entry['bytes'] != path.stat().st_size:
+                logger.info(f"Refreshing manifest entry for {self.directory.name}/{partition_file(key)}")
+                self.partitions[key] = {'file': partition_file(key), **describe(path)}
+                changed.append(key)
+
+        self.dirty = self.dirty or bool(changed)
+        return changed
+
+    def exists(self) -> bool:
+        """Whether the dataset has any partitions"""
+        return bool(self.partitions)
+
+    def keys(self) -> list[str]:
+        """Partition keys in date order, undated last"""
+        return sorted(self.partitions, key=lambda key: (key == UNDATED, key))
+
+    def path(self, key: str) -> Path:
+        return self.directory / partition_file(key)
+
+    def paths(self) -> list[Path]:
+        """Partition files in date order"""
+        return [self.path(key) for key in self.keys()]
+
+    def rows(self, keys: Optional[Iterable[str]] = None) -> Iterator[list[str]]:
+        """Data rows of the given partitions (default all), without headers"""
+        for key in self.keys() if keys is None else keys:
+            with open(self.path(key), 'r', encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                yield from reader
+
+    def read(self, keys: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        """Rows of the given partitions (default all) as dicts"""
+        for row in self.rows(keys):
+            yield dict(zip(self.fieldnames, row))
+
+    def total_rows(self) -> int:
+        """Number of data rows across all partitions"""
+        return sum(entry['rows'] for entry in self.partitions.values())
+
+    def _group(self, rows: Iterable[Sequence]) -> dict[str, list[list[str]]]:
+        groups: dict[str, list[list[str]]] = {}
+        for row in rows:
+            values = ['' if value is None else str(value) for value in row]
+            groups.setdefault(self.partition(dict(zip(self.fieldnames, values))), []).append(values)
+        return groups
+
+    def paths_for(self, rows: Iterable[Sequence]) -> list[Path]:
+        """Partition files that appending the rows would touch"""
+        return [self.path(key) for key in self._group(rows)]
+
+    def append(self, rows: Iterable[Sequence]) -> dict[Path, list[list[str]]]:
+        """
+        Append rows to their partitions and update the manifest
+
+        Args:
+            rows: Rows in field order; None is written as an empty field
+
+        Returns:
+            The rows written to each partition file, as strings
+        """
+        written = {}
+        for key, group in self._group(rows).items():
+            path = self.path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            new_file = not path.exists()
+            with open(path, 'a', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(self.fieldnames)
+                writer.writerows(group)
+                f.flush()
+                os.fsync(f.fileno())
+            self.partitions[key] = {'file': partition_file(key), **describe(path)}
+            written[path] = group
+
+        if written:
+            self.dirty = True
+            self.save_manifest()
+        return written
+
+    def write(self, rows: Iterable[Sequence]) -> list[str]:
+        """
+        Replace the dataset's contents, rewriting only partitions that changed
+
+        Returns:
+            Keys of partitions written or removed
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        changed = []
+        groups = self._group(rows)
+
+        for key, group in groups.items():
+            out = io.StringIO(newline='')
+            writer = csv.writer(out)
+            writer.writerow(self.fieldnames)
+            writer.writerows(group)
+            data = out.getvalue().encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()
+            if self.partitions.get(key, {}).get('sha256') == digest:
+                continue
+
+            path = self.path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_write(path, 'wb') as f:
+                f.write(data)
+            self.partitions[key] = {
+                'file': partition_file(key), 'rows': len(group), 'bytes': len(data), 'sha256': digest
+            }
+            changed.append(key)
+
+        for key in set(self.partitions) - set(groups):
+            self.path(key).unlink(missing_ok=True)
+            del self.partitions[key]
+            changed.append(key)
+
+        if changed:
+            self.dirty = True
+        self.save_manifest()
+        return changed
+
+    def migrate(self, legacy_csv: Path) -> bool:
+        """
+        Split a single-file CSV into partitions if the dataset has none yet
+
+        The legacy file is removed once its rows are partitioned.
+
+        Returns:
+            True if the file was migrated
+        """
+        legacy_csv = Path(legacy_csv)
+        if self.exists() or not legacy_csv.exists():
+            return False
+
+        with open(legacy_csv, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            self.write(row for row in reader if row)
+        legacy_csv.unlink()
+        logger.info(f"Split {legacy_csv.name} into {len(self.partitions)} partitions under {self.directory.name}/")
+        return True
+
+    def save_manifest(self) -> None:
+        """Write the manifest if any entry changed"""
+        if not self.dirty:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # One line per partition, so an update shows up as a one-line diff
+        entries = ",\n".join(f"  {json.dumps(key)}: {json.dumps(self.partitions[key])}" for key in self.keys())
+        with atomic_write(self.manifest_path, encoding='utf-8') as f:
+            f.write(f'{{\n "fields": {json.dumps(self.fieldnames)},\n "partitions": {{\n{entries}\n }}\n}}\n')
+        self.dirty = False
+
+
+def check(directory: Path) -> list[str]:
+    """
+    Verify every partition against the manifest
+
+    Returns:
+        Descriptions of partitions that are missing, unlisted or differ
+    """
+    directory = Path(directory)
+    manifest = json.loads((directory / MANIFEST).read_text())['partitions']
+    problems = []
+    for key, entry in manifest.items():
+        path = directory / entry['file']
+        if not path.exists():
+            problems.append(f"{entry['file']}: missing")
+        elif describe(path) != {name: entry[name] for name in ('rows', 'bytes', 'sha256')}:
+            problems.append(f"{entry['file']}: does not match the manifest")
+    listed = {entry['file'] for entry in manifest.values()}
+    for path in sorted(directory.rglob('*.csv')):
+        if str(path.relative_to(directory)) not in listed:
+            problems.append(f"{path.relative_to(directory)}: not in the manifest")
+    return problems
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Check partitioned datasets against their manifests")
+    commands = parser.add_subparsers(dest='command', required=True)
+    verify = commands.add_parser('check', help="Hash every partition and compare with the manifest")
+    verify.add_argument('directory', type=Path, nargs='+', help="Partitioned dataset directory")
+    args = parser.parse_args()
+
+    failed = False
+    for directory in args.directory:
+        problems = check(directory)
+        for problem in problems:
+            print(f"{directory}/{problem}")
+        failed = failed or bool(problems)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
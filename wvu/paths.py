@@ -0,0 +1,59 @@
+"""
+Dataset locations
+
+Every dataset lives in its own directory under the repository root, and
+scripts resolve their files through dataset_dir() instead of the working
+directory, so they can be run from anywhere. Set WVU_ROOT (or pass --root to
+the wvu command) to read and write the datasets in another checkout.
+"""
+
+import importlib.util
+import os
+import sys
+from pathlib import Path
+from types import ModuleType
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def root() -> Path:
+    """Directory holding the dataset directories"""
+    return Path(os.environ.get('WVU_ROOT') or REPO_ROOT)
+
+
+def dataset_dir(name: str) -> Path:
+    """Directory of one dataset, e.g. dataset_dir('crime-log')"""
+    return root() / name
+
+
+def import_script(relative_path: str) -> ModuleType:
+    """
+    Import a dataset script by path
+
+    The dataset directories are not packages (their names contain hyphens),
+    so scripts are loaded from their files. The script's directory is put on
+    sys.path first so its imports of sibling modules keep working.
+
+    Args:
+        relative_path: Script path relative to the repository, e.g. 'dhhr/normalize.py'
+
+    Returns:
+        The imported module; importing the same script again returns it
+    """
+    path = REPO_ROOT / relative_path
+    name = path.stem
+    module = sys.modules.get(name)
+    if module is not None and Path(getattr(module, '__file__', '')) == path:
+        return module
+
+    if str(path.parent) not in sys.path:
+        sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
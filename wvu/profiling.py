@@ -0,0 +1,278 @@
+"""
+Sampling profiler for scraper runs
+
+A background thread samples the stack of every thread at a fixed interval
+with sys._current_frames(). The run itself is not instrumented, so the
+overhead is a few stack walks per interval whatever the code does, and
+worker threads are profiled along with the main thread. Samples are
+wall-clock: time spent waiting on the network shows up where the wait
+happens. Pool threads idling between jobs are left out.
+
+A profiled run writes two files to a profiles/ directory next to the
+dataset:
+
+    <name>-<timestamp>.folded   collapsed stacks, one "frame;frame;... count"
+                                line per distinct stack, for flamegraph.pl,
+                                speedscope or inferno
+    <name>-<timestamp>.txt      the top functions by self and total samples
+
+Entry points take --profile. Setting WVU_PROFILE=1 profiles every run
+without changing any command line, e.g. in the scheduled workflow.
+
+Usage:
+    python -m wvu.profiling top PROFILE.folded [--limit N]
+    python -m wvu.profiling diff BEFORE.folded AFTER.folded [--limit N]
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from types import CodeType
+from typing import Iterator, Optional
+
+from wvu.paths import REPO_ROOT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.005
+DEFAULT_TOP = 25
+
+# Pool threads are named like ThreadPoolExecutor-0_3; samples from every
+# worker of a pool are merged under the pool's name
+_WORKER_SUFFIX = re.compile(r'_\d+$')
+
+
+def _is_idle(code: CodeType) -> bool:
+    """Whether a leaf frame is a pool worker waiting for its next job"""
+    return (
+        code.co_name == '_worker'
+        and code.co_filename.endswith(os.path.join('concurrent', 'futures', 'thread.py'))
+    )
+
+
+def _short_path(filename: str) -> str:
+    """A file's path relative to the repository or to the sys.path entry holding it"""
+    path = Path(filename)
+    # Longest entries first, so site-packages wins over the lib directory above it
+    entries = sorted((Path(entry) for entry in sys.path if entry), key=lambda p: len(str(p)), reverse=True)
+    for base in [REPO_ROOT, *entries]:
+        try:
+            return str(path.relative_to(base))
+        except ValueError:
+            continue
+    return filename
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads from a background thread"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        """
+        Initialize the profiler
+
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._labels: dict[CodeType, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = _short_path(code.co_filename)
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = f"{name} ({path}:{code.co_firstlineno})".replace(';', ',')
+            self._labels[code] = label
+        return label
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me or _is_idle(frame.f_code):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                thread = _WORKER_SUFFIX.sub('', names.get(ident, 'thread'))
+                self.stacks[(thread, *reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self) -> None:
+        """Start sampling"""
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._sample, name='wvu-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.monotonic() - self._started
+
+    def __enter__(self) -> 'SamplingProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def folded(self) -> str:
+        """Collapsed stacks, most frequent first"""
+        return "".join(f"{';'.join(stack)} {n}\n" for stack, n in self.stacks.most_common())
+
+    def summary(self, top: int = DEFAULT_TOP) -> str:
+        """Top functions by self and total samples"""
+        header = (
+            f"{self.samples} samples every {self.interval * 1000:g} ms over {self.elapsed:.1f}s "
+            f"(wall-clock, all threads, idle pool workers excluded)"
+        )
+        return header + "\n\n" + format_top(self.stacks, top)
+
+    def save(self, directory: Path, name: str) -> tuple[Path, Path]:
+        """
+        Write the collapsed stacks and the summary
+
+        Args:
+            directory: Directory to write to, created if needed
+            name: File name prefix, e.g. 'meetings'
+
+        Returns:
+            Paths of the .folded and .txt files
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{name}-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}"
+        folded = directory / f"{stem}.folded"
+        summary = directory / f"{stem}.txt"
+        folded.write_text(self.folded())
+        summary.write_text(self.summary() + "\n")
+        return folded, summary
+
+
+def function_counts(stacks: Counter) -> tuple[Counter, Counter, int]:
+    """
+    Self and total samples per function
+
+    The first frame of each stack is its thread name and is not counted.
+
+    Returns:
+        (self counts, total counts, number of samples)
+    """
+    own: Counter[str] = Counter()
+    total: Counter[str] = Counter()
+    samples = 0
+    for stack, n in stacks.items():
+        frames = stack[1:]
+        if not frames:
+            continue
+        samples += n
+        own[frames[-1]] += n
+        for frame in set(frames):
+            total[frame] += n
+    return own, total, samples
+
+
+def format_top(stacks: Counter, top: int = DEFAULT_TOP) -> str:
+    """Table of the functions with the most self samples"""
+    own, total, samples = function_counts(stacks)
+    if not samples:
+        return "No samples"
+    lines = [f"{'self%':>6} {'total%':>7} {'samples':>8}  function"]
+    for frame, n in own.most_common(top):
+        lines.append(f"{n / samples:>6.1%} {total[frame] / samples:>7.1%} {n:>8}  {frame}")
+    return "\n".join(lines)
+
+
+def read_folded(path: Path) -> Counter:
+    """Load collapsed stacks written by SamplingProfiler.save()"""
+    stacks: Counter[tuple[str, ...]] = Counter()
+    with open(path, 'r') as f:
+        for line in f:
+            stack, _, n = line.rstrip('\n').rpartition(' ')
+            if stack:
+                stacks[tuple(stack.split(';'))] += int(n)
+    return stacks
+
+
+def format_diff(before: Counter, after: Counter, top: int = DEFAULT_TOP) -> str:
+    """Table of the functions whose share of self samples changed most"""
+    own_before, _, samples_before = function_counts(before)
+    own_after, _, samples_after = function_counts(after)
+    if not samples_before or not samples_after:
+        return "No samples"
+
+    shares = {
+        frame: (own_before[frame] / samples_before, own_after[frame] / samples_after)
+        for frame in own_before.keys() | own_after.keys()
+    }
+    changed = sorted(shares.items(), key=lambda item: abs(item[1][1] - item[1][0]), reverse=True)
+    lines = [f"{'before':>7} {'after':>7} {'change':>7}  function"]
+    for frame, (was, now) in changed[:top]:
+        lines.append(f"{was:>7.1%} {now:>7.1%} {now - was:>+7.1%}  {frame}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def profiled(name: str, directory: Path, enabled: bool = False) -> Iterator[Optional[SamplingProfiler]]:
+    """
+    Profile the block when enabled or when WVU_PROFILE is set
+
+    Args:
+        name: File name prefix for the profile
+        directory: Dataset directory; profiles go in its profiles/ subdirectory
+        enabled: Profile even if WVU_PROFILE is not set
+
+    Yields:
+        The running profiler, or None when not profiling
+    """
+    if not (enabled or os.environ.get('WVU_PROFILE')):
+        yield None
+        return
+
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        folded, summary = profiler.save(Path(directory) / 'profiles', name)
+        logger.info(f"Profile written to {folded} and {summary}")
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Summarize or compare saved profiles")
+    commands = parser.add_subparsers(dest='command', required=True)
+    show = commands.add_parser('top', help="Show a profile's hottest functions")
+    show.add_argument('profile', type=Path, help=".folded file")
+    show.add_argument('--limit', type=int, default=DEFAULT_TOP, help="Number of functions to show")
+    diff = commands.add_parser('diff', help="Compare two profiles of the same run")
+    diff.add_argument('before', type=Path, help=".folded file from before a change")
+    diff.add_argument('after', type=Path, help=".folded file from after it")
+    diff.add_argument('--limit', type=int, default=DEFAULT_TOP, help="Number of functions to show")
+    args = parser.parse_args()
+
+    if args.command == 'top':
+        print(format_top(read_folded(args.profile), args.limit))
+    elif args.command == 'diff':
+        print(format_diff(read_folded(args.before), read_folded(args.after), args.limit))
+
+
+if __name__ == "__main__":
+    main()
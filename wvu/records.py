@@ -0,0 +1,98 @@
+"""
+Slotted record types with batch validation
+
+Datasets describe their rows as slotted dataclasses whose field types carry
+the pydantic constraints (types, Field metadata, AfterValidator cleanups).
+A RecordSchema wraps one such type:
+
+    validate(rows)        validates a whole list of CSV-style rows in one
+                          call into pydantic-core, then builds the records
+                          with the plain dataclass constructor
+    validate_rows(rows)   the same, but sets invalid rows aside instead of
+                          failing the batch
+    create(**fields)      validates a single record built from keywords
+    as_row(record)        the record's values as a tuple for csv.writer
+
+Validating rows as tuples skips building a pydantic model (and a dict) per
+row, and as_row is an operator.attrgetter, so bulk loads and writes do no
+per-row Python-level work beyond the constructor call. The records are
+checked against the same types and validators a BaseModel would apply.
+Construct records through a schema: calling the dataclass directly skips
+validation.
+"""
+
+import dataclasses
+import operator
+import typing
+from typing import Any, Callable, Generic, Iterable, Sequence, TypeVar
+
+from pydantic import TypeAdapter, ValidationError
+
+T = TypeVar('T')
+
+
+class RecordSchema(Generic[T]):
+    """Batch validator and CSV row converter for a slotted dataclass"""
+
+    def __init__(self, record_type: type[T]):
+        """
+        Initialize the schema
+
+        Args:
+            record_type: Dataclass whose annotations hold the field constraints
+        """
+        if not dataclasses.is_dataclass(record_type):
+            raise TypeError(f"{record_type.__name__} is not a dataclass")
+        self.record_type = record_type
+        self.fields = [field.name for field in dataclasses.fields(record_type)]
+        hints = typing.get_type_hints(record_type, include_extras=True)
+        row_type = tuple.__class_getitem__(tuple(hints[name] for name in self.fields))
+        self._rows = TypeAdapter(list[row_type])
+        self._record = TypeAdapter(record_type)
+        getter = operator.attrgetter(*self.fields)
+        # attrgetter returns a bare value rather than a tuple for one field
+        self.as_row: Callable[[T], tuple] = getter if len(self.fields) > 1 else lambda record: (getter(record),)
+
+    def validate(self, rows: Iterable[Sequence[Any]]) -> list[T]:
+        """
+        Validate rows whose values are in field order
+
+        Raises:
+            pydantic.ValidationError: If any row is invalid; error locations
+                start with the row's index
+        """
+        record = self.record_type
+        return [record(*values) for values in self._rows.validate_python(list(rows))]
+
+    def validate_rows(self, rows: Iterable[Sequence[Any]]) -> tuple[list[T], list[tuple[Sequence[Any], str]]]:
+        """
+        Validate rows, setting aside any that fail
+
+        Returns:
+            (valid records in input order, (row, error message) for each invalid row)
+        """
+        rows = list(rows)
+        try:
+            return self.validate(rows), []
+        except ValidationError as e:
+            messages: dict[int, list[str]] = {}
+            for error in e.errors(include_url=False):
+                index, *loc = error['loc']
+                field = self.fields[loc[0]] if loc and isinstance(loc[0], int) and loc[0] < len(self.fields) else None
+                messages.setdefault(index, []).append(f"{field}: {error['msg']}" if field else error['msg'])
+
+        valid = self.validate(row for i, row in enumerate(rows) if i not in messages)
+        return valid, [(rows[i], "; ".join(msgs)) for i, msgs in sorted(messages.items())]
+
+    def create(self, **fields) -> T:
+        """
+        Validate a single record given by keyword; fields with defaults may be left out
+
+        Raises:
+            pydantic.ValidationError: If the record is invalid
+        """
+        return self._record.validate_python(fields)
+
+    def write(self, writer, records: Iterable[T]) -> None:
+        """Write records with a csv.writer"""
+        writer.writerows(map(self.as_row, records))
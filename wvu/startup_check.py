@@ -0,0 +1,86 @@
+"""
+Startup check for the wvu command
+
+Fails when `wvu --help` imports any heavy module or when its startup time,
+over that of a bare interpreter, exceeds a budget. Run in CI before the
+scrapers so a stray top-level import in wvu/cli.py is caught immediately.
+
+Usage:
+    python -m wvu.startup_check [--budget-ms 150] [--runs 5]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Top-level packages that must only be imported once a command runs
+HEAVY_MODULES = {
+    'bs4', 'dateparser', 'dateutil', 'lxml', 'pdfplumber', 'pydantic', 'pypdf',
+    'requests', 'sqlite3', 'tabula', 'urllib3',
+}
+
+HELP = [sys.executable, '-m', 'wvu.cli', '--help']
+BARE = [sys.executable, '-c', 'pass']
+
+
+def imported_modules() -> set[str]:
+    """Top-level packages imported by `wvu --help`, from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', *HELP[1:]],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            name = line.rsplit('|', 1)[1].strip()
+            modules.add(name.split('.')[0])
+    return modules
+
+
+def startup_seconds(command: list[str], runs: int) -> float:
+    """Best-of-N wall time of a command"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, capture_output=True, check=True)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Check wvu --help imports and startup time")
+    parser.add_argument(
+        '--budget-ms', type=float, default=150,
+        help="Allowed startup time over a bare interpreter, in milliseconds"
+    )
+    parser.add_argument('--runs', type=int, default=5, help="Timing runs; the fastest is used")
+    args = parser.parse_args()
+
+    failures = []
+
+    heavy = sorted(imported_modules() & HEAVY_MODULES)
+    if heavy:
+        failures.append(f"wvu --help imports heavy modules: {', '.join(heavy)}")
+
+    bare = startup_seconds(BARE, args.runs)
+    cli = startup_seconds(HELP, args.runs)
+    overhead_ms = (cli - bare) * 1000
+    print(
+        f"wvu --help: {cli * 1000:.0f} ms, interpreter {bare * 1000:.0f} ms, "
+        f"overhead {overhead_ms:.0f} ms (budget {args.budget_ms:.0f} ms)"
+    )
+    if overhead_ms > args.budget_ms:
+        failures.append(f"wvu --help startup overhead {overhead_ms:.0f} ms exceeds {args.budget_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Local stub server for running scrapers offline
+
+Serves canned responses to an HttpClient created with stub_url (or with the
+WVU_HTTP_STUB environment variable set). The client sends each request to
+http://<stub>/<original host><original path>, so responses are looked up by
+"<host><path>": first in the in-memory routes, then as a file under the
+fixtures directory.
+
+Usage:
+    python -m wvu.stub_server --fixtures fixtures/ --port 8000
+    WVU_HTTP_STUB=http://127.0.0.1:8000 python scraper.py
+"""
+
+import argparse
+import logging
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, Union
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StubResponse:
+    """A canned response"""
+    body: bytes = b''
+    status: int = 200
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+class StubServer:
+    """Threaded HTTP server that replays canned responses"""
+
+    def __init__(self, fixtures_dir: Optional[Path] = None, port: int = 0):
+        """
+        Initialize the server
+
+        Args:
+            fixtures_dir: Directory laid out as <host>/<path> to serve files from
+            port: Port to listen on; 0 picks a free one
+        """
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+        self.routes: dict[str, deque[StubResponse]] = {}
+        self.requests: list[tuple[str, str, bytes]] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass to HttpClient(stub_url=...)"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add(self, url: str, *responses: Union[StubResponse, bytes, str]) -> None:
+        """
+        Register responses for a URL on the real host
+
+        Responses are served in order; the last one repeats once the rest are
+        used up, so a flaky endpoint can be modelled as (500, 500, 200).
+        """
+        parts = urlsplit(url)
+        key = parts.netloc + (parts.path or '/')
+        queue = deque()
+        for response in responses:
+            if isinstance(response, str):
+                response = response.encode('utf-8')
+            if isinstance(response, bytes):
+                response = StubResponse(body=response)
+            queue.append(response)
+        with self._lock:
+            self.routes[key] = queue
+
+    def _lookup(self, key: str) -> Optional[StubResponse]:
+        """Find the response for a host/path key"""
+        with self._lock:
+            queue = self.routes.get(key)
+            if queue:
+                return queue.popleft() if len(queue) > 1 else queue[0]
+
+        if self.fixtures_dir:
+            path = (self.fixtures_dir / key.lstrip('/')).resolve()
+            if path.is_file() and self.fixtures_dir.resolve() in path.parents:
+                return StubResponse(body=path.read_bytes())
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self) -> None:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                key = urlsplit(self.path).path.lstrip('/')
+                with server._lock:
+                    server.requests.append((self.command, key, body))
+
+                response = server._lookup(key) or StubResponse(b'not found', status=404)
+                status, payload = response.status, response.body
+                headers = dict(response.headers)
+
+                # Serve byte ranges so resumed downloads can be exercised
+                match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+                if match and status == 200:
+                    start = int(match.group(1))
+                    if start >= len(payload):
+                        status, payload = 416, b''
+                    else:
+                        headers['Content-Range'] = f"bytes {start}-{len(payload) - 1}/{len(payload)}"
+                        status, payload = 206, payload[start:]
+
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(payload)
+
+            do_GET = do_POST = do_HEAD = _respond
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self) -> 'StubServer':
+        """Start serving on a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Shut the server down"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'StubServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Serve recorded fixtures to the scrapers")
+    parser.add_argument('--fixtures', type=Path, required=True, help="Fixture directory")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = StubServer(fixtures_dir=args.fixtures, port=args.port)
+    print(f"Serving {args.fixtures} at {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()